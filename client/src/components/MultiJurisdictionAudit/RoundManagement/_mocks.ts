@@ -1,5 +1,6 @@
 import { IBatch } from './useBatchResults'
 import { IRound } from '../useRoundsAuditAdmin'
+import { FileProcessingStatus } from '../useJurisdictions'
 
 export interface INullResultValues {
   [contestId: string]: {
@@ -16,6 +17,13 @@ export const roundMocks: {
     startedAt: '2020-09-14T17:35:19.482Z',
     endedAt: null,
     isAuditComplete: false,
+    drawSampleTask: {
+      status: FileProcessingStatus.PROCESSED,
+      startedAt: '2020-09-14T17:35:19.482Z',
+      completedAt: '2020-09-14T17:35:20.104Z',
+      error: null,
+      progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+    },
   },
   complete: {
     id: 'round-1',
@@ -23,6 +31,13 @@ export const roundMocks: {
     startedAt: '2020-09-14T17:35:19.482Z',
     endedAt: '2020-09-14T17:35:19.482Z',
     isAuditComplete: true,
+    drawSampleTask: {
+      status: FileProcessingStatus.PROCESSED,
+      startedAt: '2020-09-14T17:35:19.482Z',
+      completedAt: '2020-09-14T17:35:20.104Z',
+      error: null,
+      progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+    },
   },
 }
 
@@ -1,6 +1,6 @@
 import React from 'react'
 import { BrowserRouter as Router, useParams } from 'react-router-dom'
-import { render, fireEvent, screen } from '@testing-library/react'
+import { render, fireEvent, screen, waitFor } from '@testing-library/react'
 import { AuditAdminStatusBox, JurisdictionAdminStatusBox } from '.'
 import {
   auditSettings,
@@ -43,6 +43,7 @@ describe('StatusBox', () => {
             jurisdictions={[]}
             contests={[]}
             auditSettings={auditSettings.blank!}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -58,6 +59,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.oneManifest}
             contests={[]}
             auditSettings={auditSettings.blank!}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -74,6 +76,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allManifests}
             contests={[]}
             auditSettings={auditSettings.blank!}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -90,6 +93,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allManifests}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -106,6 +110,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.oneComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -113,6 +118,72 @@ describe('StatusBox', () => {
       screen.getByText('1 of 3 jurisdictions have completed Round 1')
     })
 
+    it('renders drawing sample state', () => {
+      render(
+        <Router>
+          <AuditAdminStatusBox
+            rounds={roundMocks.drawingSample}
+            jurisdictions={jurisdictionMocks.allManifests}
+            contests={contestMocks.filledTargeted.contests}
+            auditSettings={auditSettings.all}
+            refresh={jest.fn()}
+          />
+        </Router>
+      )
+      screen.getByText('Drawing a random sample of ballots for Round 1')
+      screen.getByText('This may take a few minutes.')
+      screen.getByText('1 of 2 contests sampled.')
+    })
+
+    it('renders drawing sample failed state', () => {
+      render(
+        <Router>
+          <AuditAdminStatusBox
+            rounds={roundMocks.drawSampleErrored}
+            jurisdictions={jurisdictionMocks.allManifests}
+            contests={contestMocks.filledTargeted.contests}
+            auditSettings={auditSettings.all}
+            refresh={jest.fn()}
+          />
+        </Router>
+      )
+      screen.getByText('Drawing the sample for Round 1 failed')
+      screen.getByText('Error: something went wrong')
+      screen.getByText('Review the audit setup and launch the audit again.')
+    })
+
+    it('starts a round again after drawing its sample failed', async () => {
+      apiMock.mockResolvedValue({ status: 'ok' })
+      const refresh = jest.fn()
+      render(
+        <Router>
+          <AuditAdminStatusBox
+            rounds={roundMocks.drawSampleErroredRoundTwo}
+            jurisdictions={jurisdictionMocks.allComplete}
+            contests={contestMocks.filledTargeted.contests}
+            auditSettings={auditSettings.all}
+            refresh={refresh}
+          />
+        </Router>
+      )
+      screen.getByText('Drawing the sample for Round 2 failed')
+      screen.getByText('Error: something went wrong')
+      fireEvent.click(screen.getByRole('button', { name: 'Start Round 2' }), {
+        bubbles: true,
+      })
+      expect(apiMock).toHaveBeenCalledTimes(1)
+      expect(apiMock).toHaveBeenCalledWith('/election/1/round', {
+        method: 'POST',
+        body: JSON.stringify({
+          roundNum: 2,
+        }),
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      })
+      await waitFor(() => expect(refresh).toHaveBeenCalledTimes(1))
+    })
+
     it('renders round complete, need another round state', () => {
       render(
         <Router>
@@ -121,6 +192,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -140,6 +212,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -167,6 +240,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -193,6 +267,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -209,6 +284,7 @@ describe('StatusBox', () => {
             jurisdictions={jurisdictionMocks.allComplete}
             contests={contestMocks.filledTargeted.contests}
             auditSettings={auditSettings.all}
+            refresh={jest.fn()}
           />
         </Router>
       )
@@ -13,7 +13,7 @@ import { api, apiDownload } from '../../utilities'
 import { Inner } from '../../Atoms/Wrapper'
 import { IAuditSettings, IContest } from '../../../types'
 import { IAuditBoard } from '../useAuditBoards'
-import { IRound } from '../useRoundsAuditAdmin'
+import { IRound, isDrawingSample } from '../useRoundsAuditAdmin'
 
 const Wrapper = styled(Callout)`
   display: flex;
@@ -132,6 +132,7 @@ interface IAuditAdminProps {
   jurisdictions: IJurisdiction[]
   contests: IContest[]
   auditSettings: IAuditSettings
+  refresh: () => void
   children?: ReactElement
 }
 
@@ -140,6 +141,7 @@ export const AuditAdminStatusBox: React.FC<IAuditAdminProps> = ({
   jurisdictions,
   contests,
   auditSettings,
+  refresh,
   children,
 }: IAuditAdminProps) => {
   const { electionId } = useParams<{ electionId: string }>()
@@ -174,7 +176,53 @@ export const AuditAdminStatusBox: React.FC<IAuditAdminProps> = ({
     )
   }
 
-  const { roundNum, endedAt, isAuditComplete } = rounds[rounds.length - 1]
+  const lastRound = rounds[rounds.length - 1]
+  const { roundNum, endedAt, isAuditComplete, drawSampleTask } = lastRound
+
+  // Drawing the sample for a new round
+  if (isDrawingSample(lastRound)) {
+    const { progress } = drawSampleTask
+    const details = ['This may take a few minutes.']
+    if (progress && progress.totalContests > 0)
+      details.push(
+        `${progress.contestsDrawn} of ${progress.totalContests}` +
+          ' contests sampled.'
+      )
+    return (
+      <StatusBox
+        headline={`Drawing a random sample of ballots for Round ${roundNum}`}
+        details={details}
+      >
+        {children}
+      </StatusBox>
+    )
+  }
+
+  // Drawing the sample failed, need to start the round again
+  if (drawSampleTask.status === FileProcessingStatus.ERRORED) {
+    const details = [`Error: ${drawSampleTask.error}`]
+    if (roundNum === 1) {
+      details.push('Review the audit setup and launch the audit again.')
+      return (
+        <StatusBox
+          headline="Drawing the sample for Round 1 failed"
+          details={details}
+        >
+          {children}
+        </StatusBox>
+      )
+    }
+    return (
+      <StatusBox
+        headline={`Drawing the sample for Round ${roundNum} failed`}
+        details={details}
+        buttonLabel={`Start Round ${roundNum}`}
+        onButtonClick={() => createRound(electionId, roundNum).then(refresh)}
+      >
+        {children}
+      </StatusBox>
+    )
+  }
 
   // Round in progress
   if (!endedAt) {
@@ -203,7 +251,9 @@ export const AuditAdminStatusBox: React.FC<IAuditAdminProps> = ({
         headline={`Round ${roundNum} of the audit is complete - another round is needed`}
         details={[`When you are ready, start Round ${roundNum + 1}`]}
         buttonLabel={`Start Round ${roundNum + 1}`}
-        onButtonClick={() => createRound(electionId, roundNum + 1)}
+        onButtonClick={() =>
+          createRound(electionId, roundNum + 1).then(refresh)
+        }
       >
         {children}
       </StatusBox>
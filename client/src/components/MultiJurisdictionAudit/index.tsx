@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react'
+import React, { useEffect, useRef, useState } from 'react'
 import { Redirect, useParams } from 'react-router-dom'
 import styled from 'styled-components'
 import uuidv4 from 'uuidv4'
@@ -21,7 +21,10 @@ import useAuditBoards from './useAuditBoards'
 import useAuditSettings from './useAuditSettings'
 import useJurisdictions, { FileProcessingStatus } from './useJurisdictions'
 import useContests from './useContests'
-import useRoundsAuditAdmin from './useRoundsAuditAdmin'
+import useRoundsAuditAdmin, {
+  isDrawingSample,
+  isSampleDrawn,
+} from './useRoundsAuditAdmin'
 import useAuditSettingsJurisdictionAdmin from './RoundManagement/useAuditSettingsJurisdictionAdmin'
 import H2Title from '../Atoms/H2Title'
 import CSVFile from './CSVForm'
@@ -60,6 +63,15 @@ export const AuditAdminView: React.FC = () => {
 
   useEffect(refresh, [refresh, isBallotComparison])
 
+  // Once the sample for a new round has been drawn, reload everything else
+  const lastRound = rounds && rounds[rounds.length - 1]
+  const isDrawing = !!lastRound && isDrawingSample(lastRound)
+  const wasDrawing = useRef(false)
+  useEffect(() => {
+    if (wasDrawing.current && !isDrawing) refresh()
+    wasDrawing.current = isDrawing
+  }, [isDrawing, refresh])
+
   if (!contests || !rounds || !auditSettings) return null // Still loading
 
   // TODO support multiple contests in batch comparison audits
@@ -82,6 +94,7 @@ export const AuditAdminView: React.FC = () => {
             jurisdictions={jurisdictions}
             contests={contests}
             auditSettings={auditSettings}
+            refresh={refresh}
           >
             <RefreshTag refresh={refresh} />
           </AuditAdminStatusBox>
@@ -104,6 +117,7 @@ export const AuditAdminView: React.FC = () => {
             jurisdictions={jurisdictions}
             contests={contests}
             auditSettings={auditSettings}
+            refresh={refresh}
           >
             <RefreshTag refresh={refresh} />
           </AuditAdminStatusBox>
@@ -122,7 +136,7 @@ export const AuditAdminView: React.FC = () => {
             <Progress
               jurisdictions={jurisdictions}
               auditSettings={auditSettings}
-              round={rounds[rounds.length - 1]}
+              round={rounds.filter(isSampleDrawn).pop() || null}
             />
           </Inner>
         </Wrapper>
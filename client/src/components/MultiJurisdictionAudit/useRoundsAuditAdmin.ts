@@ -1,5 +1,18 @@
 import { useState, useEffect } from 'react'
 import { api } from '../utilities'
+import { FileProcessingStatus } from './useJurisdictions'
+
+export interface IDrawSampleTask {
+  status: FileProcessingStatus
+  startedAt: string | null
+  completedAt: string | null
+  error: string | null
+  progress: {
+    contestsDrawn: number
+    totalContests: number
+    rowsWritten: number
+  } | null
+}
 
 export interface IRound {
   id: string
@@ -7,19 +20,42 @@ export interface IRound {
   startedAt: string
   endedAt: string | null
   isAuditComplete: boolean
+  drawSampleTask: IDrawSampleTask
 }
 
+export const isDrawingSample = (round: IRound) =>
+  round.drawSampleTask.status === FileProcessingStatus.READY_TO_PROCESS ||
+  round.drawSampleTask.status === FileProcessingStatus.PROCESSING
+
+export const isSampleDrawn = (round: IRound) =>
+  round.drawSampleTask.status === FileProcessingStatus.PROCESSED
+
+// How often to check on the sample while it's being drawn
+const DRAW_SAMPLE_POLL_INTERVAL = 1000
+
 const useRoundsAuditAdmin = (electionId: string, refreshId?: string) => {
   const [rounds, setRounds] = useState<IRound[] | null>(null)
 
   useEffect(() => {
-    ;(async () => {
+    let timeout: ReturnType<typeof setTimeout> | null = null
+    let isCancelled = false
+    const getRounds = async () => {
       const response = await api<{ rounds: IRound[] }>(
         `/election/${electionId}/round`
       )
-      if (!response) return
+      if (!response || isCancelled) return
       setRounds(response.rounds)
-    })()
+      // The sample for a new round is drawn in the background, so keep
+      // checking until it's done.
+      const lastRound = response.rounds[response.rounds.length - 1]
+      if (lastRound && isDrawingSample(lastRound))
+        timeout = setTimeout(getRounds, DRAW_SAMPLE_POLL_INTERVAL)
+    }
+    getRounds()
+    return () => {
+      isCancelled = true
+      if (timeout) clearTimeout(timeout)
+    }
   }, [electionId, refreshId])
 
   return rounds
@@ -110,7 +110,10 @@ export const roundMocks: {
     | 'singleIncomplete'
     | 'twoIncomplete'
     | 'singleComplete'
-    | 'needAnother']: IRound[]
+    | 'needAnother'
+    | 'drawingSample'
+    | 'drawSampleErrored'
+    | 'drawSampleErroredRoundTwo']: IRound[]
 } = {
   empty: [],
   singleIncomplete: [
@@ -118,6 +121,13 @@ export const roundMocks: {
       endedAt: null,
       roundNum: 1,
       isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
       startedAt: '2019-07-18T16:34:07.000Z',
       id: 'round-1',
     },
@@ -127,6 +137,13 @@ export const roundMocks: {
       endedAt: null,
       roundNum: 1,
       isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
       startedAt: '2019-07-18T16:34:07.000Z',
       id: 'round-1',
     },
@@ -134,6 +151,13 @@ export const roundMocks: {
       endedAt: null,
       roundNum: 2,
       isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
       startedAt: '2019-07-18T16:34:07.000Z',
       id: 'round-2',
     },
@@ -143,6 +167,13 @@ export const roundMocks: {
       endedAt: 'a time most proper',
       roundNum: 1,
       isAuditComplete: true,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
       startedAt: '2019-07-18T16:34:07.000Z',
       id: 'round-1',
     },
@@ -152,10 +183,79 @@ export const roundMocks: {
       endedAt: 'a time most proper',
       roundNum: 1,
       isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
+      startedAt: '2019-07-18T16:34:07.000Z',
+      id: 'round-1',
+    },
+  ],
+  drawingSample: [
+    {
+      endedAt: null,
+      roundNum: 1,
+      isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSING,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: null,
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 2, rowsWritten: 10 },
+      },
       startedAt: '2019-07-18T16:34:07.000Z',
       id: 'round-1',
     },
   ],
+  drawSampleErrored: [
+    {
+      endedAt: null,
+      roundNum: 1,
+      isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.ERRORED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: 'something went wrong',
+        progress: null,
+      },
+      startedAt: '2019-07-18T16:34:07.000Z',
+      id: 'round-1',
+    },
+  ],
+  drawSampleErroredRoundTwo: [
+    {
+      endedAt: 'a time most proper',
+      roundNum: 1,
+      isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.PROCESSED,
+        startedAt: '2019-07-18T16:34:07.000Z',
+        completedAt: '2019-07-18T16:34:08.000Z',
+        error: null,
+        progress: { contestsDrawn: 1, totalContests: 1, rowsWritten: 10 },
+      },
+      startedAt: '2019-07-18T16:34:07.000Z',
+      id: 'round-1',
+    },
+    {
+      endedAt: null,
+      roundNum: 2,
+      isAuditComplete: false,
+      drawSampleTask: {
+        status: FileProcessingStatus.ERRORED,
+        startedAt: '2019-07-18T16:34:09.000Z',
+        completedAt: '2019-07-18T16:34:10.000Z',
+        error: 'something went wrong',
+        progress: null,
+      },
+      startedAt: '2019-07-18T16:34:09.000Z',
+      id: 'round-2',
+    },
+  ],
 }
 
 export const manifestMocks: { [key: string]: IBallotManifestInfo } = {
@@ -1,12 +1,17 @@
 import { api } from '../../utilities'
-import { IRound } from '../../../types'
+import { IRound } from '../useRoundsAuditAdmin'
+import { FileProcessingStatus } from '../useJurisdictions'
 
 const getRoundStatus = async (electionId: string): Promise<boolean> => {
   const response = await api<{ rounds: IRound[] }>(
     `/election/${electionId}/round`
   )
-  if (!response || !response.rounds.length) return false
-  return true
+  if (!response) return false
+  // If drawing the sample for the first round failed, the audit admin can
+  // change the setup and launch the audit again.
+  return response.rounds.some(
+    round => round.drawSampleTask.status !== FileProcessingStatus.ERRORED
+  )
 }
 
 export default getRoundStatus
@@ -1,5 +1,6 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Iterator
 from sqlalchemy.orm.session import Session
 from flask import request, jsonify, Request
 from werkzeug.exceptions import BadRequest, NotFound
@@ -10,11 +11,19 @@ from ..models import *  # pylint: disable=wildcard-import
 from ..auth import restrict_access, UserType
 from ..util.process_file import (
     process_file,
+    queue_processing_job,
     serialize_file,
     serialize_file_processing,
 )
-from ..util.csv_download import csv_response
-from ..util.csv_parse import decode_csv_file, parse_csv, CSVValueType, CSVColumnType
+from ..util.csv_download import csv_file_response
+from ..util.csv_parse import (
+    decode_csv_file,
+    parse_csv,
+    CSVValueType,
+    CSVColumnType,
+    CSVDictIterator,
+)
+from ..util.csv_stream import copy_rows
 
 CONTAINER = "Container"
 TABULATOR = "Tabulator"
@@ -44,25 +53,65 @@ def process_ballot_manifest_file(
             CSVColumnType(NUMBER_OF_BALLOTS, CSVValueType.NUMBER),
         ]
 
-        manifest_csv = parse_csv(jurisdiction.manifest_file.contents, columns)
-
+        # We can't load anything from the db while we're in the middle of a
+        # COPY, so we look up the jurisdiction id up front.
+        jurisdiction_id = jurisdiction.id
         num_batches = 0
         num_ballots = 0
-        for row in manifest_csv:
-            batch = Batch(
-                id=str(uuid.uuid4()),
-                name=row[BATCH_NAME],
-                jurisdiction_id=jurisdiction.id,
-                num_ballots=row[NUMBER_OF_BALLOTS],
-                container=row.get(CONTAINER, None),
-                tabulator=row.get(TABULATOR, None),
-            )
-            session.add(batch)
-            num_batches += 1
-            num_ballots += batch.num_ballots
+
+        def batch_rows(manifest_csv: CSVDictIterator) -> Iterator[list]:
+            nonlocal num_batches, num_ballots
+            start = datetime.utcnow()
+            for row in manifest_csv:
+                # Batches are ordered by created_at in some places (e.g. when
+                # assigning them to audit boards), so we give each batch its
+                # own timestamp to keep them in manifest order.
+                created_at = (start + timedelta(microseconds=num_batches)).isoformat()
+                yield [
+                    str(uuid.uuid4()),
+                    jurisdiction_id,
+                    row.get(CONTAINER, None),
+                    row.get(TABULATOR, None),
+                    row[BATCH_NAME],
+                    row[NUMBER_OF_BALLOTS],
+                    created_at,
+                    created_at,
+                ]
+                num_batches += 1
+                num_ballots += row[NUMBER_OF_BALLOTS]
+
+        # Manifests can have tens of thousands of batches, so rather than
+        # creating a Batch object for each, we load them into the db with COPY
+        # as we parse them (like we do for CVRs). We use the session's
+        # connection, so the batches are saved in the same transaction as the
+        # rest of the processing.
+        with jurisdiction.manifest_file.open() as manifest_file:
+            cursor = session.connection().connection.cursor()
+            try:
+                copy_rows(
+                    cursor,
+                    """
+                    COPY batch (
+                        id,
+                        jurisdiction_id,
+                        container,
+                        tabulator,
+                        name,
+                        num_ballots,
+                        created_at,
+                        updated_at
+                    )
+                    FROM STDIN
+                    WITH (FORMAT CSV)
+                    """,
+                    batch_rows(parse_csv(manifest_file, columns)),
+                )
+            finally:
+                cursor.close()
 
         jurisdiction.manifest_num_ballots = num_ballots
         jurisdiction.manifest_num_batches = num_batches
+        return num_batches
 
     process_file(session, file, process)
 
@@ -78,11 +127,9 @@ def validate_ballot_manifest_upload(request: Request):
 def save_ballot_manifest_file(manifest, jurisdiction: Jurisdiction):
     manifest_string = decode_csv_file(manifest.read())
     jurisdiction.manifest_file = File(
-        id=str(uuid.uuid4()),
-        name=manifest.filename,
-        contents=manifest_string,
-        uploaded_at=datetime.utcnow(),
+        id=str(uuid.uuid4()), name=manifest.filename, uploaded_at=datetime.utcnow(),
     )
+    jurisdiction.manifest_file.save_contents(manifest_string)
 
 
 def clear_ballot_manifest_file(jurisdiction: Jurisdiction):
@@ -90,6 +137,7 @@ def clear_ballot_manifest_file(jurisdiction: Jurisdiction):
     jurisdiction.manifest_num_batches = None
 
     if jurisdiction.manifest_file_id:
+        jurisdiction.manifest_file.delete_contents()
         File.query.filter_by(id=jurisdiction.manifest_file_id).delete()
     Batch.query.filter_by(jurisdiction=jurisdiction).delete()
 
@@ -105,6 +153,9 @@ def upload_ballot_manifest(
     validate_ballot_manifest_upload(request)
     clear_ballot_manifest_file(jurisdiction)
     save_ballot_manifest_file(request.files["manifest"], jurisdiction)
+    queue_processing_job(
+        db_session, jurisdiction.manifest_file, FileType.BALLOT_MANIFEST
+    )
     db_session.commit()
     return jsonify(status="ok")
 
@@ -134,9 +185,7 @@ def download_ballot_manifest_file(
     if not jurisdiction.manifest_file:
         return NotFound()
 
-    return csv_response(
-        jurisdiction.manifest_file.contents, jurisdiction.manifest_file.name
-    )
+    return csv_file_response(jurisdiction.manifest_file)
 
 
 @api.route(
@@ -10,11 +10,12 @@ from ..models import *  # pylint: disable=wildcard-import
 from ..auth import restrict_access, UserType
 from ..util.process_file import (
     process_file,
+    queue_processing_job,
     serialize_file,
     serialize_file_processing,
     UserError,
 )
-from ..util.csv_download import csv_response
+from ..util.csv_download import csv_file_response
 from ..util.csv_parse import decode_csv_file, parse_csv, CSVValueType, CSVColumnType
 
 BATCH_NAME = "Batch Name"
@@ -34,9 +35,8 @@ def process_batch_tallies_file(
             for choice in contest.choices
         ]
 
-        batch_tallies_csv = list(
-            parse_csv(jurisdiction.batch_tallies_file.contents, columns)
-        )
+        with jurisdiction.batch_tallies_file.open() as batch_tallies_file:
+            batch_tallies_csv = list(parse_csv(batch_tallies_file, columns))
 
         # Validate that the batch names match the ballot manifest
         jurisdiction_batch_names = {batch.name for batch in jurisdiction.batches}
@@ -86,6 +86,7 @@ def process_batch_tallies_file(
             }
             for row in batch_tallies_csv
         }
+        return len(batch_tallies_csv)
 
     process_file(session, file, process)
 
@@ -111,6 +112,7 @@ def validate_batch_tallies_upload(
 
 def clear_batch_tallies_file(jurisdiction: Jurisdiction):
     if jurisdiction.batch_tallies_file:
+        jurisdiction.batch_tallies_file.delete_contents()
         db_session.delete(jurisdiction.batch_tallies_file)
         jurisdiction.batch_tallies = None
 
@@ -133,9 +135,12 @@ def upload_batch_tallies(
     jurisdiction.batch_tallies_file = File(
         id=str(uuid.uuid4()),
         name=batch_tallies.filename,
-        contents=decode_csv_file(batch_tallies.read()),
         uploaded_at=datetime.utcnow(),
     )
+    jurisdiction.batch_tallies_file.save_contents(decode_csv_file(batch_tallies.read()))
+    queue_processing_job(
+        db_session, jurisdiction.batch_tallies_file, FileType.BATCH_TALLIES
+    )
     db_session.commit()
     return jsonify(status="ok")
 
@@ -165,9 +170,7 @@ def download_batch_tallies_file(
     if not jurisdiction.batch_tallies_file:
         return NotFound()
 
-    return csv_response(
-        jurisdiction.batch_tallies_file.contents, jurisdiction.batch_tallies_file.name
-    )
+    return csv_file_response(jurisdiction.batch_tallies_file)
 
 
 @api.route(
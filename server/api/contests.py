@@ -7,7 +7,7 @@ from . import api
 from ..auth import restrict_access, UserType
 from ..database import db_session
 from ..models import *  # pylint: disable=wildcard-import
-from .rounds import get_current_round
+from .rounds import get_current_round, get_latest_round
 from ..util.jsonschema import validate, JSONDict
 
 
@@ -124,7 +124,7 @@ def deserialize_contest(contest: JSONDict, election_id: str) -> Contest:
 
 # Raises if invalid
 def validate_contests(contests: List[JSONDict], election: Election):
-    if len(list(election.rounds)) > 0:
+    if get_latest_round(election):
         raise Conflict("Cannot update contests after audit has started.")
 
     validate(
@@ -1,11 +1,12 @@
 import uuid
-import io
-import tempfile
 import csv
 import typing
+from typing import Iterator, List, Optional, TextIO
+import itertools
 from collections import defaultdict
 import re
 from datetime import datetime
+import numpy
 from sqlalchemy.orm.session import Session
 from flask import request, jsonify, Request
 from werkzeug.exceptions import BadRequest, NotFound, Conflict
@@ -16,11 +17,13 @@ from ..models import *  # pylint: disable=wildcard-import
 from ..auth import restrict_access, UserType
 from ..util.process_file import (
     process_file,
+    queue_processing_job,
     serialize_file,
     serialize_file_processing,
 )
-from ..util.csv_download import csv_response
-from ..util.csv_parse import decode_csv_file
+from ..util.csv_download import csv_file_response
+from ..util.csv_parse import decode_csv_file, pluralize, CSVParseError
+from ..util.csv_stream import copy_rows
 from ..util.jsonschema import JSONDict
 from ..util.group_by import group_by
 
@@ -60,11 +63,100 @@ def set_contest_metadata_from_cvrs(contest: Contest):
             choice.num_votes += choice_metadata["num_votes"]
 
 
+# How many CVR rows to parse at a time
+CVR_CHUNK_SIZE = 50_000
+
+
+# In CvrBallot.interpretations, each interpretation column is packed into one
+# byte: the number of votes, or BLANK_INTERPRETATION if the cell was blank.
+BLANK_INTERPRETATION = 255
+
+
+def parse_interpretations(interpretation_rows: List[List[str]]) -> numpy.ndarray:
+    """
+    Parses the interpretation columns from a chunk of CVR rows into a matrix
+    with one row per ballot and one column per contest choice, packed the way
+    we store them in CvrBallot.interpretations.
+    """
+    cells = numpy.array(interpretation_rows, dtype=bytes)
+    is_blank = cells == b""
+    if cells.dtype.itemsize == 1:
+        # Interpretations are almost always a single digit, which we can
+        # convert much faster by looking at the raw bytes
+        votes = cells.view(numpy.uint8).astype(numpy.int64) - ord("0")
+        votes[is_blank] = 0
+        if ((votes < 0) | (votes > 9)).any():
+            raise ValueError("Invalid interpretation in CVR")
+    else:
+        votes = numpy.where(is_blank, b"0", cells).astype(numpy.int64)
+        if ((votes < 0) | (votes >= BLANK_INTERPRETATION)).any():
+            raise ValueError("Invalid interpretation in CVR")
+
+    interpretations = votes.astype(numpy.uint8)
+    interpretations[is_blank] = BLANK_INTERPRETATION
+    return interpretations
+
+
+def encode_interpretations(interpretations: numpy.ndarray) -> str:
+    # Formats one row of parsed interpretations as a bytea literal for COPY
+    return "\\x" + interpretations.tobytes().hex()
+
+
+def decode_interpretations(packed: bytes) -> List[Optional[int]]:
+    """
+    Unpacks CvrBallot.interpretations into the number of votes for each
+    interpretation column, or None if the cell was blank.
+    """
+    # psycopg2 gives us bytea values as memoryviews, so we copy them into
+    # bytes to iterate over them as ints.
+    return [None if value == BLANK_INTERPRETATION else value for value in bytes(packed)]
+
+
+def tally_cvr_votes(
+    contests_metadata: JSONDict,
+    contest_names: List[str],
+    contest_choices: List[str],
+    interpretations: numpy.ndarray,
+):
+    """
+    Adds the votes from a chunk of CVR rows (parsed with parse_interpretations)
+    to the running totals of num_votes for each contest choice and
+    total_ballots_cast for each contest in <contests_metadata>.
+
+    A contest is on a ballot if none of its interpretation columns are blank.
+    Overvotes (more votes than allowed) count towards total_ballots_cast, but
+    not towards num_votes.
+
+    Since the interpretations are a matrix, each contest can be tallied with a
+    few array operations over all the rows at once.
+    """
+    is_blank = interpretations == BLANK_INTERPRETATION
+    votes = interpretations.astype(numpy.int64)
+    votes[is_blank] = 0
+
+    contest_columns = group_by(
+        range(len(contest_names)), key=lambda column: contest_names[column]
+    )
+    for contest_name, columns in contest_columns.items():
+        contest_metadata = contests_metadata[contest_name]
+
+        on_ballot = ~is_blank[:, columns].any(axis=1)
+        contest_votes = votes[:, columns]
+        not_overvote = contest_votes.sum(axis=1) <= contest_metadata["votes_allowed"]
+        choice_votes = contest_votes[on_ballot & not_overvote].sum(axis=0)
+
+        for column, num_votes in zip(columns, choice_votes):
+            contest_metadata["choices"][contest_choices[column]]["num_votes"] += int(
+                num_votes
+            )
+        contest_metadata["total_ballots_cast"] += int(on_ballot.sum())
+
+
 def process_cvr_file(session: Session, jurisdiction: Jurisdiction, file: File):
     assert jurisdiction.cvr_file_id == file.id
 
-    def process():
-        cvrs = csv.reader(io.StringIO(jurisdiction.cvr_file.contents), delimiter=",")
+    def parse_cvrs(cvr_file: TextIO):
+        cvrs = csv.reader(cvr_file, delimiter=",")
 
         # Parse out all the initial metadata
         _election_name = next(cvrs)[0]
@@ -73,6 +165,7 @@ def process_cvr_file(session: Session, jurisdiction: Jurisdiction, file: File):
             c for c, value in enumerate(contest_row) if value != ""
         )
         contest_headers = contest_row[first_contest_column:]
+        num_columns = first_contest_column + len(contest_headers)
         contest_choices = next(cvrs)[first_contest_column:]
         _headers_and_affiliations = next(cvrs)
 
@@ -104,106 +197,123 @@ def process_cvr_file(session: Session, jurisdiction: Jurisdiction, file: File):
         batch_key_to_id = {
             (batch.tabulator, batch.name): batch.id for batch in jurisdiction.batches
         }
+        num_ballots = 0
 
         # Parse ballot rows and store them as CvrBallots. Since we may have
-        # millions of rows, we write this data into a tempfile and load it into
-        # the db using the COPY command (muuuuch faster than INSERT).
-        with tempfile.TemporaryFile(mode="w+") as ballots_tempfile:
-            ballots_csv = csv.writer(ballots_tempfile)
-            ballots_csv.writerow(
-                ["batch_id", "ballot_position", "imprinted_id", "interpretations"]
-            )
+        # millions of rows, we load them into the db using the COPY command
+        # (muuuuch faster than INSERT). Rather than writing all the rows to a
+        # file first, we parse them as COPY asks for them (see copy_rows), so
+        # parsing and loading overlap and we never hold more than a chunk of
+        # rows in memory.
+        def ballot_rows() -> Iterator[List[str]]:
+            nonlocal num_ballots
+            yield ["batch_id", "ballot_position", "imprinted_id", "interpretations"]
+
+            # We read the rows in chunks, so that we can parse and tally the
+            # interpretations for a whole chunk at once (see
+            # parse_interpretations and tally_cvr_votes).
+            while True:
+                rows = list(itertools.islice(cvrs, CVR_CHUNK_SIZE))
+                if not rows:
+                    break
+                num_ballots += len(rows)
+
+                # parse_interpretations needs every row to have a cell for each
+                # contest choice. Extra cells past the last contest are ignored.
+                for r, row in enumerate(rows):
+                    if len(row) < num_columns:
+                        # Rows are numbered from the top of the file, including
+                        # the four header rows
+                        row_number = num_ballots - len(rows) + r + 5
+                        raise CSVParseError(
+                            f"Wrong number of cells in row {row_number}."
+                            f" Expected {num_columns} {pluralize('cell', num_columns)},"
+                            f" got {len(row)} {pluralize('cell', len(row))}."
+                        )
 
-            for row in cvrs:
-                [
-                    _cvr_number,
-                    tabulator_number,
-                    batch_id,
-                    record_id,
-                    imprinted_id,
-                    *_,  # CountingGroup (maybe), PrecintPortion, BallotType
-                ] = row[:first_contest_column]
-                interpretations = row[first_contest_column:]
-                db_batch_id = batch_key_to_id[(tabulator_number, batch_id)]
-                ballots_csv.writerow(
+                interpretations = parse_interpretations(
+                    [row[first_contest_column:num_columns] for row in rows]
+                )
+
+                for row, row_interpretations in zip(rows, interpretations):
                     [
+                        _cvr_number,
+                        tabulator_number,
+                        batch_id,
+                        record_id,
+                        imprinted_id,
+                        *_,  # CountingGroup (maybe), PrecintPortion, BallotType
+                    ] = row[:first_contest_column]
+                    db_batch_id = batch_key_to_id[(tabulator_number, batch_id)]
+                    yield [
                         db_batch_id,
                         record_id,
                         imprinted_id,
-                        # Store the raw interpretation columns to save time/space -
-                        # we can parse them on demand for just the ballots that get
-                        # sampled using the contest metadata we stored above
-                        ",".join(interpretations),
+                        encode_interpretations(row_interpretations),
                     ]
-                )
 
                 # Add to our running totals for ContestChoice.num_votes and
                 # Contest.total_ballots_cast
-                contests_on_ballot = set()
-                interpretations_by_contest = group_by(
-                    zip(contest_names, contest_choices, interpretations),
-                    key=lambda tuple: tuple[0],  # contest_name
+                tally_cvr_votes(
+                    contests_metadata, contest_names, contest_choices, interpretations
                 )
-                for contest_name, interpretations in interpretations_by_contest.items():
-                    # Skip contests not on ballot
-                    if any(
-                        interpretation == "" for _, _, interpretation in interpretations
-                    ):
-                        continue
-                    contests_on_ballot.add(contest_name)
-
-                    # Skip overvotes
-                    votes = sum(
-                        int(interpretation) for _, _, interpretation in interpretations
+
+        # In order to use COPY, we have to bypass SQLAlchemy and use
+        # the underlying DBAPI (psycogp2). This means these commands
+        # will happen in a separate transaction from the surrounding
+        # context.
+        connection = db_engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("BEGIN")
+            # If a previous attempt at processing this file died partway
+            # through, clear out the ballots it loaded.
+            cursor.execute(
+                """
+                DELETE FROM cvr_ballot
+                USING batch
+                WHERE cvr_ballot.batch_id = batch.id
+                AND batch.jurisdiction_id = %s
+                """,
+                (jurisdiction.id,),
+            )
+            copy_rows(
+                cursor,
+                """
+                    COPY cvr_ballot
+                    FROM STDIN
+                    WITH (
+                        FORMAT CSV,
+                        DELIMITER ',',
+                        HEADER
                     )
-                    if votes > contests_metadata[contest_name]["votes_allowed"]:
-                        continue
-
-                    for _, choice_name, interpretation in interpretations:
-                        contests_metadata[contest_name]["choices"][choice_name][
-                            "num_votes"
-                        ] += int(interpretation)
-
-                for contest_name in contests_on_ballot:
-                    contests_metadata[contest_name]["total_ballots_cast"] += 1
-
-            jurisdiction.cvr_contests_metadata = contests_metadata
-
-            # In order to use COPY, we have to bypass SQLAlchemy and use
-            # the underlying DBAPI (psycogp2). This means these commands
-            # will happen in a separate transaction from the surrounding
-            # context.
-            connection = db_engine.raw_connection()
-            try:
-                cursor = connection.cursor()
-                cursor.execute("BEGIN")
-                ballots_tempfile.seek(0)
-                cursor.copy_expert(
-                    """
-                        COPY cvr_ballot
-                        FROM STDIN
-                        WITH (
-                            FORMAT CSV,
-                            DELIMITER ',',
-                            HEADER
-                        )
-                        """,
-                    ballots_tempfile,
-                )
-                cursor.execute("COMMIT")
-                cursor.close()
-                connection.commit()
-            except Exception as exc:
-                cursor.execute("ROLLBACK")
-                raise exc
-            finally:
-                connection.close()
+                    """,
+                ballot_rows(),
+            )
+            cursor.execute("COMMIT")
+            cursor.close()
+            connection.commit()
+        except Exception as exc:
+            cursor.execute("ROLLBACK")
+            raise exc
+        finally:
+            connection.close()
+
+        # Now that we've read all the rows, the vote totals are complete
+        jurisdiction.cvr_contests_metadata = contests_metadata
+        return num_ballots
+
+    def process():
+        with jurisdiction.cvr_file.open() as cvr_file:
+            return parse_cvrs(cvr_file)
 
     # Until we add validation/error handling to our CVR parsing, we'll just
-    # catch all errors and wrap them with a generic message.
+    # catch all other errors and wrap them with a generic message.
     def process_catch_exceptions():
         try:
-            process()
+            return process()
+        except CSVParseError:
+            raise
         except Exception as exc:
             raise Exception("Could not parse CVR file") from exc
 
@@ -229,15 +339,14 @@ def validate_cvr_upload(
 def save_cvr_file(cvr, jurisdiction: Jurisdiction):
     cvr_string = decode_csv_file(cvr.read())
     jurisdiction.cvr_file = File(
-        id=str(uuid.uuid4()),
-        name=cvr.filename,
-        contents=cvr_string,
-        uploaded_at=datetime.utcnow(),
+        id=str(uuid.uuid4()), name=cvr.filename, uploaded_at=datetime.utcnow(),
     )
+    jurisdiction.cvr_file.save_contents(cvr_string)
 
 
 def clear_cvr_file(jurisdiction: Jurisdiction):
     if jurisdiction.cvr_file_id:
+        jurisdiction.cvr_file.delete_contents()
         File.query.filter_by(id=jurisdiction.cvr_file_id).delete()
         CvrBallot.query.filter(
             CvrBallot.batch_id.in_(
@@ -259,6 +368,7 @@ def upload_cvrs(
     validate_cvr_upload(request, election, jurisdiction)
     clear_cvr_file(jurisdiction)
     save_cvr_file(request.files["cvrs"], jurisdiction)
+    queue_processing_job(db_session, jurisdiction.cvr_file, FileType.CVRS)
     db_session.commit()
     return jsonify(status="ok")
 
@@ -286,7 +396,7 @@ def download_cvr_file(
     if not jurisdiction.cvr_file:
         return NotFound()
 
-    return csv_response(jurisdiction.cvr_file.contents, jurisdiction.cvr_file.name)
+    return csv_file_response(jurisdiction.cvr_file)
 
 
 @api.route(
@@ -6,6 +6,7 @@ from ..auth import restrict_access, UserType
 from ..database import db_session
 from ..models import *  # pylint: disable=wildcard-import
 from ..util.jsonschema import validate, JSONDict
+from .rounds import get_latest_round
 
 
 ELECTION_SETTINGS_SCHEMA = {
@@ -69,7 +70,7 @@ def get_jurisdiction_election_settings(
 
 
 def validate_election_settings(settings: JSONDict, election: Election):
-    if len(list(election.rounds)) > 0:
+    if get_latest_round(election):
         raise Conflict("Cannot update settings after audit has started.")
 
     validate(settings, ELECTION_SETTINGS_SCHEMA)
@@ -6,17 +6,22 @@ import csv
 import io
 from flask import jsonify, request
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from werkzeug.exceptions import Conflict
 
 from . import api
 from ..models import *  # pylint: disable=wildcard-import
 from ..database import db_session
 from ..auth import restrict_access, UserType
-from .rounds import get_current_round
-from ..util.process_file import serialize_file, serialize_file_processing
+from .rounds import get_current_round, get_latest_round
+from ..util.process_file import (
+    serialize_file,
+    serialize_file_processing,
+    queue_processing_job,
+)
 from ..util.jsonschema import JSONDict
 from ..util.csv_parse import decode_csv_file
-from ..util.csv_download import csv_response
+from ..util.csv_download import csv_file_response
 
 
 def serialize_jurisdiction(
@@ -293,9 +298,21 @@ def list_jurisdictions(election: Election):
     current_round = get_current_round(election)
     round_status = round_status_by_jurisdiction(election, current_round)
 
+    # Load the files for all the jurisdictions up front, rather than one
+    # jurisdiction at a time as we serialize them.
+    jurisdictions = (
+        Jurisdiction.query.filter_by(election_id=election.id)
+        .order_by(Jurisdiction.name)
+        .options(
+            selectinload(Jurisdiction.manifest_file),
+            selectinload(Jurisdiction.batch_tallies_file),
+            selectinload(Jurisdiction.cvr_file),
+        )
+        .all()
+    )
     json_jurisdictions = [
         serialize_jurisdiction(election, jurisdiction, round_status[jurisdiction.id])
-        for jurisdiction in election.jurisdictions
+        for jurisdiction in jurisdictions
     ]
     return jsonify({"jurisdictions": json_jurisdictions})
 
@@ -315,9 +332,7 @@ def download_jurisdictions_file(election: Election):
     if not election.jurisdictions_file:
         return NotFound()
 
-    return csv_response(
-        election.jurisdictions_file.contents, election.jurisdictions_file.name
-    )
+    return csv_file_response(election.jurisdictions_file)
 
 
 JURISDICTION_NAME = "Jurisdiction"
@@ -327,7 +342,7 @@ ADMIN_EMAIL = "Admin Email"
 @api.route("/election/<election_id>/jurisdiction/file", methods=["PUT"])
 @restrict_access([UserType.AUDIT_ADMIN])
 def update_jurisdictions_file(election: Election):
-    if len(list(election.rounds)) > 0:
+    if get_latest_round(election):
         raise Conflict("Cannot update jurisdictions after audit has started.")
 
     if "jurisdictions" not in request.files:
@@ -346,14 +361,6 @@ def update_jurisdictions_file(election: Election):
     jurisdictions_file = request.files["jurisdictions"]
     jurisdictions_file_string = decode_csv_file(jurisdictions_file.read())
 
-    old_jurisdictions_file = election.jurisdictions_file
-    election.jurisdictions_file = File(
-        id=str(uuid.uuid4()),
-        name=jurisdictions_file.filename,
-        contents=jurisdictions_file_string,
-        uploaded_at=datetime.datetime.utcnow(),
-    )
-
     jurisdictions_csv = csv.DictReader(io.StringIO(jurisdictions_file_string))
 
     missing_fields = [
@@ -377,9 +384,21 @@ def update_jurisdictions_file(election: Election):
             400,
         )
 
+    old_jurisdictions_file = election.jurisdictions_file
+    election.jurisdictions_file = File(
+        id=str(uuid.uuid4()),
+        name=jurisdictions_file.filename,
+        uploaded_at=datetime.datetime.utcnow(),
+    )
+    election.jurisdictions_file.save_contents(jurisdictions_file_string)
+
     if old_jurisdictions_file:
+        old_jurisdictions_file.delete_contents()
         db_session.delete(old_jurisdictions_file)
     db_session.add(election)
+    queue_processing_job(
+        db_session, election.jurisdictions_file, FileType.JURISDICTIONS
+    )
     db_session.commit()
 
     return jsonify(status="ok")
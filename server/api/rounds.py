@@ -1,28 +1,64 @@
-import uuid
-from collections import defaultdict
-from typing import Optional, NamedTuple, List, Tuple, Dict, cast as typing_cast
+import uuid, traceback, multiprocessing
+from collections import defaultdict, OrderedDict
+from typing import (
+    Any,
+    Iterator,
+    Optional,
+    NamedTuple,
+    List,
+    Set,
+    Tuple,
+    Dict,
+    cast as typing_cast,
+)
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from flask import jsonify, request
 from jsonschema import validate
 from werkzeug.exceptions import BadRequest, Conflict
-from sqlalchemy import and_
+from sqlalchemy import and_, update
+from sqlalchemy.orm.session import Session
+from psycopg2.extras import execute_values
 
 from . import api
-from ..database import db_session
+from ..database import db_session, engine
 from ..models import *  # pylint: disable=wildcard-import
 from ..auth import restrict_access, UserType
+from ..config import SAMPLE_PROCESSES
 from . import sample_sizes as sample_sizes_module
 from ..util.isoformat import isoformat
+from ..util.process_file import (
+    MAX_PROCESSING_JOB_ATTEMPTS,
+    PROCESSING_JOB_LEASE,
+    notify_bgcompute,
+)
 from ..util.group_by import group_by
 from ..util.jsonschema import JSONDict
 from ..audit_math import sampler, ballot_polling, macro, supersimple, sampler_contest
-from .cvrs import set_contest_metadata_from_cvrs
+from .cvrs import set_contest_metadata_from_cvrs, BLANK_INTERPRETATION
+
+
+def is_sample_drawn(round: Round) -> bool:
+    return round.draw_sample_completed_at is not None and not round.draw_sample_error
 
 
 def get_current_round(election: Election) -> Optional[Round]:
-    if len(list(election.rounds)) == 0:
+    # A round only becomes the current round once its sample has been drawn.
+    # Until then, jurisdictions keep seeing the previous round.
+    drawn_rounds = [r for r in election.rounds if is_sample_drawn(r)]
+    if len(drawn_rounds) == 0:
+        return None
+    return max(drawn_rounds, key=lambda r: r.round_num)
+
+
+def get_latest_round(election: Election) -> Optional[Round]:
+    # The newest round, including one whose sample is still being drawn. A
+    # round whose draw failed doesn't count, since the audit admin can create
+    # it again (see create_round).
+    rounds = [r for r in election.rounds if not r.draw_sample_error]
+    if len(rounds) == 0:
         return None
-    return max(election.rounds, key=lambda r: r.round_num)
+    return max(rounds, key=lambda r: r.round_num)
 
 
 def get_previous_round(election: Election, round: Round) -> Optional[Round]:
@@ -117,7 +153,14 @@ def count_audited_votes(election: Election, round: Round):
 # Get round-by-round audit results
 def contest_results_by_round(contest: Contest) -> Dict[str, Dict[str, int]]:
     results_by_round: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    for result in contest.results:
+    # List the rounds in order, since some audit math (e.g. Minerva) depends
+    # on how many votes were sampled in each round.
+    results = (
+        RoundContestResult.query.filter_by(contest_id=contest.id)
+        .join(Round)
+        .order_by(Round.round_num)
+    )
+    for result in results:
         results_by_round[result.round_id][result.contest_choice_id] = result.result
     return results_by_round
 
@@ -209,52 +252,224 @@ def round_sizes(election: Election) -> Dict[int, int]:
     )
 
 
-def cvrs_for_contest(contest: Contest) -> supersimple.CVRS:
-    choice_name_to_id = {choice.name: choice.id for choice in contest.choices}
+# The CVR for each sampled ballot, or None if the ballot has no CVR
+CachedCvrs = Dict[str, Optional[supersimple.CVR]]
+
+
+# Loading the CVRs for the sampled ballots means reaching into the (big)
+# cvr_ballot table, and we need them every time we compute risk measurements,
+# sample size options, or a report. So we cache the CVRs for each contest. As
+# with the sample size cache (see sample_sizes.py), each entry records a
+# fingerprint of the CVR files and contest choices it was loaded from, and is
+# only used if the fingerprint still matches. The set of sampled ballots only
+# grows as the audit goes on, so when more ballots have been sampled, we just
+# load the CVRs for the new ballots and add them to the entry.
+class CvrCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # Each entry is (fingerprint, latest sampled ballot created_at, CVRS).
+        # Sampled ballots that don't have a CVR are included in the entry
+        # with a CVR of None, so we can tell which ballots we've seen.
+        self.entries: "OrderedDict[str, Tuple[Any, Optional[datetime], CachedCvrs]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.updates = 0
+        self.misses = 0
+
+    def get_or_load(
+        self,
+        key: str,
+        fingerprint: Any,
+        num_sampled_ballots: int,
+        latest_sampled_at: Optional[datetime],
+        load,
+    ) -> supersimple.CVRS:
+        cvrs = None
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            _, entry_latest_sampled_at, entry_cvrs = entry
+            if (
+                len(entry_cvrs) == num_sampled_ballots
+                and entry_latest_sampled_at == latest_sampled_at
+            ):
+                self.hits += 1
+                cvrs = entry_cvrs
+            elif entry_latest_sampled_at is not None:
+                new_cvrs = {**entry_cvrs, **load(entry_latest_sampled_at)}
+                # If ballots were removed from the sample (e.g. a round was
+                # undone), or some were sampled that we missed, we fall back
+                # to loading all of them.
+                if len(new_cvrs) == num_sampled_ballots:
+                    self.updates += 1
+                    cvrs = new_cvrs
+
+        if cvrs is None:
+            self.misses += 1
+            cvrs = load(None)
+
+        self.entries[key] = (fingerprint, latest_sampled_at, cvrs)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+        return {ballot_id: cvr for ballot_id, cvr in cvrs.items() if cvr is not None}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.updates = 0
+        self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "updates": self.updates,
+            "misses": self.misses,
+            "size": len(self.entries),
+        }
 
-    cvrs: supersimple.CVRS = {}
 
+# Keyed by contest id
+cvr_cache = CvrCache(max_size=100)
+
+
+def load_cvrs_for_contest(
+    contest: Contest, sampled_after: Optional[datetime], round: Optional[Round] = None,
+) -> CachedCvrs:
+    """
+    Loads the CVRs for the contest's sampled ballots (only those sampled after
+    <sampled_after>, or drawn in <round>, if given). Sampled ballots without a
+    CVR get None.
+    """
+    choice_name_to_id = {choice.name: choice.id for choice in contest.choices}
+
+    # Each jurisdiction's CVR may have the contest choices in different
+    # columns, so we look up the column index for each choice that we saved
+    # when we parsed the CVR. Jurisdictions that export their CVRs the same way
+    # usually share the same columns, so we group the jurisdictions by their
+    # column layout and load the ballots for each layout with one query.
+    jurisdiction_ids_by_layout: Dict[
+        Tuple[Tuple[str, int], ...], List[str]
+    ] = defaultdict(list)
     for jurisdiction in contest.jurisdictions:
         cvr_contests_metadata = typing_cast(
             JSONDict, jurisdiction.cvr_contests_metadata
         )
         choices_metadata = cvr_contests_metadata[contest.name]["choices"]
+        layout = tuple(
+            (choice_name_to_id[choice_name], choice_metadata["column"])
+            for choice_name, choice_metadata in choices_metadata.items()
+        )
+        jurisdiction_ids_by_layout[layout].append(jurisdiction.id)
 
-        interpretations_by_ballot = (
-            CvrBallot.query.join(Batch)
-            .filter_by(jurisdiction_id=jurisdiction.id)
-            .join(
-                SampledBallot,
+    cvrs: CachedCvrs = {}
+
+    for layout, jurisdiction_ids in jurisdiction_ids_by_layout.items():
+        # Pick out just the interpretation for each contest choice from the
+        # packed interpretations in SQL, so we only load the bytes we need.
+        choice_ids = [choice_id for choice_id, _ in layout]
+        choice_columns = [
+            func.get_byte(CvrBallot.interpretations, column) for _, column in layout
+        ]
+        sampled_ballots = (
+            SampledBallot.query.join(Batch)
+            .filter(Batch.jurisdiction_id.in_(jurisdiction_ids))
+            .outerjoin(
+                CvrBallot,
                 and_(
                     CvrBallot.batch_id == SampledBallot.batch_id,
                     CvrBallot.ballot_position == SampledBallot.ballot_position,
                 ),
             )
-            .values(SampledBallot.id, CvrBallot.interpretations)
+        )
+        if sampled_after is not None:
+            sampled_ballots = sampled_ballots.filter(
+                SampledBallot.created_at > sampled_after
+            )
+        if round is not None:
+            sampled_ballots = sampled_ballots.filter(
+                SampledBallot.id.in_(
+                    SampledBallotDraw.query.filter_by(round_id=round.id).with_entities(
+                        SampledBallotDraw.ballot_id
+                    )
+                )
+            )
+        interpretations_by_ballot = sampled_ballots.values(
+            SampledBallot.id, CvrBallot.batch_id, *choice_columns
         )
 
-        for ballot_key, interpretations_str in interpretations_by_ballot:
-            ballot_cvr: supersimple.CVR = {contest.id: {}}
-            # interpretations is the raw CVR string: 1,0,0,1,0,1,0. We need to
-            # pick out the interpretation for each contest choice. We saved the
-            # column index for each choice when we parsed the CVR.
-            interpretations = interpretations_str.split(",")
-            for choice_name, choice_metadata in choices_metadata.items():
-                interpretation = interpretations[choice_metadata["column"]]
-                # If the interpretations are empty, it means the contest wasn't
-                # on the ballot, so we should skip this contest entirely for
-                # this ballot.
-                if interpretation == "":
-                    ballot_cvr = {}
-                else:
-                    choice_id = choice_name_to_id[choice_name]
-                    ballot_cvr[contest.id][choice_id] = int(interpretation)
-
-            cvrs[ballot_key] = ballot_cvr
+        for ballot_key, cvr_batch_id, *interpretations in interpretations_by_ballot:
+            if cvr_batch_id is None:
+                cvrs[ballot_key] = None
+            # If the interpretations are blank, it means the contest wasn't
+            # on the ballot, so we should skip this contest entirely for
+            # this ballot.
+            elif BLANK_INTERPRETATION in interpretations:
+                cvrs[ballot_key] = {}
+            else:
+                cvrs[ballot_key] = {contest.id: dict(zip(choice_ids, interpretations))}
 
     return cvrs
 
 
+def cvrs_for_contest(contest: Contest) -> supersimple.CVRS:
+    jurisdiction_ids = [jurisdiction.id for jurisdiction in contest.jurisdictions]
+    cvr_files = (
+        Jurisdiction.query.filter(Jurisdiction.id.in_(jurisdiction_ids))
+        .outerjoin(File, Jurisdiction.cvr_file_id == File.id)
+        .order_by(Jurisdiction.id)
+        .with_entities(Jurisdiction.id, File.id, File.processing_completed_at)
+        .all()
+    )
+    fingerprint = (
+        contest.name,
+        tuple((choice.id, choice.name) for choice in contest.choices),
+        tuple(tuple(cvr_file) for cvr_file in cvr_files),
+    )
+    num_sampled_ballots, latest_sampled_at = (
+        SampledBallot.query.join(Batch)
+        .filter(Batch.jurisdiction_id.in_(jurisdiction_ids))
+        .with_entities(func.count(SampledBallot.id), func.max(SampledBallot.created_at))
+        .one()
+    )
+    return cvr_cache.get_or_load(
+        contest.id,
+        fingerprint,
+        num_sampled_ballots,
+        latest_sampled_at,
+        lambda sampled_after: load_cvrs_for_contest(contest, sampled_after),
+    )
+
+
+def audited_ballot_cvr(
+    contest: Contest, ballot: SampledBallot
+) -> Optional[supersimple.CVR]:
+    # The CVR we build should have a 1 for each choice that got voted for,
+    # and a 0 otherwise. There are a couple special cases:
+    # - Contest wasn't on the ballot - CVR should be an empty object
+    # - Audit board couldn't find the ballot - CVR should be None
+    if ballot.status == BallotStatus.NOT_FOUND:
+        return None
+
+    interpretation = next(
+        (
+            interpretation
+            for interpretation in ballot.interpretations
+            if interpretation.contest_id == contest.id
+        ),
+        None,
+    )
+    if interpretation is None:  # Contest not on ballot
+        return {}
+
+    ballot_cvr = {contest.id: {choice.id: 0 for choice in contest.choices}}
+    if interpretation.interpretation == Interpretation.VOTE:
+        for choice in interpretation.selected_choices:
+            ballot_cvr[contest.id][choice.id] = 1
+    return ballot_cvr
+
+
 def sampled_ballot_interpretations_to_cvrs(contest: Contest) -> supersimple.SAMPLE_CVRS:
     ballots_query = (
         SampledBallot.query.join(Batch)
@@ -274,35 +489,138 @@ def sampled_ballot_interpretations_to_cvrs(contest: Contest) -> supersimple.SAMP
     else:
         ballots = ballots_query.with_entities(SampledBallot, literal(1)).all()
 
-    # The CVR we build should have a 1 for each choice that got voted for,
-    # and a 0 otherwise. There are a couple special cases:
-    # - Contest wasn't on the ballot - CVR should be an empty object
-    # - Audit board couldn't find the ballot - CVR should be None
     cvrs: supersimple.SAMPLE_CVRS = {}
     for ballot, times_sampled in ballots:
-        if ballot.status == BallotStatus.NOT_FOUND:
-            cvrs[ballot.id] = {"times_sampled": times_sampled, "cvr": None}
+        if ballot.status in [BallotStatus.AUDITED, BallotStatus.NOT_FOUND]:
+            cvrs[ballot.id] = {
+                "times_sampled": times_sampled,
+                "cvr": audited_ballot_cvr(contest, ballot),
+            }
 
-        elif ballot.status == BallotStatus.AUDITED:
-            interpretation = next(
-                (
-                    interpretation
-                    for interpretation in ballot.interpretations
-                    if interpretation.contest_id == contest.id
-                ),
-                None,
+    return cvrs
+
+
+def round_sampled_ballot_interpretations_to_cvrs(
+    contest: Contest, round: Round
+) -> Tuple[supersimple.SAMPLE_CVRS, Set[str]]:
+    """
+    Like sampled_ballot_interpretations_to_cvrs, but only for the ballots
+    drawn in <round>, counting just the times they were sampled in <round>.
+    Also returns which of the ballots were sampled for the contest for the
+    first time in <round>.
+    """
+    earlier_round = Round.round_num < round.round_num
+    this_round = SampledBallotDraw.round_id == round.id
+    ballots_query = (
+        SampledBallot.query.join(Batch)
+        .join(Jurisdiction)
+        .filter(Jurisdiction.contests.contains(contest))
+        .join(SampledBallotDraw)
+        .join(Round, SampledBallotDraw.round_id == Round.id)
+        .filter(Round.round_num <= round.round_num)
+        .group_by(SampledBallot.id)
+        .having(func.count().filter(this_round) > 0)
+    )
+    # For targeted contests, count the number of times the ballot was sampled
+    # for the contest
+    if contest.is_targeted:
+        ballots = (
+            ballots_query.filter(SampledBallotDraw.contest_id == contest.id)
+            .with_entities(
+                SampledBallot,
+                func.count().filter(this_round),
+                func.count().filter(earlier_round) == 0,
             )
-            if interpretation is None:  # Contest not on ballot
-                ballot_cvr = {}
-            else:
-                ballot_cvr = {contest.id: {choice.id: 0 for choice in contest.choices}}
-                if interpretation.interpretation == Interpretation.VOTE:
-                    for choice in interpretation.selected_choices:
-                        ballot_cvr[contest.id][choice.id] = 1
+            .all()
+        )
+    # For opportunistic contests, we say each ballot was only sampled once,
+    # so we only count ballots that weren't sampled in an earlier round
+    else:
+        ballots = (
+            ballots_query.having(func.count().filter(earlier_round) == 0)
+            .with_entities(SampledBallot, literal(1), literal(True))
+            .all()
+        )
 
-            cvrs[ballot.id] = {"times_sampled": times_sampled, "cvr": ballot_cvr}
+    cvrs: supersimple.SAMPLE_CVRS = {}
+    first_sampled = set()
+    for ballot, times_sampled, is_first_sampled in ballots:
+        if ballot.status in [BallotStatus.AUDITED, BallotStatus.NOT_FOUND]:
+            cvrs[ballot.id] = {
+                "times_sampled": times_sampled,
+                "cvr": audited_ballot_cvr(contest, ballot),
+            }
+            if is_first_sampled:
+                first_sampled.add(ballot.id)
 
-    return cvrs
+    return cvrs, first_sampled
+
+
+def supersimple_risk_state(
+    election: Election, round: Round, contest: Contest
+) -> supersimple.RiskState:
+    """
+    Computes the running state of the risk measurement for <contest> as of
+    the end of <round>. If we have the state from the previous round, we just
+    fold in the ballots sampled this round.
+    """
+    if round.round_num == 1:
+        previous_state = supersimple.initial_risk_state()
+    else:
+        previous_round = get_previous_round(election, round)
+        assert previous_round
+        previous_round_contest = RoundContest.query.get((previous_round.id, contest.id))
+        previous_state = previous_round_contest and previous_round_contest.risk_state
+
+    if previous_state:
+        round_cvrs, first_sampled = round_sampled_ballot_interpretations_to_cvrs(
+            contest, round
+        )
+        state = supersimple.update_risk_state(
+            previous_state,
+            sampler_contest.from_db_contest(contest),
+            {
+                ballot_id: cvr
+                for ballot_id, cvr in load_cvrs_for_contest(
+                    contest, None, round
+                ).items()
+                if cvr is not None
+            },
+            round_cvrs,
+            first_sampled,
+        )
+
+        # Check that the ballots we've counted match the whole sample. If they
+        # don't (e.g. a ballot from an earlier round was audited late), we
+        # start over from scratch.
+        audited_ballots = (
+            SampledBallot.query.join(Batch)
+            .join(Jurisdiction)
+            .filter(Jurisdiction.contests.contains(contest))
+            .filter(
+                SampledBallot.status.in_([BallotStatus.AUDITED, BallotStatus.NOT_FOUND])
+            )
+        )
+        if contest.is_targeted:
+            num_ballots, num_draws = (
+                audited_ballots.join(SampledBallotDraw)
+                .filter_by(contest_id=contest.id)
+                .with_entities(func.count(SampledBallot.id.distinct()), func.count())
+                .one()
+            )
+        else:
+            num_ballots = num_draws = audited_ballots.count()
+        if (state["num_ballots"], state["num_draws"]) == (num_ballots, num_draws):
+            return state
+
+    sample_cvrs = sampled_ballot_interpretations_to_cvrs(contest)
+    return supersimple.update_risk_state(
+        supersimple.initial_risk_state(),
+        sampler_contest.from_db_contest(contest),
+        cvrs_for_contest(contest),
+        sample_cvrs,
+        set(sample_cvrs),
+    )
 
 
 def calculate_risk_measurements(election: Election, round: Round):
@@ -330,11 +648,11 @@ def calculate_risk_measurements(election: Election, round: Round):
             )
         else:
             assert election.audit_type == AuditType.BALLOT_COMPARISON
-            p_value, is_complete = supersimple.compute_risk(
+            round_contest.risk_state = supersimple_risk_state(election, round, contest)
+            p_value, is_complete = supersimple.risk_from_state(
                 election.risk_limit,
                 sampler_contest.from_db_contest(contest),
-                cvrs_for_contest(contest),
-                sampled_ballot_interpretations_to_cvrs(contest),
+                round_contest.risk_state,
             )
 
         round_contest.end_p_value = p_value
@@ -434,7 +752,63 @@ class BallotDraw(NamedTuple):
     ticket_number: str
 
 
-def draw_sample(election: Election, round: Round, sample_sizes: Dict[str, int]):
+def load_sampler_state(contest: Contest) -> Optional[sampler.SamplerState]:
+    contest_sampler_state = ContestSamplerState.query.get(contest.id)
+    return (
+        typing_cast(sampler.SamplerState, contest_sampler_state.state)
+        if contest_sampler_state
+        else None
+    )
+
+
+def save_sampler_state(contest: Contest, state: sampler.SamplerState):
+    db_session.merge(ContestSamplerState(contest_id=contest.id, state=state))
+
+
+class DrawSampleProgress:
+    """
+    Reports the progress of drawing the sample for a round, so that the audit
+    admin can poll for it while the sample is being drawn.
+    """
+
+    def __init__(self, round_id: str):
+        self.round_id = round_id
+        self.total_contests = 0
+        self.contests_drawn = 0
+        self.rows_written = 0
+
+    def contest_drawn(self):
+        self.contests_drawn += 1
+        self.save()
+
+    def wrote_rows(self, num_rows: int):
+        self.rows_written += num_rows
+        self.save()
+
+    def to_json(self) -> JSONDict:
+        return {
+            "contestsDrawn": self.contests_drawn,
+            "totalContests": self.total_contests,
+            "rowsWritten": self.rows_written,
+        }
+
+    def save(self):
+        # The sample is written in one transaction, so we record the progress
+        # in a separate transaction to make it visible before then.
+        with engine.begin() as connection:
+            connection.execute(
+                update(Round.__table__)  # pylint: disable=no-member
+                .where(Round.id == self.round_id)
+                .values(draw_sample_progress=self.to_json())
+            )
+
+
+def draw_sample(
+    election: Election,
+    round: Round,
+    sample_sizes: Dict[str, int],
+    progress: DrawSampleProgress,
+):
     # Figure out which contests still need auditing
     previous_round = get_previous_round(election, round)
     contests_that_havent_met_risk_limit = (
@@ -465,10 +839,38 @@ def draw_sample(election: Election, round: Round, sample_sizes: Dict[str, int]):
         if contest.is_targeted
     ]
 
+    progress.total_contests = len(contests_to_sample)
     if election.audit_type == AuditType.BATCH_COMPARISON:
-        return sample_batches(election, round, contests_to_sample, sample_sizes)
+        return sample_batches(
+            election, round, contests_to_sample, sample_sizes, progress
+        )
     else:
-        return sample_ballots(election, round, contests_to_sample, sample_sizes)
+        return sample_ballots(
+            election, round, contests_to_sample, sample_sizes, progress
+        )
+
+
+def draw_contest_samples(
+    sampler_args: List[tuple],
+) -> Iterator[Tuple[List[Tuple[str, Tuple[Any, int], int]], sampler.SamplerState]]:
+    # Each contest's sample is independent of the others, so if configured
+    # to, we draw them in parallel in separate processes (the sampling is
+    # CPU-bound). The results come back in the same order as the arguments,
+    # so the sample is the same as if we drew it serially.
+    #
+    # We start the processes fresh (rather than forking), since we're running
+    # in a bgcompute worker that has other threads and open db connections,
+    # which a forked child would inherit. The children only need the sampler,
+    # so they never connect to the db.
+    if SAMPLE_PROCESSES > 1 and len(sampler_args) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(SAMPLE_PROCESSES, len(sampler_args)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            yield from executor.map(sampler.resume_sample, *zip(*sampler_args))
+    else:
+        for args in sampler_args:
+            yield sampler.resume_sample(*args)
 
 
 def sample_ballots(
@@ -476,8 +878,9 @@ def sample_ballots(
     round: Round,
     contests: List[Contest],
     sample_sizes: Dict[str, int],
+    progress: DrawSampleProgress,
 ):
-    def draw_sample_for_contest(contest: Contest, sample_size: int) -> List[BallotDraw]:
+    def sampler_args_for_contest(contest: Contest, sample_size: int) -> tuple:
         # Compute the total number of ballot samples in all rounds leading up to
         # this one. Note that this corresponds to the number of SampledBallotDraws,
         # not SampledBallots.
@@ -498,24 +901,37 @@ def sample_ballots(
             for batch in jurisdiction.batches
         }
 
-        # Do the math! i.e. compute the actual sample
-        sample = sampler.draw_sample(
-            str(election.random_seed), manifest, sample_size, num_previously_sampled
+        # We pick up from where the sampler left off in the previous round, so
+        # we only have to draw the new tickets.
+        return (
+            str(election.random_seed),
+            manifest,
+            sample_size,
+            num_previously_sampled,
+            load_sampler_state(contest),
         )
-        return [
-            BallotDraw(
-                ballot_key=ballot_key,
-                contest_id=contest.id,
-                ticket_number=ticket_number,
-            )
-            for (ticket_number, ballot_key, _) in sample
-        ]
 
-    # Draw a sample for each targeted contest
-    samples = [
-        draw_sample_for_contest(contest, sample_sizes[contest.id])
-        for contest in contests
-    ]
+    # Do the math! i.e. compute the actual sample for each targeted contest.
+    contest_samples = draw_contest_samples(
+        [
+            sampler_args_for_contest(contest, sample_sizes[contest.id])
+            for contest in contests
+        ]
+    )
+    samples = []
+    for contest, (sample, sampler_state) in zip(contests, contest_samples):
+        save_sampler_state(contest, sampler_state)
+        progress.contest_drawn()
+        samples.append(
+            [
+                BallotDraw(
+                    ballot_key=ballot_key,
+                    contest_id=contest.id,
+                    ticket_number=ticket_number,
+                )
+                for (ticket_number, ballot_key, _) in sample
+            ]
+        )
 
     # Group all sample draws by ballot
     sample_draws_by_ballot = group_by(
@@ -542,30 +958,106 @@ def sample_ballots(
     # SampledBallotDraw. That way we can ensure that we don't need to actually
     # look at a real-world ballot that we've already audited, even if it gets
     # sampled again.
+    # Since a round can sample tens of thousands of ballots, we look up the
+    # ballots sampled in previous rounds with one query and insert the new rows
+    # in bulk, rather than going through the ORM one ballot at a time.
+    sampled_batch_ids = {
+        batch_key_to_id[batch_key] for (batch_key, _) in sample_draws_by_ballot
+    }
+    previously_sampled_ballot_ids = {
+        (batch_id, ballot_position): ballot_id
+        for (ballot_id, batch_id, ballot_position) in SampledBallot.query.filter(
+            SampledBallot.batch_id.in_(sampled_batch_ids)
+        ).values(
+            SampledBallot.id, SampledBallot.batch_id, SampledBallot.ballot_position
+        )
+    }
+
+    now = datetime.utcnow()
+    new_sampled_ballots = []
+    new_sampled_ballot_draws = []
     for ballot_key, sample_draws in sample_draws_by_ballot.items():
         batch_key, ballot_position = ballot_key
         batch_id = batch_key_to_id[batch_key]
 
-        sampled_ballot = SampledBallot.query.filter_by(
-            batch_id=batch_id, ballot_position=ballot_position
-        ).first()
-        if not sampled_ballot:
-            sampled_ballot = SampledBallot(
-                id=str(uuid.uuid4()),
-                batch_id=batch_id,
-                ballot_position=ballot_position,
-                status=BallotStatus.NOT_AUDITED,
+        ballot_id = previously_sampled_ballot_ids.get((batch_id, ballot_position))
+        if not ballot_id:
+            ballot_id = str(uuid.uuid4())
+            new_sampled_ballots.append(
+                (
+                    ballot_id,
+                    batch_id,
+                    ballot_position,
+                    BallotStatus.NOT_AUDITED.value,
+                    now,
+                    now,
+                )
             )
-            db_session.add(sampled_ballot)
 
         for sample_draw in sample_draws:
-            sampled_ballot_draw = SampledBallotDraw(
-                ballot_id=sampled_ballot.id,
-                round_id=round.id,
-                contest_id=sample_draw.contest_id,
-                ticket_number=sample_draw.ticket_number,
+            new_sampled_ballot_draws.append(
+                (
+                    ballot_id,
+                    round.id,
+                    sample_draw.contest_id,
+                    sample_draw.ticket_number,
+                    now,
+                    now,
+                )
             )
-            db_session.add(sampled_ballot_draw)
+
+    # Make sure the round has been written before we insert rows that refer to
+    # it, since we're bypassing the session.
+    db_session.flush()
+    bulk_insert(
+        "sampled_ballot",
+        ["id", "batch_id", "ballot_position", "status", "created_at", "updated_at"],
+        new_sampled_ballots,
+        progress,
+    )
+    bulk_insert(
+        "sampled_ballot_draw",
+        [
+            "ballot_id",
+            "round_id",
+            "contest_id",
+            "ticket_number",
+            "created_at",
+            "updated_at",
+        ],
+        new_sampled_ballot_draws,
+        progress,
+    )
+
+
+BULK_INSERT_PAGE_SIZE = 1000
+
+
+def bulk_insert(
+    table_name: str,
+    columns: List[str],
+    rows: List[tuple],
+    progress: Optional[DrawSampleProgress] = None,
+):
+    # Uses psycopg2's execute_values to insert many rows with a few multi-row
+    # INSERT statements. Unlike COPY (see api/cvrs.py), this runs on the
+    # session's connection, so the rows are part of the current transaction.
+    if not rows:
+        return
+    cursor = db_session.connection().connection.cursor()
+    try:
+        for start in range(0, len(rows), BULK_INSERT_PAGE_SIZE):
+            page = rows[start : start + BULK_INSERT_PAGE_SIZE]
+            execute_values(
+                cursor,
+                f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s",
+                page,
+                page_size=BULK_INSERT_PAGE_SIZE,
+            )
+            if progress:
+                progress.wrote_rows(len(page))
+    finally:
+        cursor.close()
 
 
 def sample_batches(
@@ -573,6 +1065,7 @@ def sample_batches(
     round: Round,
     contests: List[Contest],
     sample_sizes: Dict[str, int],
+    progress: DrawSampleProgress,
 ):
     # We only support one contest for batch audits
     assert len(contests) == 1
@@ -596,13 +1089,23 @@ def sample_batches(
         for jurisdiction_name, batch_name, batch_id in batches
     }
 
-    sample = sampler.draw_ppeb_sample(
+    # Audits that drew their first round before we switched to sampling from
+    # the cumulative error bounds keep using the original sampler, so that
+    # later rounds follow on from the batches they already sampled.
+    if election.ppeb_sampler is None:
+        election.ppeb_sampler = PpebSampler.CUMULATIVE_ERRORS
+    draw_ppeb_sample = {
+        PpebSampler.DUPLICATED_BATCHES: sampler.draw_ppeb_sample_duplicated_batches,
+        PpebSampler.CUMULATIVE_ERRORS: sampler.draw_ppeb_sample,
+    }[PpebSampler(election.ppeb_sampler)]
+    sample = draw_ppeb_sample(
         str(election.random_seed),
         sampler_contest.from_db_contest(contest),
         sample_sizes[contest.id],
         num_previously_sampled,
         batch_tallies(election),
     )
+    progress.contest_drawn()
 
     for (ticket_number, batch_key, _) in sample:
         sampled_batch_draw = SampledBatchDraw(
@@ -611,6 +1114,8 @@ def sample_batches(
             ticket_number=ticket_number,
         )
         db_session.add(sampled_batch_draw)
+    db_session.flush()
+    progress.wrote_rows(len(sample))
 
 
 CREATE_ROUND_REQUEST_SCHEMA = {
@@ -630,7 +1135,7 @@ CREATE_ROUND_REQUEST_SCHEMA = {
 def validate_round(round: dict, election: Election):
     validate(round, CREATE_ROUND_REQUEST_SCHEMA)
 
-    current_round = get_current_round(election)
+    current_round = get_latest_round(election)
     next_round_num = current_round.round_num + 1 if current_round else 1
     if round["roundNum"] != next_round_num:
         raise BadRequest(f"The next round should be round number {next_round_num}")
@@ -646,34 +1151,55 @@ def validate_round(round: dict, election: Election):
         if set(round["sampleSizes"].keys()) != targeted_contest_ids:
             raise BadRequest("Sample sizes provided do not match targeted contest ids")
 
+    # Check that the batch tallies are valid now, rather than waiting until we
+    # draw the sample in the background.
+    if election.audit_type == AuditType.BATCH_COMPARISON:
+        batch_tallies(election)
+
+
+def is_retry(json_round: dict, current_round: Optional[Round]) -> bool:
+    # If a request to create a round is retried (e.g. if the first request
+    # timed out), we treat it as the same request rather than trying to create
+    # another round.
+    return (
+        current_round is not None
+        and current_round.ended_at is None
+        and json_round.get("roundNum") == current_round.round_num
+        and json_round.get("sampleSizes") == current_round.requested_sample_sizes
+    )
+
 
 @api.route("/election/<election_id>/round", methods=["POST"])
 @restrict_access([UserType.AUDIT_ADMIN])
 def create_round(election: Election):
     json_round = request.get_json()
+    # Check the shape of the request before comparing it to the latest round
+    validate(json_round, CREATE_ROUND_REQUEST_SCHEMA)
+    if is_retry(json_round, get_latest_round(election)):
+        return jsonify({"status": "ok"})
+
     validate_round(json_round, election)
 
+    # If we failed to draw the sample for this round before, start over.
+    for failed_round in election.rounds:
+        if failed_round.draw_sample_error:
+            db_session.delete(failed_round)
+    db_session.flush()
+
+    # We don't draw the sample here, since that can take longer than a
+    # request is allowed to take. Instead, we record the round and let the
+    # background worker draw the sample (see process_draw_sample). The client
+    # can check on it with get_draw_sample_status.
     round = Round(
-        id=str(uuid.uuid4()), election_id=election.id, round_num=json_round["roundNum"],
+        id=str(uuid.uuid4()),
+        election_id=election.id,
+        round_num=json_round["roundNum"],
+        # For round 1, use the given sample size for each contest. In later
+        # rounds, we select a sample size automatically.
+        requested_sample_sizes=json_round.get("sampleSizes"),
     )
     db_session.add(round)
 
-    # For round 1, use the given sample size for each contest.
-    if json_round["roundNum"] == 1:
-        sample_sizes = json_round["sampleSizes"]
-    # In later rounds, select a sample size automatically.
-    else:
-        sample_size_options = sample_sizes_module.sample_size_options(election)
-        sample_size_key = {
-            AuditType.BALLOT_POLLING: "0.9",
-            AuditType.BATCH_COMPARISON: "macro",
-            AuditType.BALLOT_COMPARISON: "supersimple",
-        }[AuditType(election.audit_type)]
-        sample_sizes = {
-            contest_id: options[sample_size_key]["size"]
-            for contest_id, options in sample_size_options.items()
-        }
-
     # For ballot comparison audits, we need to lock in the contest metadata we
     # parse from the CVRs when we launch the audit.
     if (
@@ -683,13 +1209,135 @@ def create_round(election: Election):
         for contest in election.contests:
             set_contest_metadata_from_cvrs(contest)
 
-    draw_sample(election, round, sample_sizes)
-
+    notify_bgcompute(db_session)
     db_session.commit()
 
     return jsonify({"status": "ok"})
 
 
+def start_draw_sample(session: Session, round: Round) -> bool:
+    """
+    Starts a new attempt at drawing the sample for <round>, whose draw hasn't
+    started yet or whose lease has expired (i.e. the worker drawing it died).
+    The caller must have locked the round. Like start_processing_job, if we've
+    already used up our attempts, we mark the draw as failed and return False.
+    """
+    now = datetime.utcnow()
+    if round.draw_sample_attempts >= MAX_PROCESSING_JOB_ATTEMPTS:
+        round.draw_sample_completed_at = now
+        round.draw_sample_lease_expires_at = None
+        round.draw_sample_error = (
+            "Drawing the sample stopped unexpectedly"
+            f" after {round.draw_sample_attempts} attempts."
+        )
+        session.commit()
+        return False
+
+    round.draw_sample_attempts += 1
+    round.draw_sample_started_at = now
+    round.draw_sample_lease_expires_at = now + PROCESSING_JOB_LEASE
+    round.draw_sample_progress = None
+    session.commit()
+    return True
+
+
+def finish_draw_sample(
+    session: Session, round: Round, draw_sample_started_at: datetime, **values
+) -> bool:
+    # Only record the outcome if our attempt is still the current one. If our
+    # lease expired and another worker took over the draw, we give way.
+    result = session.execute(
+        update(Round.__table__)  # pylint: disable=no-member
+        .where(Round.id == round.id)
+        .where(Round.draw_sample_started_at == draw_sample_started_at)
+        .where(Round.draw_sample_completed_at.is_(None))
+        .values(
+            draw_sample_completed_at=datetime.utcnow(),
+            draw_sample_lease_expires_at=None,
+            **values,
+        )
+    )
+    if result.rowcount == 0:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+
+def process_draw_sample(session: Session, round: Round) -> bool:
+    """
+    Draws the sample for <round>, which must have been claimed with
+    start_draw_sample, and records the outcome on the round.
+    """
+    draw_sample_started_at = round.draw_sample_started_at
+    try:
+        election = round.election
+        if round.requested_sample_sizes is not None:
+            sample_sizes = typing_cast(Dict[str, int], round.requested_sample_sizes)
+        else:
+            sample_size_options = sample_sizes_module.sample_size_options(election)
+            sample_size_key = {
+                AuditType.BALLOT_POLLING: "0.9",
+                AuditType.BATCH_COMPARISON: "macro",
+                AuditType.BALLOT_COMPARISON: "supersimple",
+            }[AuditType(election.audit_type)]
+            sample_sizes = {
+                contest_id: options[sample_size_key]["size"]
+                for contest_id, options in sample_size_options.items()
+            }
+
+        progress = DrawSampleProgress(round.id)
+        draw_sample(election, round, sample_sizes, progress)
+
+        return finish_draw_sample(
+            session,
+            round,
+            draw_sample_started_at,
+            draw_sample_progress=progress.to_json(),
+        )
+    except Exception as error:
+        session.rollback()
+        finish_draw_sample(
+            session,
+            round,
+            draw_sample_started_at,
+            # Some errors stringify nicely, some don't (e.g. StopIteration) so
+            # we have to format them.
+            draw_sample_error=str(error)
+            or str(
+                traceback.format_exception(error.__class__, error, error.__traceback__)
+            ),
+        )
+        raise error
+
+
+def serialize_draw_sample_status(round: Round) -> JSONDict:
+    if round.draw_sample_error:
+        status = ProcessingStatus.ERRORED
+    elif round.draw_sample_completed_at:
+        status = ProcessingStatus.PROCESSED
+    elif round.draw_sample_started_at:
+        status = ProcessingStatus.PROCESSING
+    else:
+        status = ProcessingStatus.READY_TO_PROCESS
+
+    return {
+        "status": status,
+        "startedAt": isoformat(round.draw_sample_started_at),
+        "completedAt": isoformat(round.draw_sample_completed_at),
+        "error": round.draw_sample_error,
+        "progress": round.draw_sample_progress,
+    }
+
+
+@api.route("/election/<election_id>/round/<round_id>/draw-sample", methods=["GET"])
+@restrict_access([UserType.AUDIT_ADMIN])
+def get_draw_sample_status(
+    election: Election, round: Round  # pylint: disable=unused-argument
+):
+    return jsonify(serialize_draw_sample_status(round))
+
+
 def serialize_round(round: Round) -> dict:
     return {
         "id": round.id,
@@ -697,6 +1345,7 @@ def serialize_round(round: Round) -> dict:
         "startedAt": isoformat(round.created_at),
         "endedAt": isoformat(round.ended_at),
         "isAuditComplete": is_audit_complete(round),
+        "drawSampleTask": serialize_draw_sample_status(round),
     }
 
 
@@ -708,8 +1357,8 @@ def list_rounds_audit_admin(election: Election):
 
 # Make a separate endpoint for jurisdiction admins to access the list of
 # rounds. This makes our permission scheme simpler (every route only allows one
-# user type), even though the logic of this particular pair our routes is
-# identical.
+# user type). It also lets us leave out the rounds that jurisdictions can't see
+# yet.
 @api.route(
     "/election/<election_id>/jurisdiction/<jurisdiction_id>/round", methods=["GET"]
 )
@@ -717,4 +1366,6 @@ def list_rounds_audit_admin(election: Election):
 def list_rounds_jurisdiction_admin(
     election: Election, jurisdiction: Jurisdiction  # pylint: disable=unused-argument
 ):
-    return jsonify({"rounds": [serialize_round(r) for r in election.rounds]})
+    return jsonify(
+        {"rounds": [serialize_round(r) for r in election.rounds if is_sample_drawn(r)]}
+    )
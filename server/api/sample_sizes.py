@@ -1,5 +1,6 @@
-from typing import Dict
-from collections import Counter
+import copy
+from typing import Dict, Tuple
+from collections import Counter, OrderedDict
 from flask import jsonify
 from werkzeug.exceptions import BadRequest
 
@@ -11,6 +12,63 @@ from . import rounds  # pylint: disable=cyclic-import
 from .cvrs import set_contest_metadata_from_cvrs
 
 
+# The audit setup flow polls the /sample-sizes endpoint, and the audit math
+# can be slow, so we cache the sample size options for each contest. Rather
+# than trying to clear the cache from every endpoint that changes the inputs,
+# each cache entry records the election's sample_size_inputs_version, which is
+# bumped whenever the inputs change (see bump_sample_size_inputs_versions in
+# models.py), and is only used if the version still matches. This also keeps
+# the cache correct when the inputs are changed by another process (e.g.
+# another server or the background worker).
+class SampleSizeCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Tuple[str, str, int], Tuple[int, dict]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Tuple[str, str, int], version: int, compute):
+        # We return a copy of the cached options, so that callers can't
+        # change them for everyone else.
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return copy.deepcopy(entry[1])
+
+        self.misses += 1
+        options = compute()
+        self.entries[key] = (version, copy.deepcopy(options))
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return options
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+# Keyed by (election id, contest id, round number)
+sample_size_cache = SampleSizeCache(max_size=1000)
+
+
+def sample_size_inputs_version(election: Election) -> int:
+    # The election may have been loaded before the version was last bumped
+    # (e.g. earlier in this session), so we read it fresh from the db.
+    return (
+        Election.query.filter_by(id=election.id)
+        .with_entities(Election.sample_size_inputs_version)
+        .scalar()
+    )
+
+
 # Because the /sample-sizes endpoint is only used for the audit setup flow,
 # we always want it to return the sample size options for the first round.
 # So we support a flag in this function to compute the sample sizes for
@@ -74,20 +132,33 @@ def sample_size_options(
                     .filter_by(election_id=election.id)
                     .count()
                 )
-                discrepancies = supersimple.compute_discrepancies(
-                    contest_for_sampler,
-                    rounds.cvrs_for_contest(contest),
-                    rounds.sampled_ballot_interpretations_to_cvrs(contest),
-                )
-                discrepancy_counter = Counter(
-                    d["counted_as"] for d in discrepancies.values()
+                # Use the discrepancy counts we saved when we measured the
+                # risk at the end of the last round, if we have them.
+                current_round = rounds.get_current_round(election)
+                round_contest = current_round and RoundContest.query.get(
+                    (current_round.id, contest.id)
                 )
+                if round_contest and round_contest.risk_state:
+                    discrepancy_counter = Counter(
+                        round_contest.risk_state["discrepancy_counts"]
+                    )
+                else:
+                    discrepancies = supersimple.compute_discrepancies(
+                        contest_for_sampler,
+                        rounds.cvrs_for_contest(contest),
+                        rounds.sampled_ballot_interpretations_to_cvrs(contest),
+                    )
+                    discrepancy_counter = Counter(
+                        supersimple.DISCREPANCY_KINDS[d["counted_as"]]
+                        for d in discrepancies.values()
+                        if d["counted_as"] in supersimple.DISCREPANCY_KINDS
+                    )
                 discrepancy_counts = {
                     "sample_size": num_previous_samples,
-                    "1-under": discrepancy_counter[-1],
-                    "1-over": discrepancy_counter[1],
-                    "2-under": discrepancy_counter[-2],
-                    "2-over": discrepancy_counter[2],
+                    "1-under": discrepancy_counter["1-under"],
+                    "1-over": discrepancy_counter["1-over"],
+                    "2-under": discrepancy_counter["2-under"],
+                    "2-over": discrepancy_counter["2-over"],
                 }
 
             sample_size = supersimple.get_sample_sizes(
@@ -105,8 +176,16 @@ def sample_size_options(
         if round_one
         else targeted_contests.join(RoundContest).filter_by(is_complete=False).all()
     )
+
+    current_round = rounds.get_current_round(election)
+    round_num = 1 if round_one or not current_round else current_round.round_num + 1
+    version = sample_size_inputs_version(election)
     return {
-        contest.id: sample_sizes_for_contest(contest)
+        contest.id: sample_size_cache.get_or_compute(
+            (election.id, contest.id, round_num),
+            version,
+            lambda contest=contest: sample_sizes_for_contest(contest),
+        )
         for contest in targeted_contests_that_havent_met_risk_limit
     }
 
@@ -14,6 +14,7 @@ from ..util.process_file import (
     UserError,
     serialize_file,
     serialize_file_processing,
+    queue_processing_job,
 )
 
 CONTEST_NAME = "Contest Name"
@@ -29,41 +30,45 @@ def process_standardized_contests_file(
     session: Session, election: Election, file: File
 ):
     def process():
-        standardized_contests_csv = parse_csv(
-            file.contents, STANDARDIZED_CONTEST_COLUMNS
-        )
-
-        standardized_contests = []
-        for row in standardized_contests_csv:
-            if row[JURISDICTIONS].strip() == "all":
-                jurisdictions = election.jurisdictions
-            else:
-                jurisdiction_names = {
-                    name.strip() for name in row[JURISDICTIONS].split(",")
-                }
-                jurisdictions = (
-                    Jurisdiction.query.filter_by(election_id=election.id)
-                    .filter(Jurisdiction.name.in_(jurisdiction_names))
-                    .order_by(Jurisdiction.name)
-                    .all()
-                )
+        with file.open() as standardized_contests_file:
+            standardized_contests_csv = parse_csv(
+                standardized_contests_file, STANDARDIZED_CONTEST_COLUMNS
+            )
 
-                if len(jurisdictions) < len(jurisdiction_names):
-                    invalid_jurisdictions = jurisdiction_names - {
-                        jurisdiction.name for jurisdiction in jurisdictions
+            standardized_contests = []
+            for row in standardized_contests_csv:
+                if row[JURISDICTIONS].strip() == "all":
+                    jurisdictions = election.jurisdictions
+                else:
+                    jurisdiction_names = {
+                        name.strip() for name in row[JURISDICTIONS].split(",")
                     }
-                    raise UserError(
-                        f"Invalid jurisdictions for contest {row[CONTEST_NAME]}: {', '.join(sorted(invalid_jurisdictions))}"
+                    jurisdictions = (
+                        Jurisdiction.query.filter_by(election_id=election.id)
+                        .filter(Jurisdiction.name.in_(jurisdiction_names))
+                        .order_by(Jurisdiction.name)
+                        .all()
                     )
 
-            standardized_contests.append(
-                dict(
-                    name=row[CONTEST_NAME],
-                    jurisdictionIds=[jurisdiction.id for jurisdiction in jurisdictions],
+                    if len(jurisdictions) < len(jurisdiction_names):
+                        invalid_jurisdictions = jurisdiction_names - {
+                            jurisdiction.name for jurisdiction in jurisdictions
+                        }
+                        raise UserError(
+                            f"Invalid jurisdictions for contest {row[CONTEST_NAME]}: {', '.join(sorted(invalid_jurisdictions))}"
+                        )
+
+                standardized_contests.append(
+                    dict(
+                        name=row[CONTEST_NAME],
+                        jurisdictionIds=[
+                            jurisdiction.id for jurisdiction in jurisdictions
+                        ],
+                    )
                 )
-            )
 
         election.standardized_contests = standardized_contests
+        return len(standardized_contests)
 
     process_file(session, file, process)
 
@@ -89,13 +94,16 @@ def upload_standardized_contests_file(election: Election):
     validate_standardized_contests_upload(request, election)
 
     file = request.files["standardized-contests"]
+    if election.standardized_contests_file:
+        election.standardized_contests_file.delete_contents()
     election.standardized_contests_file = File(
-        id=str(uuid.uuid4()),
-        name=file.filename,
-        contents=decode_csv_file(file.read()),
-        uploaded_at=datetime.utcnow(),
+        id=str(uuid.uuid4()), name=file.filename, uploaded_at=datetime.utcnow(),
     )
+    election.standardized_contests_file.save_contents(decode_csv_file(file.read()))
     election.standardized_contests = None
+    queue_processing_job(
+        db_session, election.standardized_contests_file, FileType.STANDARDIZED_CONTESTS
+    )
     db_session.commit()
 
     return jsonify(status="ok")
@@ -1,27 +1,366 @@
+# pylint: disable=invalid-name
 """
-An implementation of Minerva
+An implementation of Minerva, a ballot polling risk-limiting audit designed
+for audits conducted in rounds, as described by Zagórski, McClearn, Morin,
+Ottoboni, Rivest, Vora and others here: https://arxiv.org/abs/2008.02315
+
+Like BRAVO, Minerva tests each (winner, loser) pair separately, looking only at
+the sampled votes for the pair. At the end of each round, Minerva compares the
+tail of the distribution of the winner's sampled votes under the reported
+result (the alternative hypothesis) with the tail under a tie (the null
+hypothesis). The distributions account for the round schedule: outcomes that
+would have stopped the audit in an earlier round are excluded.
+
+Note that this library works for one contest at a time, as if each contest being
+targeted is being audited completely independently.
 """
-# TODO: remove the following once we are using the arguments
-# pylint: disable=unused-argument
-from typing import Dict, Tuple, Optional
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional
+import numpy
+from scipy import signal, stats
 
 from .sampler_contest import Contest
 
 
+# How many sets of distributions to keep in the cache (see
+# round_distributions). Each set takes memory proportional to the number of
+# votes in the sample, so we only keep enough to cover the search for one
+# sample size.
+DISTRIBUTIONS_CACHE_SIZE = 32
+
+# How many sample sizes to keep in the cache (see pair_sample_size)
+SAMPLE_SIZE_CACHE_SIZE = 1024
+
+
+def find_kmin(
+    alternative: numpy.ndarray, null: numpy.ndarray, alpha: float
+) -> Optional[int]:
+    """
+    Finds the minimum number of winner votes needed to stop the audit, i.e.
+    the smallest k such that alpha * P_alternative[K >= k] >= P_null[K >= k].
+
+    Outputs:
+        kmin - the minimum number of votes, or None if the audit can't stop
+    """
+    alternative_tails = numpy.cumsum(alternative[::-1])[::-1]
+    null_tails = numpy.cumsum(null[::-1])[::-1]
+    can_stop = (alpha * alternative_tails >= null_tails) & (alternative_tails > 0)
+    if not can_stop.any():
+        return None
+    return int(numpy.argmax(can_stop))
+
+
+def binomial_pmf(n: int, p: float) -> numpy.ndarray:
+    return stats.binom.pmf(numpy.arange(n + 1), n, p)
+
+
+@lru_cache(maxsize=DISTRIBUTIONS_CACHE_SIZE)
+def round_distributions(
+    p_w2: float, round_schedule: Tuple[int, ...], alpha: float
+) -> Tuple[numpy.ndarray, numpy.ndarray, Tuple[Optional[int], ...]]:
+    """
+    Computes the distributions of the number of winner votes in the sample at
+    the end of the last round in <round_schedule>.
+
+    The results are cached, and each call reuses the cached results for the
+    rounds before the last one, so trying out different sizes for the next
+    round only needs one more round's worth of work.
+
+    Inputs:
+        p_w2            - the winner's share of the votes for the pair
+        round_schedule  - the cumulative number of votes for the pair sampled
+                          by the end of each round
+        alpha           - the risk limit as a fraction
+
+    Outputs:
+        (alternative, null, kmins):
+            alternative - P[K = k and the audit didn't stop in an earlier
+                          round] for each k, if the reported result is correct
+            null        - the same, if the pair is tied
+            kmins       - the minimum number of winner votes needed to stop
+                          in each round (None if the audit can't stop)
+        The arrays are read-only.
+    """
+    if len(round_schedule) > 1:
+        previous_alternative, previous_null, previous_kmins = round_distributions(
+            p_w2, round_schedule[:-1], alpha
+        )
+        previous_size = round_schedule[-2]
+        previous_kmin = previous_kmins[-1]
+        if previous_kmin is not None:
+            # Exclude the outcomes where the audit stopped in the previous round
+            previous_alternative = previous_alternative.copy()
+            previous_alternative[previous_kmin:] = 0
+            previous_null = previous_null.copy()
+            previous_null[previous_kmin:] = 0
+    else:
+        previous_alternative, previous_null = numpy.ones(1), numpy.ones(1)
+        previous_kmins, previous_size = (), 0
+
+    # The votes drawn this round are independent of the earlier ones, so the
+    # distribution for the end of this round is the convolution of the
+    # distribution for the earlier rounds with this round's binomial.
+    round_size = round_schedule[-1] - previous_size
+    alternative = numpy.clip(
+        signal.convolve(previous_alternative, binomial_pmf(round_size, p_w2)), 0, None
+    )
+    null = numpy.clip(
+        signal.convolve(previous_null, binomial_pmf(round_size, 0.5)), 0, None
+    )
+
+    alternative.flags.writeable = False
+    null.flags.writeable = False
+    kmin = find_kmin(alternative, null, alpha)
+    return alternative, null, previous_kmins + (kmin,)
+
+
+def ordered_rounds(
+    sample_results: Optional[Dict[str, Dict[str, int]]]
+) -> List[Dict[str, int]]:
+    # Minerva depends on how many votes were sampled in each round, so we rely
+    # on sample_results listing the rounds in order.
+    return list(sample_results.values()) if sample_results else []
+
+
+def pair_schedule(
+    rounds: List[Dict[str, int]], winner: str, loser: str
+) -> Tuple[Tuple[int, ...], int]:
+    """
+    Outputs:
+        (round_schedule, k) - the cumulative number of votes for the pair
+                              by the end of each round, and the cumulative
+                              number of votes for the winner
+    """
+    round_schedule = []
+    pair_votes, winner_votes = 0, 0
+    for results in rounds:
+        pair_votes += results.get(winner, 0) + results.get(loser, 0)
+        winner_votes += results.get(winner, 0)
+        round_schedule.append(pair_votes)
+    return tuple(round_schedule), winner_votes
+
+
+def pair_risk(
+    p_w2: float, round_schedule: Tuple[int, ...], k: int, alpha: float
+) -> float:
+    """
+    Computes the Minerva p-value for a (winner, loser) pair: the ratio of the
+    null and alternative tails at the observed number of winner votes <k>.
+    """
+    if p_w2 <= 0.5 or not round_schedule or round_schedule[-1] == 0:
+        return 1.0
+
+    alternative, null, _ = round_distributions(p_w2, round_schedule, alpha)
+    alternative_tail = alternative[k:].sum()
+    if alternative_tail <= 0:
+        return 1.0
+    return float(min(1.0, null[k:].sum() / alternative_tail))
+
+
+def stopping_probability(
+    p_w2: float, round_schedule: Tuple[int, ...], k: int, alpha: float, size: int
+) -> float:
+    """
+    Computes the probability that the audit of a (winner, loser) pair stops
+    in the next round if we sample <size> more votes for the pair, given that
+    we've already sampled <k> votes for the winner, assuming the reported
+    result is correct.
+    """
+    previous_size = round_schedule[-1] if round_schedule else 0
+    _, _, kmins = round_distributions(
+        p_w2, round_schedule + (previous_size + size,), alpha
+    )
+    kmin = kmins[-1]
+    if kmin is None:
+        return 0.0
+    # P[Binomial(size, p_w2) >= kmin - k]
+    return float(stats.binom.sf(kmin - k - 1, size, p_w2))
+
+
+@lru_cache(maxsize=SAMPLE_SIZE_CACHE_SIZE)
+def pair_sample_size(
+    p_w2: float,
+    round_schedule: Tuple[int, ...],
+    k: int,
+    alpha: float,
+    quant: float,
+    max_size: int,
+) -> Optional[int]:
+    """
+    Finds the number of votes for a (winner, loser) pair to sample in the next
+    round so that the audit stops in that round with probability <quant>,
+    assuming the reported result is correct.
+
+    We double the size until it's big enough, then bisect. The stopping
+    probability isn't strictly monotonic in the size (the vote counts are
+    discrete), so this finds a size where the probability crosses <quant>,
+    which may not be the very smallest such size.
+
+    The results are cached, since the sample size options for an audit are
+    requested over and over while the audit is being set up.
+
+    Outputs:
+        size - the number of votes, or None if more than <max_size> votes
+               would be needed
+    """
+
+    def big_enough(size: int) -> bool:
+        return stopping_probability(p_w2, round_schedule, k, alpha, size) >= quant
+
+    lower, upper = 0, 1
+    while not big_enough(upper):
+        if upper >= max_size:
+            return None
+        lower, upper = upper, min(upper * 2, max_size)
+
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        if big_enough(middle):
+            upper = middle
+        else:
+            lower = middle
+    return upper
+
+
 def get_sample_size(
     risk_limit: int,
     contest: Contest,
     sample_results: Optional[Dict[str, Dict[str, int]]],
-    round_sizes: Dict[int, int],
+    round_sizes: Dict[int, int],  # pylint: disable=unused-argument
 ) -> Dict[str, "SampleSizeOption"]:  # type: ignore
+    """
+    Computes the sample size for the next round, parameterized by the
+    likelihood that the round will confirm the election result, assuming no
+    discrepancies.
+
+    Inputs:
+        risk_limit     - the risk-limit for this audit
+        contest        - a sampler_contest object of the contest being audited
+        sample_results - mapping of rounds to the votes for each candidate in
+                         that round's sample, in round order:
+                        {
+                            round1: {
+                                candidate1: sampled_votes,
+                                candidate2: sampled_votes,
+                                ...
+                            },
+                            ...
+                        }
+        round_sizes    - mapping of round numbers to the number of ballots
+                         sampled in that round (unused, since Minerva only
+                         needs the votes sampled in each round)
+
+    Outputs:
+        samples - dictionary mapping confirmation likelihood to sample size:
+                {
+                    likelihood1: {"type": None, "size": sample_size, "prob": likelihood1},
+                    ...
+                }
+    """
+    alpha = risk_limit / 100
+    assert alpha < 1, "The risk-limit must be less than one!"
+
+    quants = [0.7, 0.8, 0.9]
+
+    winners = contest.margins["winners"]
+    losers = contest.margins["losers"]
+    rounds = ordered_rounds(sample_results)
 
-    raise Exception("Not implemented!")
+    def sample_size(quant: float) -> int:
+        # Handle single-candidate races and landslides
+        if not losers:
+            return 1
+
+        size = 0
+        for winner in winners:
+            for loser in losers:
+                p_w2 = winners[winner]["swl"][loser]
+                # Handle ties
+                if p_w2 <= 0.5:
+                    return contest.ballots
+
+                round_schedule, k = pair_schedule(rounds, winner, loser)
+                if pair_risk(p_w2, round_schedule, k, alpha) <= alpha:
+                    continue
+
+                # Convert between votes for the pair and ballots
+                p_wl = (
+                    contest.candidates[winner] + contest.candidates[loser]
+                ) / contest.ballots
+                pair_size = pair_sample_size(
+                    p_w2,
+                    round_schedule,
+                    k,
+                    alpha,
+                    quant,
+                    max_size=math.ceil(contest.ballots * p_wl),
+                )
+                if pair_size is None:
+                    return contest.ballots
+                size = max(size, math.ceil(pair_size / p_wl))
+
+        return min(size, contest.ballots)
+
+    return {
+        str(quant): {"type": None, "size": sample_size(quant), "prob": quant}
+        for quant in quants
+    }
 
 
 def compute_risk(
     risk_limit: float,
     contest: Contest,
     sample_results: Dict[str, Dict[str, int]],
-    round_sizes: Dict[int, int],
+    round_sizes: Dict[int, int],  # pylint: disable=unused-argument
 ) -> Tuple[Dict[Tuple[str, str], float], bool]:
-    raise Exception("Not implemented!")
+    """
+    Computes the risk-value of <sample_results> based on results in <contest>.
+
+    Inputs:
+        risk_limit     - the risk-limit for this audit
+        contest        - a sampler_contest object for the contest being measured
+        sample_results - mapping of rounds to the votes for each candidate in
+                         that round's sample, in round order:
+                { "round1": {
+                    candidate1: sampled_votes,
+                    candidate2: sampled_votes,
+                    ...
+                }}
+        round_sizes    - mapping of round numbers to the number of ballots
+                         sampled in that round (unused)
+
+    Outputs:
+        measurements    - the p-value of the hypotheses that the election
+                          result is correct based on the sample, for each
+                          winner-loser pair.
+        confirmed       - a boolean indicating whether the audit can stop
+    """
+    alpha = risk_limit / 100
+    assert alpha < 1, "The risk-limit must be less than one!"
+
+    winners = contest.margins["winners"]
+    losers = contest.margins["losers"]
+    rounds = ordered_rounds(sample_results)
+
+    pairs = [(winner, loser) for winner in winners for loser in losers]
+    # Handle the no-losers case
+    if not losers:
+        pairs = [(winner, "") for winner in winners]
+
+    # If we've done a full hand recount
+    if sum(sum(results.values()) for results in rounds) >= contest.ballots:
+        return {pair: 0.0 for pair in pairs}, True
+
+    measurements = {}
+    for winner, loser in pairs:
+        if not loser:
+            measurements[(winner, loser)] = 1.0
+            continue
+        round_schedule, k = pair_schedule(rounds, winner, loser)
+        measurements[(winner, loser)] = pair_risk(
+            winners[winner]["swl"][loser], round_schedule, k, alpha
+        )
+
+    finished = all(p_value <= alpha for p_value in measurements.values())
+    return measurements, finished
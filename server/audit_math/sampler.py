@@ -1,13 +1,200 @@
 # pylint: disable=invalid-name
 # Handles generating sample sizes and taking samples
-from typing import cast, Any, Dict, List, Tuple
+from typing import cast, Any, Dict, List, Tuple, Iterator, Optional
 from decimal import Decimal
+import hashlib
+import heapq
+import numpy
 import consistent_sampler
+from typing_extensions import TypedDict
 
 from . import macro
 from .sampler_contest import Contest
 
 
+# When we need to widen the pool of ballots we are drawing from (see
+# draw_tickets), we make the pool this many times bigger than the number of
+# tickets drawn so far, so that the next round can be drawn without
+# rescanning the whole manifest as long as it's no bigger than all the rounds
+# before it put together, times (POOL_SIZE_FACTOR - 1). We can't size the
+# pool from the next round itself, since its sample size depends on the
+# results of the round we're drawing.
+POOL_SIZE_FACTOR = 3
+
+
+class SamplerState(TypedDict):
+    """
+    A JSON-serializable snapshot of the consistent sampler after drawing
+    <num_drawn> tickets, which can be used to keep drawing tickets later
+    without redrawing the ones that came before.
+
+    The state only tracks a "pool" of ballots: those whose first ticket is at
+    most <threshold>. Every ballot outside the pool has a larger first ticket,
+    so as long as the smallest ticket in the pool is at most <threshold>, it
+    is also the smallest ticket in the whole manifest.
+    """
+
+    # Hash of the seed and the manifest this state was computed for
+    fingerprint: str
+    num_drawn: int
+    # Heap of the current (ticket_number, id, generation) ticket for each
+    # ballot in the pool. Ticket numbers are stored at full precision, since
+    # the next ticket number for a ballot is derived from the previous one.
+    heap: List[Tuple[str, Any, int]]
+    # The largest first ticket in the pool, or None if the pool is empty
+    threshold: Optional[Tuple[str, Any, int]]
+    # True if the pool contains every ballot in the manifest
+    exhausted: bool
+
+
+def first_tickets(
+    seed: str, manifest: Dict[Any, int]
+) -> Iterator[consistent_sampler.Ticket]:
+    """
+    Lazily generates the generation 1 ticket for every ballot in the manifest.
+
+    This produces exactly the tickets that consistent_sampler.make_ticket_heap
+    would produce for the list of ids [(batch, 1), ..., (batch, num_ballots)],
+    but without building that list. Each ballot's ticket number is
+    sha256(seed_hash + str((batch, i))), so we hash the common
+    "seed_hash + (batch, " prefix once per batch and only feed in the
+    ballot position for each ballot.
+
+    Inputs:
+        seed - random seed
+        manifest - mapping of batches to the ballots they contain
+
+    Outputs:
+        an iterator of consistent_sampler.Ticket, one per ballot
+    """
+    seed_hash = consistent_sampler.sha256_hex(seed)
+    for batch, num_ballots in manifest.items():
+        # str((batch, i)) == "(" + repr(batch) + ", " + repr(i) + ")"
+        batch_hash = hashlib.sha256(f"{seed_hash}({batch!r}, ".encode("utf-8"))
+        for i in range(1, num_ballots + 1):
+            ballot_hash = batch_hash.copy()
+            ballot_hash.update(f"{i})".encode("utf-8"))
+            # Same as consistent_sampler.sha256_uniform
+            ticket_number = (
+                "0." + "{:064d}".format(int(ballot_hash.hexdigest(), 16))[::-1]
+            )
+            yield consistent_sampler.Ticket(ticket_number, (batch, i), 1)
+
+
+def manifest_fingerprint(seed: str, manifest: Dict[Any, int]) -> str:
+    return consistent_sampler.sha256_hex(
+        "\n".join([seed] + sorted(repr(item) for item in manifest.items()))
+    )
+
+
+def _to_tuple(value: Any) -> Any:
+    # JSON turns our tuple ids into lists, so we turn them back
+    if isinstance(value, list):
+        return tuple(_to_tuple(item) for item in value)
+    return value
+
+
+def _load_ticket(ticket: Tuple[str, Any, int]) -> consistent_sampler.Ticket:
+    ticket_number, id, generation = ticket
+    return consistent_sampler.Ticket(ticket_number, _to_tuple(id), generation)
+
+
+def draw_tickets(
+    seed: str,
+    manifest: Dict[Any, int],
+    sample_size: int,
+    num_sampled: int,
+    state: Optional[SamplerState],
+    digits: int,
+) -> Tuple[List[Tuple[str, Any, int]], SamplerState]:
+    """
+    Draws tickets <num_sampled + 1> through <num_sampled + sample_size> of a
+    with-replacement consistent sample of the ballots in <manifest>, in the
+    same (ticket_number, id, generation) tuple format as
+    consistent_sampler.sampler(..., output="tuple", digits=<digits>).
+
+    If <state> was saved after drawing the first <num_sampled> tickets from the
+    same seed and manifest, we pick up where it left off. Otherwise, we start
+    from scratch and skip over the first <num_sampled> tickets. Either way, the
+    output is the same.
+
+    Outputs:
+        (sample, state) - the new tickets, and the state after drawing them
+    """
+    fingerprint = manifest_fingerprint(seed, manifest)
+
+    if (
+        state is not None
+        and state["fingerprint"] == fingerprint
+        and state["num_drawn"] == num_sampled
+    ):
+        heap = [_load_ticket(ticket) for ticket in state["heap"]]
+        threshold = state["threshold"] and _load_ticket(state["threshold"])
+        exhausted = state["exhausted"]
+        num_drawn = num_sampled
+    else:
+        heap, threshold, exhausted, num_drawn = [], None, False, 0
+
+    sample = []
+    take = num_sampled + sample_size
+    while num_drawn < take:
+        if heap and (exhausted or (threshold and heap[0] <= threshold)):
+            ticket = heapq.heappop(heap)
+            heapq.heappush(heap, consistent_sampler.next_ticket(ticket))
+            num_drawn += 1
+            if num_drawn > num_sampled:
+                sample.append(
+                    (
+                        consistent_sampler.trim(ticket.ticket_number, digits),
+                        ticket.id,
+                        ticket.generation,
+                    )
+                )
+            continue
+
+        if exhausted:  # The manifest is empty
+            break
+
+        # Widen the pool with the ballots that have the next smallest first
+        # tickets. When sampling with replacement, a ballot's later tickets
+        # are always larger than its first ticket, so the next n draws can
+        # only come from the pool plus the n ballots with the next smallest
+        # first tickets (any other ballot would be preceded by at least n
+        # other tickets). This is the "filtering" property of consistent
+        # sampling: drawing from the pool gives the same sample as drawing
+        # from the whole manifest, but we only ever keep the pool in memory.
+        #
+        # Finding those ballots means hashing the whole manifest again, so we
+        # admit enough extra ballots to cover the next round too (see
+        # POOL_SIZE_FACTOR). If a later round outgrows the pool anyway, we
+        # just widen it again, which costs one more pass over the manifest.
+        pool_size = max(take - num_drawn, POOL_SIZE_FACTOR * take - len(heap))
+        new_tickets = heapq.nsmallest(
+            pool_size,
+            (
+                ticket
+                for ticket in first_tickets(seed, manifest)
+                if threshold is None or ticket > threshold
+            ),
+        )
+        for ticket in new_tickets:
+            heapq.heappush(heap, ticket)
+        if new_tickets:
+            threshold = new_tickets[-1]
+        exhausted = len(new_tickets) < pool_size
+
+    return (
+        sample,
+        SamplerState(
+            fingerprint=fingerprint,
+            num_drawn=num_drawn,
+            heap=[tuple(ticket) for ticket in heap],
+            threshold=threshold and tuple(threshold),
+            exhausted=exhausted,
+        ),
+    )
+
+
 def draw_sample(
     seed: str, manifest: Dict[Any, int], sample_size: int, num_sampled=0
 ) -> List[Tuple[str, Tuple[Any, int], int]]:
@@ -38,27 +225,31 @@ def draw_sample(
                 ]
     """
 
-    ballots: List[Tuple[str, int]] = []
-    # First build a faux list of ballots
-    for batch in manifest:
-        for i in range(manifest[batch]):
-            ballots.append((batch, i + 1))
+    sample, _ = resume_sample(seed, manifest, sample_size, num_sampled, None)
+    return sample
+
 
+def resume_sample(
+    seed: str,
+    manifest: Dict[Any, int],
+    sample_size: int,
+    num_sampled: int,
+    state: Optional[SamplerState],
+) -> Tuple[List[Tuple[str, Tuple[Any, int], int]], SamplerState]:
+    """
+    Same as draw_sample, but picks up from the <state> returned by the
+    previous call (if it's still valid for this seed, manifest and
+    <num_sampled>), so that only the new tickets need to be drawn.
+
+    Outputs:
+        (sample, state) - the sample (as in draw_sample) and the sampler state
+                          to pass in when drawing the next sample
+    """
     return cast(
-        # The signature of `consistent_sampler.sampler` can't be represented by
-        # mypy yet, so it is typed as a less specific version of what it really
-        # is. This casts it back to the more specific version.
-        List[Tuple[str, Tuple[str, int], int]],
-        list(
-            consistent_sampler.sampler(
-                ballots,
-                seed=seed,
-                take=sample_size + num_sampled,
-                with_replacement=True,
-                output="tuple",
-                digits=18,
-            )
-        )[num_sampled:],
+        # The ids we draw are the (batch, ballot number) tuples generated by
+        # first_tickets, but draw_tickets doesn't know that.
+        Tuple[List[Tuple[str, Tuple[Any, int], int]], SamplerState],
+        draw_tickets(seed, manifest, sample_size, num_sampled, state, digits=18),
     )
 
 
@@ -68,7 +259,7 @@ def draw_ppeb_sample(
     sample_size: int,
     num_sampled: int,
     batch_results: Dict[Any, Dict[str, Dict[str, int]]],
-) -> List[Tuple[str, Tuple[str, int], int]]:
+) -> List[Tuple[str, Any, int]]:
     """
     Draws sample with replacement of size <sample_size> from the
     provided ballot manifest using proportional-with-error-bound (PPEB) sampling.
@@ -76,6 +267,12 @@ def draw_ppeb_sample(
     Stark further applied PPEB to batch audits here: https://www.stat.berkeley.edu/~stark/Preprints/ppebwrwd08.pdf
     For use with batch audits like MACRO.
 
+    Each draw is made independently: draw i gets its own pseudorandom number
+    u_i in [0, 1), derived from the seed and i, and picks the batch whose
+    slice of the cumulative error bounds contains u_i * U. So the first n
+    draws are the same no matter how many we take, and we only need memory
+    proportional to the number of batches.
+
     Inputs:
         seed    - the random seed to use in sampling
         sample_size - number of ballots to randomly draw
@@ -96,8 +293,8 @@ def draw_ppeb_sample(
                 [
                     (
                         '0.235789114', # ticket number
-                        (<batch>, <ballot number>), # id, here a tuple (batch, ballot)
-                        1                           # number of times this item has been picked
+                        <batch>,       # the batch picked
+                        1              # number of times this batch has been picked
                     ),
                     ...
                 ]
@@ -105,6 +302,87 @@ def draw_ppeb_sample(
 
     assert batch_results, "Must have batch-level results to use MACRO"
 
+    # Sort the batches so that the sample doesn't depend on the order in
+    # which the batch results were loaded.
+    batches = sorted(batch_results)
+
+    # Get u_ps. Probability of being picked is directly related to how much
+    # this batch contributes to the overall possible error.
+    max_errors = [
+        macro.compute_max_error(batch_results[batch], contest) for batch in batches
+    ]
+
+    # U is the sum of the u_ps. This can only be 0 if we've already recounted.
+    if sum(max_errors) == 0:
+        return []
+
+    # Set a floor on the error so it can't go to 0
+    error_floor = Decimal(1) / Decimal(contest.ballots)
+    errors = numpy.array(
+        [float(error or error_floor) for error in max_errors], dtype=numpy.float64
+    )
+    cumulative_errors = numpy.cumsum(errors)
+
+    # Draw every ticket up to the end of this sample, so we can count how many
+    # times each batch was picked in previous samples.
+    seed_hash = consistent_sampler.sha256_hex(seed)
+    ticket_numbers = [
+        consistent_sampler.sha256_uniform(f"{seed_hash},{i}")
+        for i in range(1, num_sampled + sample_size + 1)
+    ]
+    picks = numpy.searchsorted(
+        cumulative_errors,
+        numpy.array(ticket_numbers, dtype=numpy.float64) * cumulative_errors[-1],
+        side="right",
+    )
+    # Guard against floating point rounding pushing u_i * U past the end
+    picks = numpy.minimum(picks, len(batches) - 1)
+
+    # The generation of each pick is its rank among the picks of the same
+    # batch, counting from 1. A stable sort groups the picks by batch while
+    # keeping them in draw order within each group.
+    order = numpy.argsort(picks, kind="stable")
+    sorted_picks = picks[order]
+    group_starts = numpy.flatnonzero(
+        numpy.concatenate(([True], sorted_picks[1:] != sorted_picks[:-1]))
+    )
+    group_sizes = numpy.diff(numpy.append(group_starts, len(picks)))
+    generations = numpy.empty(len(picks), dtype=numpy.int64)
+    generations[order] = numpy.arange(len(picks)) - numpy.repeat(
+        group_starts, group_sizes
+    )
+    generations += 1
+
+    return [
+        (
+            consistent_sampler.trim(ticket_numbers[i], 9),
+            batches[picks[i]],
+            int(generations[i]),
+        )
+        for i in range(num_sampled, num_sampled + sample_size)
+    ]
+
+
+def draw_ppeb_sample_duplicated_batches(
+    seed: str,
+    contest: Contest,
+    sample_size: int,
+    num_sampled: int,
+    batch_results: Dict[Any, Dict[str, Dict[str, int]]],
+) -> List[Tuple[str, Any, int]]:
+    """
+    The original version of draw_ppeb_sample, which builds a faux manifest in
+    which each batch appears a number of times proportional to its error
+    bound, and draws from it with consistent_sampler. It picks different
+    batches than draw_ppeb_sample for the same seed, so audits that drew their
+    first round with it keep using it for later rounds (see
+    Election.ppeb_sampler).
+
+    Takes the same inputs and returns the same outputs as draw_ppeb_sample.
+    """
+
+    assert batch_results, "Must have batch-level results to use MACRO"
+
     U = macro.compute_U(batch_results, {}, contest)
 
     # This can only be the case if we've already recounted
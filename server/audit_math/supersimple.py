@@ -1,7 +1,9 @@
 # pylint: disable=invalid-name
 import math
+import operator
 from decimal import Decimal, ROUND_CEILING
-from typing import Dict, Tuple, TypedDict, Optional
+from typing import Dict, List, NamedTuple, Set, Tuple, TypedDict, Optional
+import numpy as np
 
 from .sampler_contest import Contest
 
@@ -60,6 +62,125 @@ def nMin(
     )
 
 
+class SampleDiscrepancies(NamedTuple):
+    """
+    The discrepancies for each ballot in a sample, as arrays indexed in the
+    same order as <ballots> (see sample_discrepancies).
+    """
+
+    ballots: List[str]
+    times_sampled: np.ndarray
+    # Whether the audited ballot differs from the CVR, or wasn't found
+    found: np.ndarray
+    not_found: np.ndarray
+    # The error for the winner-loser pair with the largest positive weighted
+    # error (or 0 if there wasn't one), which is what the discrepancy is
+    # counted as
+    counted_as: np.ndarray
+    # The error and margin of the last winner-loser pair, which the weighted
+    # error of a discrepancy is based on
+    last_pair_error: np.ndarray
+    last_pair_margin: int
+
+
+def sample_discrepancies(
+    contest: Contest, cvrs: CVRS, sample_cvr: SAMPLE_CVRS
+) -> SampleDiscrepancies:
+    """
+    Computes the discrepancies for all the ballots in a sample at once, by
+    building matrices of the reported and audited votes (ballot x choice) and
+    finding the errors for every winner-loser pair with array operations.
+
+    Gives the same results as comparing each ballot pair by pair:
+        e = (v_w - a_w) - (v_l - a_l)
+        weighted error = e / (V_w - V_l)
+    where a ballot counts as the error of the first pair with the largest
+    positive weighted error, and a ballot that can't be found counts as a
+    two-vote overstatement.
+    """
+    ballots = list(sample_cvr)
+    num_winners = len(contest.winners)
+    # If there aren't any winner-loser pairs, there are no votes to compare
+    choices = (
+        list(contest.winners) + list(contest.losers)
+        if contest.winners and contest.losers
+        else []
+    )
+    num_pairs = num_winners * (len(choices) - num_winners) if choices else 0
+
+    # Ballots that don't have the contest on them count as no votes
+    no_votes = (0,) * len(choices)
+    get_votes = operator.itemgetter(*choices) if choices else lambda _: ()
+
+    def votes_for_choices(ballot_cvr: CVR) -> Tuple[int, ...]:
+        if contest.name not in ballot_cvr:
+            return no_votes
+        return get_votes(ballot_cvr[contest.name])
+
+    reported_rows, audited_rows, not_found_rows, times_sampled_rows = [], [], [], []
+    for ballot in ballots:
+        ballot_cvr = cvrs[ballot]
+        assert ballot_cvr is not None
+        ballot_sample_cvr = sample_cvr[ballot]["cvr"]
+        times_sampled_rows.append(sample_cvr[ballot]["times_sampled"])
+        not_found_rows.append(ballot_sample_cvr is None)
+
+        if ballot_sample_cvr is None:
+            reported_rows.append(no_votes)
+            audited_rows.append(no_votes)
+        else:
+            reported_rows.append(votes_for_choices(ballot_cvr))
+            audited_rows.append(votes_for_choices(ballot_sample_cvr))
+
+    shape = (len(ballots), len(choices))
+    reported = np.array(reported_rows, dtype=np.int64).reshape(shape)
+    audited = np.array(audited_rows, dtype=np.int64).reshape(shape)
+    not_found = np.array(not_found_rows, dtype=bool)
+    times_sampled = np.array(times_sampled_rows, dtype=np.int64)
+
+    # Errors (ballot x winner-loser pair), with the pairs in the order
+    # (winner 1, loser 1), (winner 1, loser 2), ..., (winner 2, loser 1), ...
+    overstatements = reported - audited
+    errors = (
+        overstatements[:, :num_winners, np.newaxis]
+        - overstatements[:, np.newaxis, num_winners:]
+    ).reshape(len(ballots), num_pairs)
+    votes = np.array([contest.candidates[choice] for choice in choices], dtype=np.int64)
+    margins = (
+        votes[:num_winners, np.newaxis] - votes[np.newaxis, num_winners:]
+    ).reshape(num_pairs)
+
+    counted_as = np.zeros(len(ballots), dtype=np.int64)
+    found = not_found.copy()
+    last_pair_error = np.zeros(len(ballots), dtype=np.int64)
+    last_pair_margin = 0
+    if num_pairs > 0:
+        # If a winner and loser are tied, the weighted error is undefined,
+        # which we treat as infinite
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weighted_errors = np.where(margins == 0, np.inf, errors / margins)
+        # argmax picks the first pair with the largest weighted error
+        max_pair = weighted_errors.argmax(axis=1)
+        max_pair_error = errors[np.arange(len(ballots)), max_pair]
+        max_weighted_error = weighted_errors[np.arange(len(ballots)), max_pair]
+        counted_as = np.where(max_weighted_error > 0, max_pair_error, 0)
+        found |= (errors != 0).any(axis=1)
+        last_pair_error = errors[:, -1]
+        last_pair_margin = int(margins[-1])
+
+    counted_as[not_found] = 2
+
+    return SampleDiscrepancies(
+        ballots=ballots,
+        times_sampled=times_sampled,
+        found=found,
+        not_found=not_found,
+        counted_as=counted_as,
+        last_pair_error=last_pair_error,
+        last_pair_margin=last_pair_margin,
+    )
+
+
 def compute_discrepancies(
     contest: Contest, cvrs: CVRS, sample_cvr: SAMPLE_CVRS
 ) -> Dict[str, Discrepancy]:
@@ -118,77 +239,34 @@ def compute_discrepancies(
                     }
     """
 
-    discrepancies: Dict[str, Discrepancy] = {}
-    for ballot in sample_cvr:
-        # Typechecker needs us to pull these out into variables
-        ballot_sample_cvr = sample_cvr[ballot]["cvr"]
-        ballot_cvr = cvrs[ballot]
-        assert ballot_cvr is not None
-
-        # We want to be conservative, so we will ignore the case where there are
-        # negative errors (i.e. errors that favor the winner. We can do that
-        # by setting these to zero and evaluating whether an error is greater
-        # than zero (i.e. positive).
-        e_r = Decimal(0.0)
-        e_int = 0
+    sample = sample_discrepancies(contest, cvrs, sample_cvr)
 
-        found = False
+    discrepancies: Dict[str, Discrepancy] = {}
+    for i in np.flatnonzero(sample.found):
+        ballot = sample.ballots[i]
 
-        # Special case: if ballot can't be found by audit board, count it as a
-        # two-vote overstatement
-        if ballot_sample_cvr is None:
-            e_int = 2
-            e_weighted = Decimal(e_int) / Decimal(
+        # We only compute the weighted errors exactly (as Decimals) for the
+        # ballots that have discrepancies.
+        if sample.not_found[i]:
+            weighted_error = Decimal(2) / Decimal(
                 contest.diluted_margin * contest.ballots
             )
-            found = True
-
+        elif sample.last_pair_margin == 0:
+            weighted_error = Decimal("inf")
         else:
-            for winner in contest.winners:
-                for loser in contest.losers:
-
-                    if contest.name in ballot_cvr:
-                        v_w = ballot_cvr[contest.name][winner]
-                        v_l = ballot_cvr[contest.name][loser]
-                    else:
-                        v_w = 0
-                        v_l = 0
-
-                    if contest.name in ballot_sample_cvr:
-                        a_w = ballot_sample_cvr[contest.name][winner]
-                        a_l = ballot_sample_cvr[contest.name][loser]
-                    else:
-                        a_w = 0
-                        a_l = 0
-
-                    V_wl = contest.candidates[winner] - contest.candidates[loser]
-
-                    e = (v_w - a_w) - (v_l - a_l)
-
-                    if e:
-                        # we found a discrepancy!
-                        found = True
-
-                    if V_wl == 0:
-                        # In this case the error is undefined
-                        e_weighted = Decimal("inf")
-                    else:
-                        e_weighted = Decimal(e) / Decimal(V_wl)
-
-                    if e_weighted > e_r:
-                        e_r = e_weighted
-                        e_int = e
-
-        if found:
-            discrepancies[ballot] = Discrepancy(
-                counted_as=e_int,
-                weighted_error=e_weighted,
-                discrepancy_cvr={
-                    "reported_as": ballot_cvr,
-                    "audited_as": ballot_sample_cvr,
-                },
+            weighted_error = Decimal(int(sample.last_pair_error[i])) / Decimal(
+                sample.last_pair_margin
             )
 
+        discrepancies[ballot] = Discrepancy(
+            counted_as=int(sample.counted_as[i]),
+            weighted_error=weighted_error,
+            discrepancy_cvr={
+                "reported_as": cvrs[ballot],
+                "audited_as": sample_cvr[ballot]["cvr"],
+            },
+        )
+
     return discrepancies
 
 
@@ -256,6 +334,130 @@ def get_sample_sizes(
     return int(nMin(alpha, contest, r1, r2, s1, s2))
 
 
+class RiskState(TypedDict):
+    """
+    The running state of a risk measurement, so that we can fold in ballots
+    as they're sampled rather than recomputing the p-value over the whole
+    sample (see update_risk_state).
+    """
+
+    # The log of the absolute value of the p-value, or None if it's 0
+    log_p: Optional[float]
+    p_sign: int
+    # How many distinct ballots, and how many draws of them, we've counted
+    num_ballots: int
+    num_draws: int
+    # The number of ballots with each kind of discrepancy, keyed by
+    # "1-over", "1-under", "2-over", "2-under"
+    discrepancy_counts: Dict[str, int]
+
+
+DISCREPANCY_KINDS = {1: "1-over", -1: "1-under", 2: "2-over", -2: "2-under"}
+
+
+def initial_risk_state() -> RiskState:
+    return RiskState(
+        log_p=0.0,
+        p_sign=1,
+        num_ballots=0,
+        num_draws=0,
+        discrepancy_counts={kind: 0 for kind in DISCREPANCY_KINDS.values()},
+    )
+
+
+def update_risk_state(
+    state: RiskState,
+    contest: Contest,
+    cvrs: CVRS,
+    sample_cvr: SAMPLE_CVRS,
+    first_sampled: Set[str],
+) -> RiskState:
+    """
+    Folds newly sampled ballots into <state>, returning the new state.
+
+    Inputs:
+        state          - the state for the ballots sampled so far
+        contest, cvrs  - as for compute_risk
+        sample_cvr     - the CVRs of the audited ballots that were just
+                         sampled, where times_sampled is the number of new
+                         times each ballot was sampled. Ballots may have been
+                         sampled before (e.g. in a previous round).
+        first_sampled  - which of the ballots in sample_cvr are being
+                         counted for the first time
+
+    The Kaplan-Markov p-value is the product of a factor for each ballot
+    (raised to the number of times it was sampled), so we keep the running
+    product as a sum of logs, with the sign tracked separately. With tens of
+    thousands of ballots, the product can be smaller than a float can hold.
+    """
+    sample = sample_discrepancies(contest, cvrs, sample_cvr)
+    is_first_sampled = np.array(
+        [ballot in first_sampled for ballot in sample.ballots], dtype=bool
+    )
+
+    discrepancy_counts = dict(state["discrepancy_counts"])
+    for counted_as in sample.counted_as[sample.found & is_first_sampled].tolist():
+        if counted_as in DISCREPANCY_KINDS:
+            discrepancy_counts[DISCREPANCY_KINDS[counted_as]] += 1
+
+    log_p, p_sign = state["log_p"], state["p_sign"]
+    # If the contest is a tie, each ballot's p-value factor is
+    # 1 - 1/(infinity) divided by 1 - e_r/infinity, i.e. 1
+    if contest.diluted_margin and log_p is not None:
+        # The weighted error for each ballot (0 if it had no discrepancy)
+        V = contest.diluted_margin * contest.ballots
+        weighted_errors = (
+            sample.last_pair_error / sample.last_pair_margin
+            if sample.last_pair_margin
+            else np.full(len(sample.ballots), np.inf)
+        )
+        weighted_errors = np.where(sample.not_found, 2 / V, weighted_errors)
+        weighted_errors = np.where(sample.found, weighted_errors, 0)
+
+        U = 2 * float(gamma) / contest.diluted_margin
+        denom = (2 * float(gamma)) / V
+        with np.errstate(divide="ignore"):
+            p_b = (1 - 1 / U) / (1 - (weighted_errors / denom))
+
+        if np.any(p_b[sample.times_sampled > 0] == 0):
+            log_p = None
+        else:
+            if np.sum(sample.times_sampled[p_b < 0]) % 2:
+                p_sign = -p_sign
+            log_p += float(np.sum(sample.times_sampled * np.log(np.abs(p_b))))
+
+    return RiskState(
+        log_p=log_p,
+        p_sign=p_sign,
+        num_ballots=state["num_ballots"] + int(np.sum(is_first_sampled)),
+        num_draws=state["num_draws"] + int(np.sum(sample.times_sampled)),
+        discrepancy_counts=discrepancy_counts,
+    )
+
+
+def risk_from_state(
+    risk_limit: int, contest: Contest, state: RiskState
+) -> Tuple[float, bool]:
+    """
+    Computes the p-value and whether the audit can stop from a risk
+    measurement's running state (see compute_risk).
+    """
+    alpha = Decimal(risk_limit) / 100
+    assert alpha < 1
+
+    if state["num_ballots"] >= contest.ballots:
+        # We've done a full hand recount
+        return 0, True
+
+    if state["log_p"] is None:
+        return 0.0, False
+
+    with np.errstate(over="ignore"):
+        p = state["p_sign"] * float(np.exp(state["log_p"]))
+
+    return p, state["p_sign"] > 0 and state["log_p"] < math.log(alpha)
+
+
 def compute_risk(
     risk_limit: int, contest: Contest, cvrs: CVRS, sample_cvr: SAMPLE_CVRS,
 ) -> Tuple[float, bool]:
@@ -291,47 +493,12 @@ def compute_risk(
         measurements    - the p-value of the hypotheses that the election
                           result is correct based on the sample, for each winner-loser pair.
         confirmed       - a boolean indicating whether the audit can stop
-    """
-    alpha = Decimal(risk_limit) / 100
-    assert alpha < 1
-
-    p = Decimal(1.0)
-
-    N = contest.ballots
-    V = Decimal(contest.diluted_margin * N)
-
-    if contest.diluted_margin == 0:
-        U = Decimal("inf")
-    else:
-        U = 2 * gamma / Decimal(contest.diluted_margin)
-
-    result = False
-
-    discrepancies = compute_discrepancies(contest, cvrs, sample_cvr)
-
-    for ballot in sample_cvr:
-        if ballot in discrepancies:
-            e_r = discrepancies[ballot]["weighted_error"]
-        else:
-            e_r = Decimal(0)
-
-        if contest.diluted_margin:
-            U = 2 * gamma / Decimal(contest.diluted_margin)
-            denom = (2 * gamma) / V
-            p_b = (1 - 1 / U) / (1 - (e_r / denom))
-        else:
-            # If the contest is a tie, this step results in 1 - 1/(infinity)
-            # divided by 1 - e_r/infinity, i.e. 1
-            p_b = Decimal(1.0)
-
-        multiplicity = sample_cvr[ballot]["times_sampled"]
-        p *= p_b ** multiplicity
-
-    if 0 < p < alpha:
-        result = True
 
-    if len(sample_cvr) >= N:
-        # We've done a full hand recount
-        return 0, True
-
-    return float(p), result
+    The p-value is computed with floats (see sample_discrepancies), and
+    matches computing it exactly (with Decimals) to a relative tolerance of
+    1e-9.
+    """
+    state = update_risk_state(
+        initial_risk_state(), contest, cvrs, sample_cvr, set(sample_cvr)
+    )
+    return risk_from_state(risk_limit, contest, state)
@@ -1,195 +1,531 @@
+import os
+import datetime
 import time
+import signal
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from select import select as select_readable
+from typing import Callable, Iterator, List
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy.orm import aliased
 
 from server.app import app
-from server.database import db_session
+from server.config import BGCOMPUTE_PROCESSES, DATABASE_URL
+from server.database import db_session, engine
 from server.models import *  # pylint: disable=wildcard-import
 from server.util.jurisdiction_bulk_update import process_jurisdictions_file
 from server.api.standardized_contests import process_standardized_contests_file
 from server.api.ballot_manifest import process_ballot_manifest_file
 from server.api.batch_tallies import process_batch_tallies_file
 from server.api.cvrs import process_cvr_file
+from server.api.rounds import process_draw_sample, start_draw_sample
+from server.util.process_file import (
+    BGCOMPUTE_CHANNEL,
+    PROCESSING_JOB_LEASE,
+    start_processing_job,
+)
+
+
+# The most workers that may work on each type of task at once, so that a
+# burst of uploads of one type doesn't tie up all the workers or overwhelm
+# the db. Loading CVR files and drawing samples are by far the heaviest
+# tasks, so they get the fewest workers.
+TASK_CONCURRENCY_LIMITS = {
+    FileType.JURISDICTIONS.value: 2,
+    FileType.STANDARDIZED_CONTESTS.value: 2,
+    FileType.BALLOT_MANIFEST.value: 4,
+    FileType.BATCH_TALLIES.value: 4,
+    FileType.CVRS.value: 2,
+    "DRAW_SAMPLE": 2,
+}
+
+# How often workers renew their leases on the jobs they're processing
+LEASE_RENEWAL_INTERVAL = PROCESSING_JOB_LEASE / 3
+
+# Workers are woken up by a notification when a new task is created (see
+# notify_bgcompute). If they don't hear anything for this many seconds,
+# they check for tasks anyway, in case a notification was missed (e.g. while
+# a worker was restarting).
+SWEEP_INTERVAL = 60
+
+# Set when the worker has been asked to shut down. Workers finish the task
+# they're working on, but don't start any new ones.
+shutdown_requested = threading.Event()
+
+
+@contextmanager
+def task_slot(task: str) -> Iterator[bool]:
+    """
+    Tries to take one of the slots for <task> (see TASK_CONCURRENCY_LIMITS),
+    shared by all workers. Each slot is a Postgres advisory lock, which we
+    hold on a separate connection until we're done with the task. Yields
+    whether we got a slot.
+    """
+    with engine.connect() as connection:
+        for slot in range(TASK_CONCURRENCY_LIMITS[task]):
+            lock_key = (func.hashtext(task), slot)
+            if connection.execute(
+                select([func.pg_try_advisory_lock(*lock_key)])
+            ).scalar():
+                try:
+                    yield True
+                finally:
+                    connection.execute(select([func.pg_advisory_unlock(*lock_key)]))
+                return
+        yield False
+
+
+def claim_pending_files(file_types: List[FileType]) -> Iterator[ProcessingJob]:
+    """
+    Yields the jobs for files of <file_types> waiting to be processed, highest
+    priority first, one at a time.
+
+    A job is waiting if it's queued, or if the worker processing it let its
+    lease expire (i.e. the worker died). We claim a job by starting a new
+    attempt at it (see start_processing_job), and keep renewing the lease
+    while the caller processes the file. Jobs are locked with SELECT ... FOR
+    UPDATE SKIP LOCKED while we claim them, so no two workers can claim the
+    same job. If we can't get a slot for a file type, we leave its files for
+    the other workers.
+
+    CVR and batch tallies files are parsed against their jurisdiction's
+    ballot manifest, so we leave them waiting until the manifest is done
+    processing, even if another worker is free to take them.
+    """
+    manifest_job = aliased(ProcessingJob)
+    waiting_for_manifest = exists().where(
+        and_(
+            or_(
+                Jurisdiction.cvr_file_id == ProcessingJob.file_id,
+                Jurisdiction.batch_tallies_file_id == ProcessingJob.file_id,
+            ),
+            manifest_job.file_id == Jurisdiction.manifest_file_id,
+            manifest_job.state.in_(
+                [ProcessingJobState.QUEUED, ProcessingJobState.RUNNING]
+            ),
+        )
+    )
+    full_file_types: List[FileType] = []
+    while not shutdown_requested.is_set():
+        query = (
+            ProcessingJob.query.filter(
+                ProcessingJob.file_type.in_(file_types),
+                or_(
+                    ProcessingJob.state == ProcessingJobState.QUEUED,
+                    and_(
+                        ProcessingJob.state == ProcessingJobState.RUNNING,
+                        ProcessingJob.lease_expires_at < datetime.datetime.utcnow(),
+                    ),
+                ),
+                ~waiting_for_manifest,
+            )
+            .order_by(ProcessingJob.priority.desc(), ProcessingJob.created_at)
+            .with_for_update(skip_locked=True)
+        )
+        if full_file_types:
+            query = query.filter(ProcessingJob.file_type.notin_(full_file_types))
+        job = query.first()
+        if job is None:
+            db_session.commit()
+            return
+
+        with task_slot(job.file_type.value) as got_slot:
+            if not got_slot:
+                full_file_types.append(job.file_type)
+                db_session.rollback()
+                continue
+
+            if start_processing_job(db_session, job):
+                with renew_lease(job):
+                    yield job
+            # Clean up after processing, even if it failed without finishing
+            # the transaction.
+            db_session.rollback()
+
+
+@contextmanager
+def keep_renewing(renew: Callable[[datetime.datetime], None], description: str):
+    """
+    Keeps calling <renew> with a new lease expiration time from a background
+    thread, so that other workers know we're still working on a task.
+    """
+    done = threading.Event()
+
+    def renew_until_done():
+        while not done.wait(LEASE_RENEWAL_INTERVAL.total_seconds()):
+            try:
+                renew(datetime.datetime.utcnow() + PROCESSING_JOB_LEASE)
+            except Exception:  # pragma: no cover
+                app.logger.exception(f"ERROR renewing lease. {description}")
+
+    thread = threading.Thread(target=renew_until_done, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def renew_lease(job: ProcessingJob):
+    """
+    Keeps extending our lease on <job> while we're working on it.
+    """
+    file_id = job.file_id
+
+    def renew(lease_expires_at: datetime.datetime):
+        with engine.begin() as connection:
+            connection.execute(
+                update(ProcessingJob.__table__)  # pylint: disable=no-member
+                .where(ProcessingJob.file_id == file_id)
+                .where(ProcessingJob.state == ProcessingJobState.RUNNING)
+                .values(lease_expires_at=lease_expires_at)
+            )
+
+    return keep_renewing(renew, f"file_id: {file_id}")
+
+
+def renew_draw_sample_lease(round: Round):
+    """
+    Keeps extending our lease on drawing the sample for <round> while we're
+    working on it.
+    """
+    round_id = round.id
+    draw_sample_started_at = round.draw_sample_started_at
+
+    def renew(lease_expires_at: datetime.datetime):
+        with engine.begin() as connection:
+            connection.execute(
+                update(Round.__table__)  # pylint: disable=no-member
+                .where(Round.id == round_id)
+                .where(Round.draw_sample_started_at == draw_sample_started_at)
+                .where(Round.draw_sample_completed_at.is_(None))
+                .values(draw_sample_lease_expires_at=lease_expires_at)
+            )
+
+    return keep_renewing(renew, f"round_id: {round_id}")
+
+
+def claim_pending_rounds() -> Iterator[Round]:
+    """
+    Yields the rounds waiting for their samples to be drawn, oldest first, one
+    at a time.
+
+    Like claim_pending_files, a round is waiting if its draw hasn't started,
+    or if the worker drawing it let its lease expire. We claim a round by
+    starting a new attempt at the draw (see start_draw_sample) while it's
+    locked with SELECT ... FOR UPDATE SKIP LOCKED, and keep renewing the lease
+    while the caller draws the sample. If we can't get a slot, we leave the
+    rounds for the other workers.
+    """
+    attempted_round_ids: List[str] = []
+    while not shutdown_requested.is_set():
+        with task_slot("DRAW_SAMPLE") as got_slot:
+            if not got_slot:
+                return
+
+            query = (
+                Round.query.filter(
+                    Round.draw_sample_completed_at.is_(None),
+                    or_(
+                        Round.draw_sample_started_at.is_(None),
+                        Round.draw_sample_lease_expires_at < datetime.datetime.utcnow(),
+                    ),
+                )
+                .order_by(Round.created_at)
+                .with_for_update(skip_locked=True, of=Round)
+            )
+            if attempted_round_ids:
+                query = query.filter(Round.id.notin_(attempted_round_ids))
+            round = query.first()
+            if round is None:
+                db_session.commit()
+                return
+
+            attempted_round_ids.append(round.id)
+            if start_draw_sample(db_session, round):
+                with renew_draw_sample_lease(round):
+                    yield round
+            # Clean up after drawing, even if it failed without finishing the
+            # transaction.
+            db_session.rollback()
+
 
+def bgcompute() -> int:
+    return bgcompute_update_files(list(FileType)) + bgcompute_draw_sample()
 
-def bgcompute():
-    bgcompute_update_election_jurisdictions_file()
-    bgcompute_update_standardized_contests_file()
-    bgcompute_update_ballot_manifest_file()
-    bgcompute_update_batch_tallies_file()
-    bgcompute_update_cvr_file()
+
+def bgcompute_update_files(file_types: List[FileType]) -> int:
+    num_files = 0
+    for job in claim_pending_files(file_types):
+        num_files += 1
+        FILE_PROCESSORS[job.file_type](job.file)
+    return num_files
 
 
 def bgcompute_update_election_jurisdictions_file() -> int:
-    files = (
-        File.query.join(Election, File.id == Election.jurisdictions_file_id)
-        .filter(File.processing_started_at.is_(None))
-        .all()
-    )
+    return bgcompute_update_files([FileType.JURISDICTIONS])
 
-    for file in files:
-        try:
-            election = Election.query.filter_by(jurisdictions_file_id=file.id).one()
 
-            # Save election_id in a variable so we can log it even if some
-            # error happens and the election object is borked
-            election_id = election.id
+def bgcompute_update_standardized_contests_file() -> int:
+    return bgcompute_update_files([FileType.STANDARDIZED_CONTESTS])
 
-            app.logger.info(
-                f"START updating jurisdictions file. election_id: {election_id}"
-            )
 
-            process_jurisdictions_file(db_session, election, file)
+def bgcompute_update_ballot_manifest_file() -> int:
+    return bgcompute_update_files([FileType.BALLOT_MANIFEST])
 
-            app.logger.info(
-                f"DONE updating jurisdictions file. election_id: {election_id}"
-            )
-        except Exception:
-            app.logger.exception(
-                f"ERROR updating jurisdictions file. election_id: {election_id}"
-            )
 
-    return len(files)
+def bgcompute_update_batch_tallies_file() -> int:
+    return bgcompute_update_files([FileType.BATCH_TALLIES])
 
 
-def bgcompute_update_standardized_contests_file() -> int:
-    files = (
-        File.query.join(Election, File.id == Election.standardized_contests_file_id)
-        .filter(File.processing_started_at.is_(None))
-        .all()
-    )
+def bgcompute_update_cvr_file() -> int:
+    return bgcompute_update_files([FileType.CVRS])
 
-    for file in files:
-        try:
-            election = Election.query.filter_by(
-                standardized_contests_file_id=file.id
-            ).one()
 
-            # Save election_id in a variable so we can log it even if some
-            # error happens and the election object is borked
-            election_id = election.id
+def update_election_jurisdictions_file(file: File):
+    try:
+        election = Election.query.filter_by(jurisdictions_file_id=file.id).one()
 
-            app.logger.info(
-                f"START updating standardized contests file. election_id: {election_id}"
-            )
+        # Save election_id in a variable so we can log it even if some
+        # error happens and the election object is borked
+        election_id = election.id
 
-            process_standardized_contests_file(db_session, election, file)
+        app.logger.info(
+            f"START updating jurisdictions file. election_id: {election_id}"
+        )
 
-            app.logger.info(
-                f"DONE updating standardized contests file. election_id: {election_id}"
-            )
-        except Exception:
-            app.logger.exception(
-                f"ERROR updating standardized contests file. election_id: {election_id}"
-            )
+        process_jurisdictions_file(db_session, election, file)
 
-    return len(files)
+        app.logger.info(f"DONE updating jurisdictions file. election_id: {election_id}")
+    except Exception:
+        app.logger.exception(
+            f"ERROR updating jurisdictions file. election_id: {election_id}"
+        )
 
 
-def bgcompute_update_ballot_manifest_file() -> int:
-    files = (
-        File.query.join(Jurisdiction, File.id == Jurisdiction.manifest_file_id)
-        .filter(File.processing_started_at.is_(None))
-        .all()
-    )
+def update_standardized_contests_file(file: File):
+    try:
+        election = Election.query.filter_by(standardized_contests_file_id=file.id).one()
 
-    for file in files:
-        try:
-            jurisdiction = Jurisdiction.query.filter_by(manifest_file_id=file.id).one()
+        # Save election_id in a variable so we can log it even if some
+        # error happens and the election object is borked
+        election_id = election.id
 
-            # Save ids in variables so we can log them even if some
-            # error happens and the ORM objects are borked
-            election_id = jurisdiction.election_id
-            jurisdiction_id = jurisdiction.id
+        app.logger.info(
+            f"START updating standardized contests file. election_id: {election_id}"
+        )
 
-            app.logger.info(
-                f"START updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
+        process_standardized_contests_file(db_session, election, file)
 
-            process_ballot_manifest_file(db_session, jurisdiction, file)
+        app.logger.info(
+            f"DONE updating standardized contests file. election_id: {election_id}"
+        )
+    except Exception:
+        app.logger.exception(
+            f"ERROR updating standardized contests file. election_id: {election_id}"
+        )
 
-            app.logger.info(
-                f"DONE updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
-        except Exception:
-            app.logger.exception(
-                f"ERROR updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
 
-    return len(files)
+def update_ballot_manifest_file(file: File):
+    try:
+        jurisdiction = Jurisdiction.query.filter_by(manifest_file_id=file.id).one()
 
+        # Save ids in variables so we can log them even if some
+        # error happens and the ORM objects are borked
+        election_id = jurisdiction.election_id
+        jurisdiction_id = jurisdiction.id
 
-def bgcompute_update_batch_tallies_file() -> int:
-    files = (
-        File.query.join(Jurisdiction, File.id == Jurisdiction.batch_tallies_file_id)
-        .filter(File.processing_started_at.is_(None))
-        .all()
-    )
+        app.logger.info(
+            f"START updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
 
-    for file in files:
-        try:
-            jurisdiction = Jurisdiction.query.filter_by(
-                batch_tallies_file_id=file.id
-            ).one()
+        process_ballot_manifest_file(db_session, jurisdiction, file)
 
-            # Save ids in variables so we can log them even if some
-            # error happens and the ORM objects are borked
-            election_id = jurisdiction.election_id
-            jurisdiction_id = jurisdiction.id
+        app.logger.info(
+            f"DONE updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
+    except Exception:
+        app.logger.exception(
+            f"ERROR updating ballot manifest file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
 
-            app.logger.info(
-                f"START updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
 
-            process_batch_tallies_file(db_session, jurisdiction, file)
+def update_batch_tallies_file(file: File):
+    try:
+        jurisdiction = Jurisdiction.query.filter_by(batch_tallies_file_id=file.id).one()
 
-            app.logger.info(
-                f"DONE updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
-        except Exception:
-            app.logger.exception(
-                f"ERROR updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
-            )
+        # Save ids in variables so we can log them even if some
+        # error happens and the ORM objects are borked
+        election_id = jurisdiction.election_id
+        jurisdiction_id = jurisdiction.id
 
-    return len(files)
+        app.logger.info(
+            f"START updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
 
+        process_batch_tallies_file(db_session, jurisdiction, file)
 
-def bgcompute_update_cvr_file() -> int:
-    files = (
-        File.query.join(Jurisdiction, File.id == Jurisdiction.cvr_file_id)
-        .filter(File.processing_started_at.is_(None))
-        .all()
-    )
+        app.logger.info(
+            f"DONE updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
+    except Exception:
+        app.logger.exception(
+            f"ERROR updating batch tallies file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
 
-    for file in files:
-        try:
-            jurisdiction = Jurisdiction.query.filter_by(cvr_file_id=file.id).one()
 
+def update_cvr_file(file: File):
+    try:
+        jurisdiction = Jurisdiction.query.filter_by(cvr_file_id=file.id).one()
+
+        # Save ids in variables so we can log them even if some
+        # error happens and the ORM objects are borked
+        election_id = jurisdiction.election_id
+        jurisdiction_id = jurisdiction.id
+
+        app.logger.info(
+            f"START updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
+
+        process_cvr_file(db_session, jurisdiction, file)
+
+        app.logger.info(
+            f"DONE updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
+    except Exception:
+        app.logger.exception(
+            f"ERROR updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+        )
+
+
+FILE_PROCESSORS = {
+    FileType.JURISDICTIONS: update_election_jurisdictions_file,
+    FileType.STANDARDIZED_CONTESTS: update_standardized_contests_file,
+    FileType.BALLOT_MANIFEST: update_ballot_manifest_file,
+    FileType.BATCH_TALLIES: update_batch_tallies_file,
+    FileType.CVRS: update_cvr_file,
+}
+
+
+def bgcompute_draw_sample() -> int:
+    num_rounds = 0
+    for round in claim_pending_rounds():
+        num_rounds += 1
+        try:
             # Save ids in variables so we can log them even if some
             # error happens and the ORM objects are borked
-            election_id = jurisdiction.election_id
-            jurisdiction_id = jurisdiction.id
+            election_id = round.election_id
+            round_id = round.id
 
             app.logger.info(
-                f"START updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+                f"START drawing sample. election_id: {election_id}, round_id: {round_id}"
             )
 
-            process_cvr_file(db_session, jurisdiction, file)
+            process_draw_sample(db_session, round)
 
             app.logger.info(
-                f"DONE updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+                f"DONE drawing sample. election_id: {election_id}, round_id: {round_id}"
             )
         except Exception:
             app.logger.exception(
-                f"ERROR updating CVR file. election_id: {election_id}, jurisdiction_id: {jurisdiction_id}"
+                f"ERROR drawing sample. election_id: {election_id}, round_id: {round_id}"
             )
 
-    return len(files)
+    return num_rounds
+
+
+@contextmanager
+def listen_for_tasks() -> Iterator[psycopg2.extensions.connection]:
+    # We use a dedicated connection for listening, outside of the connection
+    # pool, since it has to stay out of any transaction to get notifications.
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        connection.cursor().execute(f"LISTEN {BGCOMPUTE_CHANNEL}")
+        yield connection
+    finally:
+        connection.close()
+
+
+def wait_for_task(connection: psycopg2.extensions.connection, timeout: float) -> bool:
+    """
+    Waits until we're notified of a new task, <timeout> seconds pass, or we're
+    asked to shut down. Returns whether we were notified.
+    """
+    deadline = time.monotonic() + timeout
+    while not shutdown_requested.is_set():
+        connection.poll()
+        if connection.notifies:
+            # Any number of notifications just means we should check for
+            # tasks once.
+            connection.notifies.clear()
+            return True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Wake up at least once a second to check whether we should shut down
+        select_readable([connection], [], [], min(remaining, 1))
+    return False
 
 
 def bgcompute_forever():
-    while True:
-        bgcompute()
-        time.sleep(2)
+    with listen_for_tasks() as connection:
+        # Keep going until we're asked to shut down. If we didn't find
+        # anything to do, wait until there's a new task.
+        while not shutdown_requested.is_set():
+            if bgcompute() == 0:
+                wait_for_task(connection, SWEEP_INTERVAL)
+
+
+def request_shutdown(_signal_number, _frame):
+    shutdown_requested.set()
 
 
-if __name__ == "__main__":
+def run_worker():
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+    app.logger.info(f"START bgcompute worker. pid: {os.getpid()}")
     bgcompute_forever()
+    app.logger.info(f"DONE bgcompute worker. pid: {os.getpid()}")
+
+
+def run_workers(num_workers: int):  # pragma: no cover
+    """
+    Runs <num_workers> worker processes, replacing any that die, until we're
+    asked to shut down. Then we pass the request on to the workers and wait
+    for them to finish what they're working on.
+    """
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    workers: List[multiprocessing.Process] = []
+    while not shutdown_requested.is_set():
+        for worker in workers:
+            if not worker.is_alive():
+                app.logger.error(
+                    f"ERROR bgcompute worker died. pid: {worker.pid}, exitcode: {worker.exitcode}"
+                )
+        workers = [worker for worker in workers if worker.is_alive()]
+        while len(workers) < num_workers:
+            # We start each worker as a fresh process (rather than forking),
+            # so that it doesn't share any db connections with this one.
+            worker = multiprocessing.get_context("spawn").Process(target=run_worker)
+            worker.start()
+            workers.append(worker)
+        shutdown_requested.wait(5)
+
+    for worker in workers:
+        worker.terminate()  # Sends SIGTERM, which requests a graceful shutdown
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    if BGCOMPUTE_PROCESSES > 1:
+        run_workers(BGCOMPUTE_PROCESSES)
+    else:
+        run_worker()
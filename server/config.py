@@ -1,5 +1,6 @@
 import os
-from typing import Tuple
+import tempfile
+from typing import Optional, Tuple
 
 ###
 ###
@@ -143,3 +144,36 @@ def read_jurisdictionadmin_auth0_creds() -> Tuple[str, str, str]:
 ) = read_jurisdictionadmin_auth0_creds()
 
 SENTRY_DSN = os.environ.get("SENTRY_DSN")
+
+
+def read_sample_processes() -> int:
+    # How many processes to use to draw the samples for the targeted contests
+    # in parallel when starting a round. By default, we draw them serially.
+    return int(os.environ.get("ARLO_SAMPLE_PROCESSES", "1"))
+
+
+SAMPLE_PROCESSES = read_sample_processes()
+
+
+def read_file_storage_url() -> Optional[str]:
+    # Where to store the contents of uploaded files (see util/file_storage.py).
+    # In production, this should be an S3 bucket, since the web and worker
+    # dynos don't share a disk. If it's not set, we keep the contents in the db.
+    file_storage_url = os.environ.get("ARLO_FILE_STORAGE_URL", None)
+
+    if not file_storage_url and FLASK_ENV in DEVELOPMENT_ENVS:
+        file_storage_url = f"file://{tempfile.gettempdir()}/arlo-{FLASK_ENV}-files"
+
+    return file_storage_url
+
+
+FILE_STORAGE_URL = read_file_storage_url()
+
+
+def read_bgcompute_processes() -> int:
+    # How many worker processes to run for background tasks (see
+    # bgcompute.py). Each worker processes one task at a time.
+    return int(os.environ.get("ARLO_BGCOMPUTE_PROCESSES", "1"))
+
+
+BGCOMPUTE_PROCESSES = read_bgcompute_processes()
@@ -0,0 +1,83 @@
+# pylint: disable=invalid-name
+"""Packed CVR interpretations
+
+Revision ID: 3a9d6f2c8b17
+Revises: e5b2c8a7f431
+Create Date: 2026-10-19 02:41:07.529316+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3a9d6f2c8b17"
+down_revision = "e5b2c8a7f431"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "cvr_ballot",
+        sa.Column("packed_interpretations", sa.LargeBinary(), nullable=True),
+    )
+    # Each packed interpretation only has room for 0-254 (255 marks a blank
+    # cell), so refuse to migrate rather than truncating anything bigger.
+    # parse_interpretations rejects these values for new uploads.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            bad_cell text;
+        BEGIN
+            SELECT cell INTO bad_cell
+            FROM cvr_ballot, unnest(string_to_array(interpretations, ',')) AS cell
+            WHERE CASE WHEN cell = '' THEN false
+                ELSE cell::int NOT BETWEEN 0 AND 254 END
+            LIMIT 1;
+            IF FOUND THEN
+                RAISE EXCEPTION
+                    'Cannot pack CVR interpretation %: must be between 0 and 254',
+                    bad_cell;
+            END IF;
+        END $$
+        """
+    )
+    # Pack the raw interpretation strings (e.g. "1,0,,1") into one byte per
+    # column, with 255 for blank cells (see CvrBallot.interpretations)
+    op.execute(
+        """
+        UPDATE cvr_ballot
+        SET packed_interpretations = COALESCE(
+            (
+                SELECT decode(
+                    string_agg(
+                        lpad(
+                            to_hex(CASE WHEN cell = '' THEN 255 ELSE cell::int END),
+                            2,
+                            '0'
+                        ),
+                        ''
+                        ORDER BY position
+                    ),
+                    'hex'
+                )
+                FROM unnest(string_to_array(interpretations, ','))
+                    WITH ORDINALITY AS cells(cell, position)
+            ),
+            ''::bytea
+        )
+        """
+    )
+    op.drop_column("cvr_ballot", "interpretations")
+    op.alter_column(
+        "cvr_ballot",
+        "packed_interpretations",
+        new_column_name="interpretations",
+        nullable=False,
+    )
+
+
+def downgrade():  # pragma: no cover
+    pass
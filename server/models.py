@@ -1,10 +1,21 @@
 import enum
-from typing import Type
+import io
+from collections import defaultdict
+from typing import Any, Callable, Dict, Set, Type, TextIO
 from datetime import datetime as dt
 from werkzeug.exceptions import NotFound
 from sqlalchemy import *  # pylint: disable=wildcard-import
-from sqlalchemy.orm import relationship, backref, validates
-from .database import Base  # pylint: disable=cyclic-import
+from sqlalchemy import event
+from sqlalchemy.orm import (
+    relationship,
+    backref,
+    validates,
+    deferred,
+    object_session,
+    Session,
+)
+from .database import Base, db_session  # pylint: disable=cyclic-import
+from .util.file_storage import write_file_chunks, open_file_chunks, delete_file_chunks
 
 
 class BaseModel(Base):
@@ -39,6 +50,17 @@ class AuditMathType(str, enum.Enum):
     MACRO = "MACRO"
 
 
+# Which algorithm we use to draw batch samples with PPEB (see
+# audit_math/sampler.py). The two pick different batches for the same seed, so
+# an audit keeps using the one it drew its first round with.
+class PpebSampler(str, enum.Enum):
+    # Draw from a faux manifest with copies of each batch in proportion to its
+    # error bound (draw_ppeb_sample_duplicated_batches)
+    DUPLICATED_BATCHES = "DUPLICATED_BATCHES"
+    # Draw each batch from the cumulative error bounds (draw_ppeb_sample)
+    CUMULATIVE_ERRORS = "CUMULATIVE_ERRORS"
+
+
 # Election is a slight misnomer - this model represents an audit.
 class Election(BaseModel):
     id = Column(String(200), primary_key=True)
@@ -113,6 +135,16 @@ class Election(BaseModel):
     )
     standardized_contests = Column(JSON)
 
+    # Set when we draw the first round of a batch comparison audit
+    ppeb_sampler = Column(Enum(PpebSampler))
+
+    # Bumped whenever any of the data that the sample size options depend on
+    # changes (see bump_sample_size_inputs_version below), so that we can tell
+    # if cached sample size options are still valid.
+    sample_size_inputs_version = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
     __table_args__ = (UniqueConstraint("organization_id", "audit_name"),)
 
 
@@ -404,6 +436,24 @@ class Round(BaseModel):
     round_num = Column(Integer, nullable=False)
     ended_at = Column(DateTime)
 
+    # Drawing the sample can take a while for big elections, so we do it in
+    # the background (see bgcompute_draw_sample). For round 1, we store the
+    # sample sizes chosen by the audit admin until then. For later rounds, the
+    # sample sizes are computed when the sample is drawn.
+    requested_sample_sizes = Column(JSON)
+    draw_sample_started_at = Column(DateTime)
+    draw_sample_completed_at = Column(DateTime)
+    draw_sample_error = Column(Text)
+    # Like ProcessingJob, the worker drawing the sample holds a lease on the
+    # round, so that another worker can take over if it dies.
+    draw_sample_attempts = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    draw_sample_lease_expires_at = Column(DateTime)
+    # Progress reported while drawing the sample, e.g.
+    # { "contestsDrawn": 1, "totalContests": 2, "rowsWritten": 1000 }
+    draw_sample_progress = Column(JSON)
+
     __table_args__ = (UniqueConstraint("election_id", "round_num"),)
 
     round_contests = relationship(
@@ -558,6 +608,11 @@ class RoundContest(BaseModel):
     is_complete = Column(Boolean)
     sample_size = Column(Integer)
 
+    # For ballot comparison audits, the running state of the risk measurement
+    # as of the end of this round (see supersimple.RiskState), so that the
+    # next round only needs to fold in the ballots it sampled.
+    risk_state = Column(JSON)
+
 
 class RoundContestResult(BaseModel):
     round_id = Column(
@@ -630,6 +685,18 @@ class SampledBatchDraw(BaseModel):
     __table_args__ = (PrimaryKeyConstraint("batch_id", "round_id", "ticket_number"),)
 
 
+# Stores the state of the sampler after drawing the sample for a contest, so
+# that the next round can pick up where the last one left off instead of
+# redrawing every ticket from previous rounds. The state records a fingerprint
+# of the random seed and manifest it was computed for, and is ignored if they
+# no longer match.
+class ContestSamplerState(BaseModel):
+    contest_id = Column(
+        String(200), ForeignKey("contest.id", ondelete="cascade"), primary_key=True,
+    )
+    state = Column(JSON, nullable=False)
+
+
 # Records the audited vote count for one sampled batch for one contest choice.
 class BatchResult(BaseModel):
     batch_id = Column(
@@ -656,25 +723,133 @@ class CvrBallot(Base):
     batch = relationship("Batch")
     ballot_position = Column(Integer, nullable=False)
     imprinted_id = Column(String(200), nullable=False)
-    # We store the raw string of 0s and 1s from the CVR row to make insertion
-    # fast. We parse them when needed by the audit math using the contest
-    # headers saved in Juridsiction.cvr_contests_metadata.
-    interpretations = Column(Text, nullable=False)
+    # The interpretation columns from the CVR row, packed into one byte per
+    # column: the number of votes for the choice, or 255 if the cell was blank
+    # (i.e. the contest wasn't on the ballot). Packing them makes the table
+    # about half the size of storing the raw string (e.g. "1,0,,1"), and lets
+    # us pick out the columns for one contest in SQL with get_byte. See
+    # api/cvrs.py for the encoder and decoder, and
+    # Jurisdiction.cvr_contests_metadata for which column is which.
+    interpretations = Column(LargeBinary, nullable=False)
 
     __table_args__ = (PrimaryKeyConstraint("batch_id", "ballot_position"),)
 
 
+# Changes to the file store can't be part of a db transaction, so we line them
+# up to run once we know whether the current transaction committed.
+def on_commit(instance: Base, callback: Callable[[], None]):
+    session = object_session(instance) or db_session()
+    session.info.setdefault("on_commit", []).append(callback)
+
+
+def on_rollback(instance: Base, callback: Callable[[], None]):
+    session = object_session(instance) or db_session()
+    session.info.setdefault("on_rollback", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def run_on_commit_callbacks(session: Session):
+    session.info.pop("on_rollback", None)
+    for callback in session.info.pop("on_commit", []):
+        callback()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def run_on_rollback_callbacks(session: Session, transaction):
+    # If the transaction committed, after_commit already cleared these out
+    if transaction.parent is not None:
+        return
+    session.info.pop("on_commit", None)
+    for callback in session.info.pop("on_rollback", []):
+        callback()
+
+
 class File(BaseModel):
     id = Column(String(200), primary_key=True)
     name = Column(String(250), nullable=False)
-    contents = Column(Text, nullable=False)
     uploaded_at = Column(DateTime, nullable=False)
 
+    # The contents of the file are kept as compressed chunks in the file store
+    # (see util/file_storage.py). Files uploaded before we had the file store
+    # have their contents in the db instead. The contents can be big, so we
+    # only load them when they're used (in File.open).
+    contents = deferred(Column(Text))
+    num_chunks = Column(Integer)
+
     # Metadata for processing files in the background.
     processing_started_at = Column(DateTime)
     processing_completed_at = Column(DateTime)
     processing_error = Column(Text)
 
+    def save_contents(self, contents: str):
+        self.num_chunks = write_file_chunks(self.id, contents.encode("utf-8"))
+        if self.num_chunks is None:
+            # There's no file store, so keep the contents in the db
+            self.contents = contents
+        else:
+            self.contents = None
+            # If this file never gets committed, nothing will refer to the
+            # chunks, so clean them up.
+            file_id = self.id
+            on_rollback(self, lambda: delete_file_chunks(file_id))
+
+    def open(self) -> TextIO:
+        if self.num_chunks is None:
+            return io.StringIO(self.contents, newline="")
+        return open_file_chunks(self.id, self.num_chunks)
+
+    processing_job = relationship(
+        "ProcessingJob",
+        back_populates="file",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    def delete_contents(self):
+        # Only delete the chunks once the file's deletion is committed, so that
+        # if it's rolled back, the file still has its contents.
+        if self.num_chunks is not None:
+            file_id = self.id
+            on_commit(self, lambda: delete_file_chunks(file_id))
+
+
+class FileType(str, enum.Enum):
+    JURISDICTIONS = "JURISDICTIONS"
+    STANDARDIZED_CONTESTS = "STANDARDIZED_CONTESTS"
+    BALLOT_MANIFEST = "BALLOT_MANIFEST"
+    BATCH_TALLIES = "BATCH_TALLIES"
+    CVRS = "CVRS"
+
+
+class ProcessingJobState(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
+# A job in the queue of files for bgcompute to process. A worker takes a
+# lease on a job while it's processing the file, which it keeps renewing. If
+# the worker dies, the lease expires and another worker picks the job up.
+class ProcessingJob(BaseModel):
+    file_id = Column(
+        String(200), ForeignKey("file.id", ondelete="cascade"), primary_key=True
+    )
+    file = relationship("File", back_populates="processing_job")
+    file_type = Column(Enum(FileType), nullable=False)
+    state = Column(Enum(ProcessingJobState), nullable=False)
+    # Jobs with higher priority are processed first
+    priority = Column(Integer, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    lease_expires_at = Column(DateTime)
+    # Timestamps for the latest attempt
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    # How many rows of the file were processed
+    num_rows = Column(Integer)
+    error = Column(Text)
+
 
 class ProcessingStatus(str, enum.Enum):
     READY_TO_PROCESS = "READY_TO_PROCESS"
@@ -744,6 +919,84 @@ class USState(str, enum.Enum):
     ArmedForcesPacific = "AP"
 
 
+def bump_sample_size_inputs_version(session: Session, election_ids):
+    """
+    Bumps Election.sample_size_inputs_version for <election_ids> (a list of
+    ids or a query that selects them).
+    """
+    session.execute(
+        update(Election.__table__)  # pylint: disable=no-member
+        .where(Election.id.in_(election_ids))
+        .values(
+            sample_size_inputs_version=Election.sample_size_inputs_version + 1,
+            # Leave updated_at alone, since the election itself didn't change
+            updated_at=Election.updated_at,
+        )
+    )
+
+
+# The models that the sample size options depend on, and the foreign key we
+# can follow from each one to find its election.
+#
+# The sample sizes also depend on the audit results from earlier rounds, but
+# we leave the result tables (sampled ballots, interpretations, batch results)
+# out: they change with every ballot the audit boards enter, and bumping the
+# version each time would lock the election row on that path. Results only
+# count toward the sample sizes once their round ends (see end_round), which
+# updates the round.
+SAMPLE_SIZE_INPUT_MODELS = {
+    Election: ("id", None),
+    Contest: ("election_id", None),
+    Jurisdiction: ("election_id", None),
+    Round: ("election_id", None),
+    ContestChoice: ("contest_id", Contest),
+    RoundContest: ("round_id", Round),
+    RoundContestResult: ("round_id", Round),
+}
+
+
+@event.listens_for(Session, "after_flush")
+def bump_sample_size_inputs_versions(session: Session, _flush_context):
+    """
+    Bumps the sample size inputs version for each election whose sample size
+    inputs were inserted, updated or deleted in this flush. This catches every
+    change made through the ORM. Code that changes these tables without the
+    ORM (e.g. bulk deletes) has to call bump_sample_size_inputs_version
+    itself, unless it also changes the election's jurisdictions or rounds.
+    """
+    changed = (
+        list(session.new)
+        + [instance for instance in session.dirty if session.is_modified(instance)]
+        + list(session.deleted)
+    )
+    parent_ids: Dict[Any, Set[str]] = defaultdict(set)
+    for instance in changed:
+        if type(instance) not in SAMPLE_SIZE_INPUT_MODELS:
+            continue
+        key, parent = SAMPLE_SIZE_INPUT_MODELS[type(instance)]
+        state = inspect(instance)
+        # Deleted rows can't be reloaded, so only use what we already have
+        if key in state.dict or state.deleted:
+            parent_id = state.dict.get(key)
+        else:
+            parent_id = getattr(instance, key)
+        if parent_id is not None:
+            parent_ids[parent].add(parent_id)
+
+    if not parent_ids:
+        return
+
+    election_ids = [
+        select([Election.id]).where(Election.id.in_(ids))
+        if parent is None
+        else select([parent.election_id]).where(parent.id.in_(ids))
+        for parent, ids in parent_ids.items()
+    ]
+    bump_sample_size_inputs_version(
+        session, union(*election_ids) if len(election_ids) > 1 else election_ids[0]
+    )
+
+
 def get_or_404(model: Type[Base], primary_key: str):
     instance = model.query.get(primary_key)
     if instance:
@@ -97,3 +97,7 @@ def sampler(
     output: Literal["id", "tuple", "ticket"] = ...,
     digits: int = ...,
 ) -> Union[Iterable[Id], Iterable[Tuple[str, str, int]], Iterable[Ticket]]: ...
+def sha256_hex(hash_input: Any) -> str: ...
+def trim(x: str, mantissa_display_length: int = ...) -> str: ...
+def next_ticket(ticket: Ticket[Id]) -> Ticket[Id]: ...
+def sha256_uniform(hash_input: Any) -> str: ...
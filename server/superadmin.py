@@ -1,4 +1,4 @@
-from flask import render_template, redirect, request, Blueprint
+from flask import render_template, redirect, request, jsonify, Blueprint
 from werkzeug.exceptions import Forbidden
 
 from .models import *  # pylint: disable=wildcard-import
@@ -9,6 +9,9 @@ from .auth import (
     set_loggedin_user,
 )
 from .config import FLASK_ENV
+from .util.process_file import processing_job_metrics
+from .api.sample_sizes import sample_size_cache
+from .api.rounds import cvr_cache
 
 superadmin = Blueprint("superadmin", __name__)
 
@@ -52,6 +55,24 @@ def superadmin_jurisdictionadmin_login():
     return redirect("/")
 
 
+@superadmin.route(
+    "/superadmin/processing-jobs", methods=["GET"],
+)
+@restrict_access_superadmin
+def superadmin_processing_jobs():
+    return jsonify(processing_job_metrics())
+
+
+@superadmin.route(
+    "/superadmin/caches", methods=["GET"],
+)
+@restrict_access_superadmin
+def superadmin_caches():
+    # These caches live in each server process, so these are the numbers for
+    # the process that handles this request.
+    return jsonify({"sampleSizes": sample_size_cache.info(), "cvrs": cvr_cache.info()})
+
+
 @superadmin.route("/superadmin/delete-election/<election_id>", methods=["POST"])
 @restrict_access_superadmin
 def superadmin_delete_election(election_id: str):
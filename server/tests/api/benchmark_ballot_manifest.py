@@ -0,0 +1,108 @@
+"""
+Benchmark of ballot_manifest.process_ballot_manifest_file, which loads the
+batches into the db with COPY, against the original version, which created a
+Batch object for each row of the manifest.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/api/benchmark_ballot_manifest.py
+"""
+import io
+import time
+import uuid
+from typing import List
+from flask.testing import FlaskClient
+from sqlalchemy.orm.session import Session
+
+from ...models import *  # pylint: disable=wildcard-import
+from ...database import db_session
+from ...api.ballot_manifest import (
+    process_ballot_manifest_file,
+    CONTAINER,
+    TABULATOR,
+    BATCH_NAME,
+    NUMBER_OF_BALLOTS,
+)
+from ...util.csv_parse import parse_csv, CSVColumnType, CSVValueType
+from ...util.process_file import process_file
+from ..helpers import *  # pylint: disable=wildcard-import
+
+NUM_BATCHES = [10_000, 100_000, 1_000_000]
+
+
+def original_process_ballot_manifest_file(
+    session: Session, jurisdiction: Jurisdiction, file: File
+):
+    def process():
+        columns = [
+            CSVColumnType(CONTAINER, CSVValueType.TEXT, required=False),
+            CSVColumnType(TABULATOR, CSVValueType.TEXT, required=False),
+            CSVColumnType(BATCH_NAME, CSVValueType.TEXT, unique=True),
+            CSVColumnType(NUMBER_OF_BALLOTS, CSVValueType.NUMBER),
+        ]
+
+        with jurisdiction.manifest_file.open() as manifest_file:
+            manifest_csv = parse_csv(manifest_file, columns)
+
+            num_batches = 0
+            num_ballots = 0
+            for row in manifest_csv:
+                batch = Batch(
+                    id=str(uuid.uuid4()),
+                    name=row[BATCH_NAME],
+                    jurisdiction_id=jurisdiction.id,
+                    num_ballots=row[NUMBER_OF_BALLOTS],
+                    container=row.get(CONTAINER, None),
+                    tabulator=row.get(TABULATOR, None),
+                )
+                session.add(batch)
+                num_batches += 1
+                num_ballots += batch.num_ballots
+
+        jurisdiction.manifest_num_ballots = num_ballots
+        jurisdiction.manifest_num_batches = num_batches
+        return num_batches
+
+    process_file(session, file, process)
+
+
+def test_benchmark_ballot_manifest(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    jurisdiction_id = jurisdiction_ids[0]
+    print()
+
+    for num_batches in NUM_BATCHES:
+        manifest = "Container,Batch Name,Number of Ballots\n" + "".join(
+            f"Container {i // 100},Batch {i},{i % 500 + 1}\n"
+            for i in range(num_batches)
+        )
+        rv = client.put(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/ballot-manifest",
+            data={"manifest": (io.BytesIO(manifest.encode()), "manifest.csv")},
+        )
+        assert_ok(rv)
+
+        for name, process_manifest in [
+            ("original", original_process_ballot_manifest_file),
+            ("copy", process_ballot_manifest_file),
+        ]:
+            Batch.query.filter_by(jurisdiction_id=jurisdiction_id).delete()
+            jurisdiction = Jurisdiction.query.get(jurisdiction_id)
+            jurisdiction.manifest_file.processing_started_at = None
+            jurisdiction.manifest_file.processing_completed_at = None
+            db_session.commit()
+
+            start = time.perf_counter()
+            process_manifest(db_session, jurisdiction, jurisdiction.manifest_file)
+            elapsed = time.perf_counter() - start
+
+            jurisdiction = Jurisdiction.query.get(jurisdiction_id)
+            assert jurisdiction.manifest_file.processing_error is None
+            assert jurisdiction.manifest_num_batches == num_batches
+            assert (
+                Batch.query.filter_by(jurisdiction_id=jurisdiction_id).count()
+                == num_batches
+            )
+            print(f"{num_batches:>9} batches, {name:>8}: {elapsed:7.2f}s")
@@ -0,0 +1,141 @@
+"""
+Benchmark of rounds.sample_ballots, which records the sampled ballots for a
+round in the db, against the original version, which looked up each sampled
+ballot with its own query and added the new rows through the ORM.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/api/benchmark_sample_ballots.py
+"""
+import io
+import time
+import uuid
+from typing import List
+from flask.testing import FlaskClient
+
+from ...models import *  # pylint: disable=wildcard-import
+from ...database import db_session
+from ...api import rounds
+from ...audit_math import sampler
+from ...util.group_by import group_by
+from ...bgcompute import bgcompute_update_ballot_manifest_file
+from ..helpers import *  # pylint: disable=wildcard-import
+
+NUM_BATCHES = 500
+BALLOTS_PER_BATCH = 200
+SAMPLE_SIZE = 50_000
+
+
+def original_sample_ballots(
+    election: Election,
+    round: Round,
+    contests: List[Contest],
+    sample_sizes,
+    _progress: rounds.DrawSampleProgress,
+):
+    # Draws the sample the same way as rounds.sample_ballots (starting from the
+    # first round), but records it one ballot at a time.
+    sample_draws = [
+        rounds.BallotDraw(
+            ballot_key=ballot_key, contest_id=contest.id, ticket_number=ticket_number,
+        )
+        for contest in contests
+        for (ticket_number, ballot_key, _) in sampler.draw_sample(
+            str(election.random_seed),
+            {
+                (jurisdiction.name, batch.tabulator, batch.name): batch.num_ballots
+                for jurisdiction in contest.jurisdictions
+                for batch in jurisdiction.batches
+            },
+            sample_sizes[contest.id],
+            0,
+        )
+    ]
+    sample_draws_by_ballot = group_by(
+        sample_draws, key=lambda sample_draw: sample_draw.ballot_key
+    )
+
+    batches = (
+        Batch.query.join(Jurisdiction)
+        .filter_by(election_id=election.id)
+        .with_entities(Jurisdiction.name, Batch)
+        .all()
+    )
+    batch_key_to_id = {
+        (jurisdiction_name, batch.tabulator, batch.name): batch.id
+        for (jurisdiction_name, batch) in batches
+    }
+
+    for ballot_key, sample_draws in sample_draws_by_ballot.items():
+        batch_key, ballot_position = ballot_key
+        batch_id = batch_key_to_id[batch_key]
+
+        sampled_ballot = SampledBallot.query.filter_by(
+            batch_id=batch_id, ballot_position=ballot_position
+        ).first()
+        if not sampled_ballot:
+            sampled_ballot = SampledBallot(
+                id=str(uuid.uuid4()),
+                batch_id=batch_id,
+                ballot_position=ballot_position,
+                status=BallotStatus.NOT_AUDITED,
+            )
+            db_session.add(sampled_ballot)
+
+        for sample_draw in sample_draws:
+            sampled_ballot_draw = SampledBallotDraw(
+                ballot_id=sampled_ballot.id,
+                round_id=round.id,
+                contest_id=sample_draw.contest_id,
+                ticket_number=sample_draw.ticket_number,
+            )
+            db_session.add(sampled_ballot_draw)
+
+
+def test_benchmark_sample_ballots(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    for jurisdiction_id in jurisdiction_ids[:2]:
+        manifest = "Batch Name,Number of Ballots\n" + "".join(
+            f"{i},{BALLOTS_PER_BATCH}\n" for i in range(NUM_BATCHES)
+        )
+        rv = client.put(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/ballot-manifest",
+            data={"manifest": (io.BytesIO(manifest.encode()), "manifest.csv")},
+        )
+        assert_ok(rv)
+    bgcompute_update_ballot_manifest_file()
+
+    election = Election.query.get(election_id)
+    contest = Contest.query.get(contest_ids[0])
+    print(
+        f"\nSampling {SAMPLE_SIZE} ballots from"
+        f" {2 * NUM_BATCHES * BALLOTS_PER_BATCH} ballots"
+    )
+
+    for name, sample_ballots in [
+        ("original", original_sample_ballots),
+        ("bulk insert", rounds.sample_ballots),
+    ]:
+        round = Round(id=str(uuid.uuid4()), election_id=election.id, round_num=1)
+        db_session.add(round)
+        start = time.perf_counter()
+        sample_ballots(
+            election,
+            round,
+            [contest],
+            {contest.id: SAMPLE_SIZE},
+            rounds.DrawSampleProgress(round.id),
+        )
+        db_session.flush()
+        elapsed = time.perf_counter() - start
+        assert (
+            SampledBallotDraw.query.filter_by(round_id=round.id).count() == SAMPLE_SIZE
+        )
+        print(f"{name:>12}: {elapsed:7.2f}s")
+        db_session.rollback()
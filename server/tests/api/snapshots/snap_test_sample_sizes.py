@@ -16,6 +16,14 @@ snapshots["test_sample_sizes_round_1 1"] = {
     ]
 }
 
+snapshots["test_sample_sizes_round_1_minerva 1"] = {
+    "Contest 1": [
+        {"key": "0.7", "prob": 0.7, "size": 102},
+        {"key": "0.8", "prob": 0.8, "size": 133},
+        {"key": "0.9", "prob": 0.9, "size": 179},
+    ]
+}
+
 snapshots["test_sample_sizes_round_2 1"] = {
     "Contest 1": [
         {"key": "asn", "prob": 0.52, "size": 119},
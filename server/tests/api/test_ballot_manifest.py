@@ -318,3 +318,6 @@ def test_ballot_manifest_upload_duplicate_batch_name(
             },
         },
     )
+
+    # The batches loaded before the error are rolled back
+    assert Batch.query.filter_by(jurisdiction_id=jurisdiction_ids[0]).count() == 0
@@ -6,6 +6,7 @@ from flask.testing import FlaskClient
 from ..helpers import *  # pylint: disable=wildcard-import
 from ...database import db_session
 from ...models import *  # pylint: disable=wildcard-import
+from ...bgcompute import bgcompute_draw_sample
 from ...api.contests import JSONDict
 from ...auth import UserType
 
@@ -164,6 +165,7 @@ def test_contests_round_status(
         {"roundNum": 1, "sampleSizes": {contests[0]["id"]: sample_size},},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/contest")
     contests = json.loads(rv.data)["contests"]
@@ -2,12 +2,13 @@ import json, io
 from datetime import datetime
 from typing import List
 from flask.testing import FlaskClient
+from sqlalchemy import event
 
 from ..helpers import *  # pylint: disable=wildcard-import
 from ...auth import UserType
-from ...database import db_session
+from ...database import db_session, engine
 from ...models import *  # pylint: disable=wildcard-import
-from ...bgcompute import bgcompute_update_ballot_manifest_file
+from ...bgcompute import bgcompute_update_ballot_manifest_file, bgcompute_draw_sample
 
 AB1_SAMPLES = 23  # Arbitrary num of ballots to assign to audit board 1
 
@@ -130,6 +131,32 @@ def test_jurisdictions_list_with_manifest(
     assert rv.data == manifest
 
 
+def test_jurisdictions_list_queries(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    statements = []
+
+    def record_statement(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        rv = client.get(f"/api/election/{election_id}/jurisdiction")
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    assert rv.status_code == 200
+    assert len(json.loads(rv.data)["jurisdictions"]) == 3
+
+    # The manifest files for all the jurisdictions are loaded with one query,
+    # and file contents are never loaded.
+    assert len([s for s in statements if "FROM file" in s]) == 1
+    assert not any("file.contents" in s for s in statements)
+
+
 def test_download_ballot_manifest_not_found(client, election_id, jurisdiction_ids):
     rv = client.get(
         f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/ballot-manifest/csv"
@@ -321,6 +348,7 @@ def test_jurisdictions_round_status_offline(
         },
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     round_id = json.loads(rv.data)["rounds"][0]["id"]
@@ -80,7 +80,7 @@ def test_metadata(client, election_id):
     assert_ok(rv)
 
     election = Election.query.filter_by(id=election_id).one()
-    assert election.jurisdictions_file.contents == (
+    assert election.jurisdictions_file.open().read() == (
         "Jurisdiction,Admin Email\n" "J1,ja@example.com"
     )
     assert election.jurisdictions_file.name == "jurisdictions.csv"
@@ -117,7 +117,7 @@ def test_metadata(client, election_id):
     assert (
         rv.headers["Content-Disposition"] == 'attachment; filename="jurisdictions.csv"'
     )
-    assert rv.data.decode("utf-8") == election.jurisdictions_file.contents
+    assert rv.data.decode("utf-8") == election.jurisdictions_file.open().read()
 
 
 def test_replace_jurisdictions_file(client, election_id):
@@ -1,9 +1,12 @@
 from typing import List
-import json
+import io, json
+from unittest.mock import patch
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
+from ...bgcompute import bgcompute_draw_sample
 from ...auth import UserType
+from ...api import rounds
 from ..helpers import *  # pylint: disable=wildcard-import
 
 
@@ -40,6 +43,7 @@ def test_rounds_create_one(
         {"roundNum": 1, "sampleSizes": {contest_ids[0]: sample_size},},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     expected_rounds = {
         "rounds": [
@@ -49,6 +53,7 @@ def test_rounds_create_one(
                 "startedAt": assert_is_date,
                 "endedAt": None,
                 "isAuditComplete": None,
+                "drawSampleTask": assert_sample_drawn,
             }
         ]
     }
@@ -95,6 +100,7 @@ def test_rounds_create_two(
 
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2},)
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     expected_rounds = {
         "rounds": [
@@ -104,6 +110,7 @@ def test_rounds_create_two(
                 "startedAt": assert_is_date,
                 "endedAt": assert_is_date,
                 "isAuditComplete": False,
+                "drawSampleTask": assert_sample_drawn,
             },
             {
                 "id": assert_is_id,
@@ -111,6 +118,7 @@ def test_rounds_create_two(
                 "startedAt": assert_is_date,
                 "endedAt": None,
                 "isAuditComplete": None,
+                "drawSampleTask": assert_sample_drawn,
             },
         ]
     }
@@ -136,6 +144,13 @@ def test_rounds_create_two(
     }
     assert sorted(sampled_jurisdictions) == sorted(jurisdiction_ids[:2])
 
+    # Check that we saved the sampler state so the next round can pick up
+    # where this one left off
+    sampler_state = ContestSamplerState.query.get(contest_ids[0])
+    assert sampler_state.state["num_drawn"] == (
+        SampledBallotDraw.query.filter_by(contest_id=contest_ids[0]).count()
+    )
+
 
 def test_rounds_complete_audit(
     client: FlaskClient, election_id: str, contest_ids: List[str], round_1_id: str,
@@ -150,6 +165,7 @@ def test_rounds_complete_audit(
                 "startedAt": assert_is_date,
                 "endedAt": assert_is_date,
                 "isAuditComplete": True,
+                "drawSampleTask": assert_sample_drawn,
             }
         ]
     }
@@ -171,6 +187,7 @@ def test_rounds_create_before_previous_round_complete(
         {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2},)
     assert rv.status_code == 409
@@ -203,11 +220,13 @@ def test_rounds_wrong_number_too_small(
         {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
+    # (Sending the same request again would be treated as a retry)
     rv = post_json(
         client,
         f"/api/election/{election_id}/round",
-        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 20}},
     )
     assert rv.status_code == 400
     assert json.loads(rv.data) == {
@@ -252,6 +271,29 @@ def test_rounds_missing_round_num(
     }
 
 
+def test_rounds_not_an_object(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+
+    # Once there's a round, the request is compared to it to check for
+    # retries, which should only happen for valid requests
+    for bad_round in [[], "round", None, 2]:
+        rv = post_json(client, f"/api/election/{election_id}/round", bad_round)
+        assert rv.status_code == 400, bad_round
+        assert json.loads(rv.data)["errors"][0]["errorType"] == "Bad Request"
+
+
 def test_rounds_bad_sample_sizes(
     client: FlaskClient, election_id: str, contest_ids: List[str]
 ):
@@ -275,3 +317,224 @@ def test_rounds_bad_sample_sizes(
                 }
             ]
         }
+
+
+def test_rounds_draw_sample_in_background(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+
+    # The sample isn't drawn until the background worker runs
+    rv = client.get(f"/api/election/{election_id}/round")
+    rounds = json.loads(rv.data)["rounds"]
+    round_id = rounds[0]["id"]
+    assert rounds[0]["drawSampleTask"] == {
+        "status": ProcessingStatus.READY_TO_PROCESS,
+        "startedAt": None,
+        "completedAt": None,
+        "error": None,
+        "progress": None,
+    }
+    rv = client.get(f"/api/election/{election_id}/round/{round_id}/draw-sample")
+    assert json.loads(rv.data) == rounds[0]["drawSampleTask"]
+    assert SampledBallotDraw.query.filter_by(round_id=round_id).count() == 0
+
+    # Until then, jurisdictions don't see the round
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/round"
+    )
+    assert json.loads(rv.data) == {"rounds": []}
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+
+    # If the client retries the request, we shouldn't create another round
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+    assert Round.query.filter_by(election_id=election_id).count() == 1
+
+    bgcompute_draw_sample()
+
+    rv = client.get(f"/api/election/{election_id}/round/{round_id}/draw-sample")
+    compare_json(
+        json.loads(rv.data),
+        {
+            "status": ProcessingStatus.PROCESSED,
+            "startedAt": assert_is_date,
+            "completedAt": assert_is_date,
+            "error": None,
+            "progress": {
+                "contestsDrawn": 1,
+                "totalContests": 1,
+                "rowsWritten": (
+                    SampledBallot.query.join(Batch)
+                    .join(Jurisdiction)
+                    .filter_by(election_id=election_id)
+                    .count()
+                    + 10
+                ),
+            },
+        },
+    )
+    assert SampledBallotDraw.query.filter_by(round_id=round_id).count() == 10
+
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/round"
+    )
+    assert [round["id"] for round in json.loads(rv.data)["rounds"]] == [round_id]
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+
+    # A retry that comes in after the sample is drawn is still a retry
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+    assert Round.query.filter_by(election_id=election_id).count() == 1
+
+
+def test_rounds_draw_sample_error(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+
+    with patch.object(
+        rounds, "sample_ballots", side_effect=Exception("something went wrong")
+    ):
+        bgcompute_draw_sample()
+
+    rv = client.get(f"/api/election/{election_id}/round")
+    round_id = json.loads(rv.data)["rounds"][0]["id"]
+    rv = client.get(f"/api/election/{election_id}/round/{round_id}/draw-sample")
+    compare_json(
+        json.loads(rv.data),
+        {
+            "status": ProcessingStatus.ERRORED,
+            "startedAt": assert_is_date,
+            "completedAt": assert_is_date,
+            "error": "something went wrong",
+            "progress": None,
+        },
+    )
+    # Nothing from the failed attempt should have been saved
+    assert RoundContest.query.filter_by(round_id=round_id).count() == 0
+
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/round"
+    )
+    assert json.loads(rv.data) == {"rounds": []}
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+
+    # The audit admin can try again, which replaces the failed round
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+    bgcompute_draw_sample()
+
+    rv = client.get(f"/api/election/{election_id}/round")
+    json_rounds = json.loads(rv.data)["rounds"]
+    assert len(json_rounds) == 1
+    assert json_rounds[0]["id"] != round_id
+    assert_sample_drawn(json_rounds[0]["drawSampleTask"])
+    assert (
+        SampledBallotDraw.query.filter_by(round_id=json_rounds[0]["id"]).count() == 10
+    )
+
+
+def test_rounds_edit_setup_after_draw_sample_error(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_ids[0]: 10}},
+    )
+    assert_ok(rv)
+
+    # While the sample is being drawn, the audit has started
+    rv = put_json(client, f"/api/election/{election_id}/settings", {"riskLimit": 5},)
+    assert rv.status_code == 409
+
+    with patch.object(
+        rounds, "sample_ballots", side_effect=Exception("something went wrong")
+    ):
+        bgcompute_draw_sample()
+
+    # Once the draw fails, the audit admin can fix the setup and launch the
+    # audit again
+    rv = client.get(f"/api/election/{election_id}/settings")
+    settings = json.loads(rv.data)
+    rv = put_json(
+        client, f"/api/election/{election_id}/settings", {**settings, "riskLimit": 5},
+    )
+    assert_ok(rv)
+
+    rv = client.get(f"/api/election/{election_id}/contest")
+    contests = json.loads(rv.data)["contests"]
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/contest",
+        [
+            {
+                key: value
+                for key, value in contest.items()
+                if key not in ["currentRoundStatus", "isComplete"]
+            }
+            for contest in contests
+        ],
+    )
+    assert_ok(rv)
+
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/file",
+        data={
+            "jurisdictions": (
+                io.BytesIO(
+                    (
+                        "Jurisdiction,Admin Email\n"
+                        f"J1,{DEFAULT_JA_EMAIL}\n"
+                        f"J2,{DEFAULT_JA_EMAIL}\n"
+                        "J3,j3@example.com\n"
+                    ).encode()
+                ),
+                "jurisdictions.csv",
+            )
+        },
+    )
+    assert_ok(rv)
@@ -3,6 +3,10 @@ from typing import List
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
+from ...database import db_session
+from ...api.sample_sizes import sample_size_cache, sample_size_inputs_version
+from ...api.rounds import end_round
+from ..helpers import audit_ballot
 
 
 def test_sample_sizes_without_contests(client: FlaskClient, election_id: str):
@@ -63,3 +67,117 @@ def test_sample_sizes_round_2(
     snapshot.assert_match(
         {contest_id_to_name[id]: sizes for id, sizes in sample_sizes.items()}
     )
+
+
+def test_sample_sizes_round_1_minerva(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],  # pylint: disable=unused-argument
+    election_settings,  # pylint: disable=unused-argument
+    snapshot,
+):
+    election = Election.query.get(election_id)
+    election.audit_math_type = AuditMathType.MINERVA
+    db_session.commit()
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    sample_sizes = json.loads(rv.data)["sampleSizes"]
+    contest_id_to_name = dict(Contest.query.values(Contest.id, Contest.name))
+    snapshot.assert_match(
+        {contest_id_to_name[id]: sizes for id, sizes in sample_sizes.items()}
+    )
+
+
+def test_sample_sizes_cache(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],  # pylint: disable=unused-argument
+    election_settings,  # pylint: disable=unused-argument
+):
+    sample_size_cache.clear()
+    num_targeted_contests = Contest.query.filter_by(
+        election_id=election_id, is_targeted=True
+    ).count()
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    sample_sizes = json.loads(rv.data)["sampleSizes"]
+    assert sample_size_cache.info() == {
+        "hits": 0,
+        "misses": num_targeted_contests,
+        "size": num_targeted_contests,
+    }
+
+    # Asking again should reuse the cached sample sizes
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    assert json.loads(rv.data)["sampleSizes"] == sample_sizes
+    assert sample_size_cache.hits == num_targeted_contests
+    assert sample_size_cache.misses == num_targeted_contests
+
+    # Changing the audit settings should recompute the sample sizes
+    election = Election.query.get(election_id)
+    election.risk_limit = 20
+    db_session.commit()
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    new_sample_sizes = json.loads(rv.data)["sampleSizes"]
+    assert new_sample_sizes != sample_sizes
+    assert sample_size_cache.hits == num_targeted_contests
+    assert sample_size_cache.misses == 2 * num_targeted_contests
+
+    # As should changing the contests
+    contest = Contest.query.filter_by(election_id=election_id, is_targeted=True).first()
+    contest.votes_allowed = 2
+    db_session.commit()
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    assert sample_size_cache.misses == 3 * num_targeted_contests
+
+    # As should changing the contest choices, which only refer to the election
+    # through their contest
+    choice = ContestChoice.query.filter_by(contest_id=contest.id).first()
+    choice.num_votes += 1
+    db_session.commit()
+
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    assert sample_size_cache.misses == 4 * num_targeted_contests
+
+
+def test_sample_sizes_cache_data_entry(
+    election_id: str, contest_ids: List[str], round_1_id: str,
+):
+    election = Election.query.get(election_id)
+    version = sample_size_inputs_version(election)
+
+    # Auditing ballots doesn't touch the election row, since the results don't
+    # change the sample sizes until the round ends
+    ballot_draws = SampledBallotDraw.query.filter_by(round_id=round_1_id).all()
+    contest = Contest.query.get(contest_ids[0])
+    for ballot_draw in ballot_draws[:5]:
+        audit_ballot(
+            ballot_draw.sampled_ballot,
+            contest.id,
+            Interpretation.VOTE,
+            [contest.choices[0]],
+        )
+        db_session.commit()
+    assert sample_size_inputs_version(election) == version
+
+    # Ending the round does
+    round = Round.query.get(round_1_id)
+    end_round(election, round)
+    db_session.commit()
+    assert sample_size_inputs_version(election) > version
+
+
+def test_sample_size_cache_returns_copies():
+    sample_size_cache.clear()
+    options = {"supersimple": {"key": "supersimple", "size": 10, "prob": None}}
+
+    sample_size_cache.get_or_compute(("e", "c", 1), 0, lambda: options)
+    options["supersimple"]["size"] = 20
+    cached = sample_size_cache.get_or_compute(("e", "c", 1), 0, lambda: None)
+    assert cached["supersimple"]["size"] == 10
+
+    cached["supersimple"]["size"] = 30
+    cached = sample_size_cache.get_or_compute(("e", "c", 1), 0, lambda: None)
+    assert cached["supersimple"]["size"] == 10
@@ -1,5 +1,6 @@
 from urllib.parse import urlparse
-import json, pytest
+import io, json, pytest
+from typing import List
 from flask.testing import FlaskClient
 
 from ...auth import UserType
@@ -104,3 +105,59 @@ def test_superadmin_delete_election(
     #     SampledBallotDraw,
     # ]:
     #     assert model.query.count() == 0
+
+
+def test_superadmin_processing_jobs(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    assert_superadmin_access(client, "/superadmin/processing-jobs")
+    rv = client.get("/superadmin/processing-jobs")
+    metrics = json.loads(rv.data)
+
+    assert set(metrics.keys()) == {file_type.value for file_type in FileType}
+    for file_type_metrics in metrics.values():
+        assert set(file_type_metrics.keys()) == {
+            "QUEUED",
+            "RUNNING",
+            "SUCCEEDED",
+            "FAILED",
+            "p50ProcessingSeconds",
+            "p95ProcessingSeconds",
+        }
+
+    # The jurisdiction_ids fixture processed a jurisdictions file
+    jurisdictions_metrics = metrics[FileType.JURISDICTIONS]
+    assert jurisdictions_metrics["SUCCEEDED"] >= 1
+    assert (
+        0
+        <= jurisdictions_metrics["p50ProcessingSeconds"]
+        <= jurisdictions_metrics["p95ProcessingSeconds"]
+    )
+
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/ballot-manifest",
+        data={
+            "manifest": (
+                io.BytesIO(b"Batch Name,Number of Ballots\n" b"1,23\n" b"2,101"),
+                "manifest.csv",
+            )
+        },
+    )
+    assert_ok(rv)
+
+    set_superadmin(client)
+    rv = client.get("/superadmin/processing-jobs")
+    new_metrics = json.loads(rv.data)
+    assert (
+        new_metrics[FileType.BALLOT_MANIFEST]["QUEUED"]
+        == metrics[FileType.BALLOT_MANIFEST]["QUEUED"] + 1
+    )
+
+
+def test_superadmin_caches(client: FlaskClient):
+    assert_superadmin_access(client, "/superadmin/caches")
+    rv = client.get("/superadmin/caches")
+    caches = json.loads(rv.data)
+    assert set(caches["sampleSizes"].keys()) == {"hits", "misses", "size"}
+    assert set(caches["cvrs"].keys()) == {"hits", "updates", "misses", "size"}
@@ -0,0 +1,132 @@
+"""
+Benchmark of bravo.bravo_sample_sizes against the original version, which
+searched for the sample size by checking one size at a time, for margins from
+0.1% to 50%.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/audit_math/benchmark_bravo_sample_sizes.py
+"""
+import math
+import time
+from decimal import Decimal
+from unittest.mock import patch
+from scipy import stats
+
+from ...audit_math import bravo
+
+ALPHA = Decimal(0.1)
+MARGINS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5]
+QUANTS = [0.7, 0.8, 0.9]
+# Previously sampled (winner, runner-up) votes
+PRIOR_SAMPLES = [(0, 0), (55, 45), (480, 520), (2923, 2735), (45000, 55000)]
+
+
+def original_bravo_sample_sizes(alpha, p_w, p_r, sample_w, sample_r, p_completion):
+    p_wr = p_w + p_r
+    p_w2 = p_w / p_wr
+    p_r2 = 1 - p_w2
+
+    plus = (p_w2 / Decimal(0.5)).ln()
+    minus = (p_r2 / Decimal(0.5)).ln()
+    threshold = (1 / alpha).ln() - (sample_w * plus + sample_r * minus)
+
+    if threshold <= 0:
+        return 0
+
+    z = -stats.norm.ppf(p_completion)
+
+    d = p_w2 * p_r2
+    f = threshold / (plus - minus)
+    g = minus / (plus - minus) + p_w2
+
+    q_a = g ** 2
+    q_b = -(Decimal(z) ** 2 * d + 2 * f * g)
+    q_c = f ** 2
+
+    radical = (Decimal(0).max(q_b ** 2 - 4 * q_a * q_c)).sqrt()
+
+    if p_completion > 0.5:
+        size = math.floor((-q_b + radical) / (2 * q_a))
+    else:
+        size = math.floor((-q_b - radical) / (2 * q_a))
+
+    searching = True
+    while searching:
+        x_c = Decimal(stats.binom.ppf(1.0 - p_completion, size, float(p_w2)))
+        test_stat = x_c * plus + (size - x_c) * minus
+        if test_stat > threshold:
+            searching = False
+        else:
+            size += 1
+
+    return math.ceil(size / p_wr)
+
+
+def run(bravo_sample_sizes):
+    # Returns the sample sizes, the time taken and the number of calls to
+    # binom.ppf
+    binom_ppf = stats.binom.ppf
+    with patch.object(stats.binom, "ppf", wraps=binom_ppf) as ppf:
+        sizes = []
+        start = time.perf_counter()
+        for margin in MARGINS:
+            p_w = Decimal((1 + margin) / 2)
+            p_r = Decimal((1 - margin) / 2)
+            for sample_w, sample_r in PRIOR_SAMPLES:
+                for quant in QUANTS:
+                    sizes.append(
+                        bravo_sample_sizes(ALPHA, p_w, p_r, sample_w, sample_r, quant)
+                    )
+        elapsed = time.perf_counter() - start
+        return sizes, elapsed, ppf.call_count
+
+
+def test_benchmark_bravo_sample_sizes():
+    original_sizes, original_elapsed, original_calls = run(original_bravo_sample_sizes)
+    sizes, elapsed, calls = run(bravo.bravo_sample_sizes)
+    assert sizes == original_sizes
+
+    print(
+        f"\n{len(sizes)} sample sizes for margins from {MARGINS[0]:.1%} to {MARGINS[-1]:.0%}"
+    )
+    print(f"{'original':>10}: {original_elapsed:.3f}s, {original_calls} calls to ppf")
+    print(f"{'blocks':>10}: {elapsed:.3f}s, {calls} calls to ppf")
+
+
+def linear_passing_size(size, p_completion, p_w2, plus, minus, threshold):
+    # The original search, checking one size at a time
+    while True:
+        x_c = Decimal(stats.binom.ppf(1.0 - p_completion, size, float(p_w2)))
+        if x_c * plus + (size - x_c) * minus > threshold:
+            return size
+        size += 1
+
+
+def test_benchmark_bad_estimate():
+    # The quadratic estimate is usually within a few sizes of the answer, so
+    # the search above only runs a couple of times. Here we start the search
+    # from half the estimate to see how each search copes when it's far off.
+    print()
+    for margin in [0.01, 0.05, 0.2, 0.5]:
+        p_w2 = Decimal((1 + margin) / 2)
+        plus = (p_w2 / Decimal(0.5)).ln()
+        minus = ((1 - p_w2) / Decimal(0.5)).ln()
+        threshold = (1 / ALPHA).ln()
+        size = bravo.bravo_sample_sizes(ALPHA, p_w2, 1 - p_w2, 0, 0, 0.9)
+        args = (size // 2, 0.9, p_w2, plus, minus, threshold)
+
+        results = []
+        for name, search in [
+            ("linear", linear_passing_size),
+            ("blocks", bravo.smallest_passing_size),
+        ]:
+            with patch.object(stats.binom, "ppf", wraps=stats.binom.ppf) as ppf:
+                start = time.perf_counter()
+                results.append(search(*args))
+                elapsed = time.perf_counter() - start
+                print(
+                    f"margin {margin:5.0%}, start {size // 2:6}: {name:>6}"
+                    f" {elapsed:7.3f}s, {ppf.call_count:5} calls to ppf"
+                )
+        assert results[0] == results[1]
@@ -0,0 +1,141 @@
+"""
+Benchmark of sampler.draw_ppeb_sample against the original PPEB sampler, which
+duplicated each batch in proportion to its error bound and handed the
+duplicates to consistent_sampler.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/audit_math/benchmark_ppeb_sampler.py
+"""
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+import consistent_sampler
+
+from ...audit_math import macro, sampler
+from ...audit_math.sampler_contest import Contest
+
+SEED = "12345678901234567890abcdefghijklmnopqrstuvwxyz😊"
+NUM_BATCHES = 100_000
+SAMPLE_SIZE = 200
+
+
+def original_draw_ppeb_sample(seed, contest, sample_size, num_sampled, batch_results):
+    U = macro.compute_U(batch_results, {}, contest)
+    if U == 0:
+        return []
+
+    batch_to_prob = {}
+    min_prob = Decimal(1.0)
+    for batch in batch_results:
+        error = macro.compute_max_error(batch_results[batch], contest)
+        if error == 0:
+            error = Decimal(1) / Decimal(contest.ballots)
+        batch_to_prob[batch] = error / U
+        if error / U < min_prob:
+            min_prob = error / U
+
+    sample_from = []
+    for batch in batch_to_prob:
+        for i in range(int(batch_to_prob[batch] / min_prob)):
+            sample_from.append((batch, i))
+
+    faux_sample = list(
+        consistent_sampler.sampler(
+            sample_from,
+            seed=seed,
+            take=sample_size + num_sampled,
+            with_replacement=True,
+            output="tuple",
+        )
+    )[num_sampled:]
+    return [(item[0], item[1][0], item[2]) for item in faux_sample]
+
+
+def random_election(num_batches, num_tiny_batches=0):
+    # Batches of 50-500 ballots with a random split between two candidates,
+    # plus some single-ballot batches. The smallest error bound determines how
+    # many duplicates the original sampler makes of every other batch.
+    rand = random.Random(12345)
+    batch_results = {}
+    for i in range(num_batches):
+        ballots = rand.randint(50, 500)
+        loser_votes = rand.randint(0, ballots // 2)
+        batch_results[("J{}".format(i % 100), "Batch {}".format(i))] = {
+            "contest": {
+                "winner": ballots - loser_votes,
+                "loser": loser_votes,
+                "ballots": ballots,
+            }
+        }
+    for i in range(num_tiny_batches):
+        batch_results[("J0", "Tiny batch {}".format(i))] = {
+            "contest": {"winner": 1, "loser": 0, "ballots": 1}
+        }
+
+    total_ballots = sum(r["contest"]["ballots"] for r in batch_results.values())
+    contest = Contest(
+        "contest",
+        {
+            "winner": sum(r["contest"]["winner"] for r in batch_results.values()),
+            "loser": sum(r["contest"]["loser"] for r in batch_results.values()),
+            "ballots": total_ballots,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+    return contest, batch_results
+
+
+def measure(draw, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    sample = draw(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sample, elapsed, peak
+
+
+def num_duplicates(contest, batch_results):
+    # The number of (batch, i) records the original sampler would create
+    errors = [
+        macro.compute_max_error(results, contest) for results in batch_results.values()
+    ]
+    min_error = min(errors)
+    return sum(int(error / min_error) for error in errors)
+
+
+def test_benchmark_ppeb_sampler():
+    contest, batch_results = random_election(NUM_BATCHES)
+    print(
+        f"\n{NUM_BATCHES} batches ({num_duplicates(contest, batch_results)}"
+        f" duplicates), drawing {SAMPLE_SIZE} tickets"
+    )
+
+    for name, draw in [
+        ("original", original_draw_ppeb_sample),
+        ("cumulative weights", sampler.draw_ppeb_sample),
+    ]:
+        sample, elapsed, peak = measure(
+            draw, SEED, contest, SAMPLE_SIZE, 0, batch_results
+        )
+        assert len(sample) == SAMPLE_SIZE
+        print(f"{name:>20}: {elapsed:7.2f}s, peak memory {peak / 2**20:8.1f}MB")
+
+    # With a single one-ballot batch, the original sampler would have to
+    # duplicate every other batch hundreds of times, which takes too long to
+    # run here, so we only measure the new sampler.
+    contest, batch_results = random_election(NUM_BATCHES, num_tiny_batches=1)
+    print(
+        f"{NUM_BATCHES + 1} batches ({num_duplicates(contest, batch_results)}"
+        f" duplicates), drawing {SAMPLE_SIZE} tickets"
+    )
+    sample, elapsed, peak = measure(
+        sampler.draw_ppeb_sample, SEED, contest, SAMPLE_SIZE, 0, batch_results
+    )
+    assert len(sample) == SAMPLE_SIZE
+    print(
+        f"{'cumulative weights':>20}: {elapsed:7.2f}s, peak memory {peak / 2**20:8.1f}MB"
+    )
@@ -0,0 +1,202 @@
+"""
+Benchmark of supersimple.compute_risk, which computes the discrepancies and
+p-value for all the sampled ballots with array operations, against the
+original version, which went ballot by ballot (and winner-loser pair by pair)
+with Decimals.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/audit_math/benchmark_supersimple.py
+"""
+# pylint: disable=invalid-name
+import time
+import random
+from decimal import Decimal
+from typing import Dict, Tuple
+import pytest
+
+from ...audit_math.sampler_contest import Contest
+from ...audit_math.supersimple import (
+    CVRS,
+    SAMPLE_CVRS,
+    Discrepancy,
+    gamma,
+    compute_risk,
+)
+
+RISK_LIMIT = 10
+NUM_CHOICES = 12
+NUM_BALLOTS = 1_000_000
+
+
+def original_compute_discrepancies(
+    contest: Contest, cvrs: CVRS, sample_cvr: SAMPLE_CVRS
+) -> Dict[str, Discrepancy]:
+
+    discrepancies: Dict[str, Discrepancy] = {}
+    for ballot in sample_cvr:
+        # Typechecker needs us to pull these out into variables
+        ballot_sample_cvr = sample_cvr[ballot]["cvr"]
+        ballot_cvr = cvrs[ballot]
+        assert ballot_cvr is not None
+
+        # We want to be conservative, so we will ignore the case where there are
+        # negative errors (i.e. errors that favor the winner. We can do that
+        # by setting these to zero and evaluating whether an error is greater
+        # than zero (i.e. positive).
+        e_r = Decimal(0.0)
+        e_int = 0
+
+        found = False
+
+        # Special case: if ballot can't be found by audit board, count it as a
+        # two-vote overstatement
+        if ballot_sample_cvr is None:
+            e_int = 2
+            e_weighted = Decimal(e_int) / Decimal(
+                contest.diluted_margin * contest.ballots
+            )
+            found = True
+
+        else:
+            for winner in contest.winners:
+                for loser in contest.losers:
+
+                    if contest.name in ballot_cvr:
+                        v_w = ballot_cvr[contest.name][winner]
+                        v_l = ballot_cvr[contest.name][loser]
+                    else:
+                        v_w = 0
+                        v_l = 0
+
+                    if contest.name in ballot_sample_cvr:
+                        a_w = ballot_sample_cvr[contest.name][winner]
+                        a_l = ballot_sample_cvr[contest.name][loser]
+                    else:
+                        a_w = 0
+                        a_l = 0
+
+                    V_wl = contest.candidates[winner] - contest.candidates[loser]
+
+                    e = (v_w - a_w) - (v_l - a_l)
+
+                    if e:
+                        # we found a discrepancy!
+                        found = True
+
+                    if V_wl == 0:
+                        # In this case the error is undefined
+                        e_weighted = Decimal("inf")
+                    else:
+                        e_weighted = Decimal(e) / Decimal(V_wl)
+
+                    if e_weighted > e_r:
+                        e_r = e_weighted
+                        e_int = e
+
+        if found:
+            discrepancies[ballot] = Discrepancy(
+                counted_as=e_int,
+                weighted_error=e_weighted,
+                discrepancy_cvr={
+                    "reported_as": ballot_cvr,
+                    "audited_as": ballot_sample_cvr,
+                },
+            )
+
+    return discrepancies
+
+
+def original_compute_risk(
+    risk_limit: int, contest: Contest, cvrs: CVRS, sample_cvr: SAMPLE_CVRS,
+) -> Tuple[float, bool]:
+    alpha = Decimal(risk_limit) / 100
+    assert alpha < 1
+
+    p = Decimal(1.0)
+
+    N = contest.ballots
+    V = Decimal(contest.diluted_margin * N)
+
+    if contest.diluted_margin == 0:
+        U = Decimal("inf")
+    else:
+        U = 2 * gamma / Decimal(contest.diluted_margin)
+
+    result = False
+
+    discrepancies = original_compute_discrepancies(contest, cvrs, sample_cvr)
+
+    for ballot in sample_cvr:
+        if ballot in discrepancies:
+            e_r = discrepancies[ballot]["weighted_error"]
+        else:
+            e_r = Decimal(0)
+
+        if contest.diluted_margin:
+            U = 2 * gamma / Decimal(contest.diluted_margin)
+            denom = (2 * gamma) / V
+            p_b = (1 - 1 / U) / (1 - (e_r / denom))
+        else:
+            # If the contest is a tie, this step results in 1 - 1/(infinity)
+            # divided by 1 - e_r/infinity, i.e. 1
+            p_b = Decimal(1.0)
+
+        multiplicity = sample_cvr[ballot]["times_sampled"]
+        p *= p_b ** multiplicity
+
+    if 0 < p < alpha:
+        result = True
+
+    if len(sample_cvr) >= N:
+        # We've done a full hand recount
+        return 0, True
+
+    return float(p), result
+
+
+@pytest.mark.parametrize("sample_size", [1000, 10_000, 50_000])
+def test_benchmark_supersimple(sample_size: int):
+    rand = random.Random(12345)
+    choices = [f"choice{i}" for i in range(NUM_CHOICES)]
+    contest = Contest(
+        "Contest",
+        {
+            **{
+                choice: NUM_BALLOTS // (2 + i) // NUM_CHOICES * 2
+                for i, choice in enumerate(choices)
+            },
+            "ballots": NUM_BALLOTS,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+
+    cvrs: CVRS = {}
+    sample_cvr: SAMPLE_CVRS = {}
+    for ballot in range(sample_size):
+        vote = rand.choice(choices)
+        cvrs[ballot] = {"Contest": {choice: int(choice == vote) for choice in choices}}
+        audited = dict(cvrs[ballot]["Contest"])
+        if rand.random() < 0.01:
+            audited[rand.choice(choices)] ^= 1
+        sample_cvr[ballot] = {
+            "times_sampled": rand.choice([1, 1, 1, 2]),
+            "cvr": {"Contest": audited},
+        }
+
+    print(
+        f"\nComputing risk for {sample_size} sampled ballots," f" {NUM_CHOICES} choices"
+    )
+    results = []
+    for name, compute in [
+        ("original", original_compute_risk),
+        ("numpy", compute_risk),
+    ]:
+        start = time.perf_counter()
+        results.append(compute(RISK_LIMIT, contest, cvrs, sample_cvr))
+        print(f"{name:>12}: {time.perf_counter() - start:7.3f}s")
+
+    (original_p, original_result), (p, result) = results
+    assert p == pytest.approx(original_p, rel=1e-9, abs=0)
+    assert result == original_result
@@ -8,6 +8,19 @@ from snapshottest import Snapshot
 snapshots = Snapshot()
 
 snapshots["test_draw_macro_sample 1"] = [
+    ("0.249360240", "pct 14", 1),
+    ("0.734689843", "pct 6", 1),
+    ("0.354912716", "pct 17", 1),
+    ("0.778978450", "pct 6", 2),
+    ("0.708868068", "pct 5", 1),
+    ("0.9471725204", "pct 9", 1),
+    ("0.622425075", "pct 4", 1),
+    ("0.9654505064", "pct 9", 2),
+    ("0.471406691", "pct 2", 1),
+    ("0.9049141593", "pct 8", 1),
+]
+
+snapshots["test_draw_macro_sample_duplicated_batches 1"] = [
     ("0.092252362", "pct 7", 1),
     ("0.097291018", "pct 5", 1),
     ("0.099439125", "pct 19", 1),
@@ -20,15 +33,7 @@ snapshots["test_draw_macro_sample 1"] = [
     ("0.230651143", "pct 7", 2),
 ]
 
-snapshots["test_draw_more_macro_sample 1"] = [
-    ("0.092252362", "pct 7", 1),
-    ("0.097291018", "pct 5", 1),
-    ("0.099439125", "pct 19", 1),
-    ("0.105714660", "pct 12", 1),
-    ("0.130457464", "pct 2", 1),
-]
-
-snapshots["test_draw_more_macro_sample 2"] = [
+snapshots["test_draw_macro_sample_duplicated_batches 2"] = [
     ("0.170838307", "pct 12", 2),
     ("0.184242188", "pct 9", 1),
     ("0.198541554", "pct 14", 1),
@@ -36,6 +41,22 @@ snapshots["test_draw_more_macro_sample 2"] = [
     ("0.230651143", "pct 7", 2),
 ]
 
+snapshots["test_draw_more_macro_sample 1"] = [
+    ("0.249360240", "pct 14", 1),
+    ("0.734689843", "pct 6", 1),
+    ("0.354912716", "pct 17", 1),
+    ("0.778978450", "pct 6", 2),
+    ("0.708868068", "pct 5", 1),
+]
+
+snapshots["test_draw_more_macro_sample 2"] = [
+    ("0.9471725204", "pct 9", 1),
+    ("0.622425075", "pct 4", 1),
+    ("0.9654505064", "pct 9", 2),
+    ("0.471406691", "pct 2", 1),
+    ("0.9049141593", "pct 8", 1),
+]
+
 snapshots["test_draw_more_samples 1"] = [
     ("0.000617786129909912", ("pct 2", 3), 1),
     ("0.002991631653037245", ("pct 3", 24), 1),
@@ -1,7 +1,9 @@
 # pylint: disable=invalid-name
 from decimal import Decimal
 import math
+import random
 import pytest
+from scipy import stats
 
 from ...audit_math import bravo
 from ...audit_math.sampler_contest import Contest
@@ -163,6 +165,30 @@ def test_bravo_sample_sizes():
     )
 
 
+def test_smallest_passing_size():
+    p_w2 = Decimal(0.52) / (Decimal(0.52) + Decimal(0.47))
+    plus = (p_w2 / Decimal(0.5)).ln()
+    minus = ((1 - p_w2) / Decimal(0.5)).ln()
+    threshold = (1 / ALPHA).ln()
+
+    expected_size = bravo.smallest_passing_size(5000, 0.9, p_w2, plus, minus, threshold)
+    assert expected_size > 5000
+
+    # Starting anywhere at or below the smallest passing size gives the same
+    # result as checking every size from there
+    for start in [1, 100, 2000, expected_size - 1, expected_size]:
+        size = start
+        while True:
+            x_c = Decimal(stats.binom.ppf(0.1, size, float(p_w2)))
+            if x_c * plus + (size - x_c) * minus > threshold:
+                break
+            size += 1
+        assert (
+            bravo.smallest_passing_size(start, 0.9, p_w2, plus, minus, threshold)
+            == size
+        )
+
+
 def test_bravo_sample_sizes_round1_finish():
     # Guarantee that the audit should have finished
     r0_sample_win = 10000
@@ -426,6 +452,76 @@ def test_tied_contest():
     assert res
 
 
+def assert_log_test_statistics_match(contest, sample):
+    cumulative_sample = bravo.compute_cumulative_sample(sample or {})
+    T = bravo.get_test_statistics(contest.margins, cumulative_sample)
+    log_T = bravo.get_log_test_statistics(contest.margins, cumulative_sample)
+
+    assert T.keys() == log_T.keys()
+    for pair in T:
+        if T[pair] == 0:
+            assert log_T[pair] == -math.inf
+        else:
+            assert math.isclose(
+                float(T[pair].ln()), log_T[pair], rel_tol=1e-9, abs_tol=1e-9
+            ), "Log test statistic for {} {} failed! Expected {}, got {}".format(
+                contest.name, pair, float(T[pair].ln()), log_T[pair]
+            )
+
+
+def test_log_test_statistics(contests):
+    for contest in contests.values():
+        for sample_results in [round0_sample_results, round1_sample_results]:
+            assert_log_test_statistics_match(contest, sample_results[contest.name])
+
+
+def test_log_test_statistics_multi_winner():
+    # Many candidates and a large sample, where T gets very large or small
+    rand = random.Random(12345)
+    for _ in range(10):
+        num_candidates = rand.randint(3, 20)
+        contest_data = {
+            f"cand{i}": rand.randint(1000, 100000) for i in range(num_candidates)
+        }
+        num_winners = rand.randint(1, num_candidates - 1)
+        contest_data["numWinners"] = num_winners
+        contest_data["votesAllowed"] = num_winners
+        contest_data["ballots"] = sum(contest_data.values())
+        contest = Contest("Multi-winner", contest_data)
+
+        sample = {
+            "round1": {
+                candidate: rand.randint(0, votes // 10)
+                for candidate, votes in contest.candidates.items()
+            }
+        }
+        assert_log_test_statistics_match(contest, sample)
+
+
+def test_compute_risk_log_space(contests):
+    for contest in contests.values():
+        for sample_results in [round0_sample_results, round1_sample_results]:
+            sample = sample_results[contest.name]
+            p_values, decision = bravo.compute_risk(RISK_LIMIT, contest, sample)
+            log_p_values, log_decision = bravo.compute_risk(
+                RISK_LIMIT, contest, sample, log_space=True
+            )
+
+            assert decision == log_decision
+            assert p_values.keys() == log_p_values.keys()
+            for pair in p_values:
+                assert math.isclose(p_values[pair], log_p_values[pair], rel_tol=1e-9)
+
+
+def test_get_sample_size_log_space(contests):
+    for contest in contests.values():
+        for sample_results in [round0_sample_results, round1_sample_results]:
+            sample = sample_results[contest.name]
+            assert bravo.get_sample_size(
+                RISK_LIMIT, contest, sample
+            ) == bravo.get_sample_size(RISK_LIMIT, contest, sample, log_space=True)
+
+
 bravo_contests = {
     "test1": {
         "cand1": 600,
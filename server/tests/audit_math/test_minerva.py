@@ -1,8 +1,10 @@
 # pylint: disable=invalid-name
+from collections import defaultdict
 from decimal import Decimal
 import pytest
+from scipy import stats
 
-from ...audit_math import minerva
+from ...audit_math import bravo, minerva
 from ...audit_math.sampler_contest import Contest
 
 SEED = "12345678901234567890abcdefghijklmnopqrstuvwxyz😊"
@@ -20,23 +22,227 @@ def contests():
     return contests
 
 
-def test_unused_sample_size(contests):
-    for contest in contests:
-        pytest.raises(
-            Exception,
-            minerva.get_sample_size,
+def test_get_sample_size(contests):
+    for contest in contests.values():
+        computed = minerva.get_sample_size(RISK_LIMIT, contest, None, {})
+        expected = true_sample_sizes[contest.name]
+        assert (
+            computed == expected
+        ), "get_sample_size failed in {}: got {}, expected {}".format(
+            contest.name, computed, expected
+        )
+
+
+def test_get_sample_size_second_round(contests):
+    expected_sizes = {
+        "test1": 0,  # Already met the risk limit
+        "test2": 57,
+        "test5": 1000,
+        "test11": 4,
+    }
+
+    for contest_name, expected_size in expected_sizes.items():
+        computed = minerva.get_sample_size(
             RISK_LIMIT,
-            contests[contest],
-            None,
-            {0: 0},
+            contests[contest_name],
+            round1_sample_results[contest_name],
+            {1: 100},
+        )
+        assert computed["0.9"]["size"] == expected_size
+
+
+def test_get_sample_size_fewer_than_bravo():
+    contest = Contest(
+        "close",
+        {
+            "cand1": 51000,
+            "cand2": 49000,
+            "ballots": 100000,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+    minerva_sizes = minerva.get_sample_size(RISK_LIMIT, contest, None, {})
+    bravo_sizes = bravo.get_sample_size(RISK_LIMIT, contest, None)
+    for quant in ["0.7", "0.8", "0.9"]:
+        assert 0 < minerva_sizes[quant]["size"] < bravo_sizes[quant]["size"]
+
+
+def test_get_sample_size_stopping_probability(contests):
+    # The first round sample size should have about the requested chance of
+    # confirming the result
+    contest = contests["test1"]
+    p_w2 = contest.margins["winners"]["cand1"]["swl"]["cand2"]
+    for quant in [0.7, 0.8, 0.9]:
+        size = minerva.get_sample_size(RISK_LIMIT, contest, None, {})[str(quant)][
+            "size"
+        ]
+        _, _, kmins = minerva.round_distributions(p_w2, (size,), RISK_LIMIT / 100)
+        prob = stats.binom.sf(kmins[-1] - 1, size, p_w2)
+        assert quant <= prob < quant + 0.05
+
+
+def test_sample_size_cache(contests):
+    minerva.pair_sample_size.cache_clear()
+    minerva.get_sample_size(RISK_LIMIT, contests["test1"], None, {})
+    misses = minerva.pair_sample_size.cache_info().misses
+
+    minerva.get_sample_size(RISK_LIMIT, contests["test1"], None, {})
+    assert minerva.pair_sample_size.cache_info().misses == misses
+    assert minerva.pair_sample_size.cache_info().hits == 3
+
+
+def test_compute_risk(contests):
+    expected_ps = {
+        "test1": {("cand1", "cand2"): 0.028},
+        "test2": {("cand1", "cand2"): 0.181, ("cand1", "cand3"): 0.0},
+        "test3": {("cand1", ""): 1},
+        "test4": {("cand1", ""): 0},
+        "test5": {("cand1", "cand2"): 0},
+        "test6": {("cand1", "cand2"): 0.033, ("cand1", "cand3"): 0.033},
+        "test7": {("cand1", "cand3"): 0.002, ("cand2", "cand3"): 0.024},
+        "test8": {("cand1", "cand3"): 0.0, ("cand2", "cand3"): 0.004},
+        "test9": {("cand1", ""): 1, ("cand2", ""): 1},
+        "test10": {("cand1", "cand3"): 0.0, ("cand2", "cand3"): 0.002},
+        "test11": {("cand1", "cand2"): 1},
+        "test12": {("cand1", "cand2"): 0.028, ("cand1", "cand3"): 0.0},
+        "test_small_third_candidate": {
+            ("cand1", "cand2"): 0.000289,
+            ("cand1", "cand3"): 0.0,
+        },
+    }
+
+    expected_decisions = {
+        "test1": True,
+        "test2": False,
+        "test3": False,
+        "test4": True,
+        "test5": True,
+        "test6": True,
+        "test7": True,
+        "test8": True,
+        "test9": False,
+        "test10": True,
+        "test11": False,
+        "test12": True,
+        "test_small_third_candidate": True,
+    }
+
+    for contest in contests.values():
+        sample = round1_sample_results[contest.name]
+        p_values, decision = minerva.compute_risk(RISK_LIMIT, contest, sample, {})
+        expected_p = expected_ps[contest.name]
+        assert p_values.keys() == expected_p.keys()
+        for pair in expected_p:
+            assert (
+                abs(p_values[pair] - expected_p[pair]) < 0.001
+            ), "Risk compute for {} failed! Expected {}, got {}".format(
+                contest.name, expected_p[pair], p_values[pair]
+            )
+
+        expected_decision = expected_decisions[contest.name]
+        assert (
+            decision == expected_decision
+        ), "Risk decision for {} failed! Expected {}, got{}".format(
+            contest.name, expected_decision, decision
         )
 
 
-def test_unused_compute_risk(contests):
-    for contest in contests:
-        pytest.raises(
-            Exception, minerva.compute_risk, RISK_LIMIT, contests[contest], {}, {0: 0}
+def test_compute_risk_empty(contests):
+    for contest in contests.values():
+        p_values, decision = minerva.compute_risk(
+            RISK_LIMIT, contest, round0_sample_results[contest.name], {}
         )
+        assert all(p_value == 1 for p_value in p_values.values())
+        assert not decision
+
+
+def brute_force_risk(p_w2, round_schedule, k, alpha):
+    # Computes the Minerva p-value by summing over every possible number of
+    # winner votes in each round, one by one
+    alternative, null = {0: 1.0}, {0: 1.0}
+    previous_size = 0
+    for round_num, size in enumerate(round_schedule):
+        new_votes = size - previous_size
+        next_alternative: dict = defaultdict(float)
+        next_null: dict = defaultdict(float)
+        for votes in alternative:
+            for new_winner_votes in range(new_votes + 1):
+                next_alternative[votes + new_winner_votes] += alternative[
+                    votes
+                ] * stats.binom.pmf(new_winner_votes, new_votes, p_w2)
+                next_null[votes + new_winner_votes] += null[votes] * stats.binom.pmf(
+                    new_winner_votes, new_votes, 0.5
+                )
+        alternative, null = next_alternative, next_null
+        previous_size = size
+
+        def tails(j, alternative=alternative, null=null):
+            return (
+                sum(p for votes, p in alternative.items() if votes >= j),
+                sum(p for votes, p in null.items() if votes >= j),
+            )
+
+        if round_num == len(round_schedule) - 1:
+            alternative_tail, null_tail = tails(k)
+            return null_tail / alternative_tail
+
+        # Remove the outcomes where the audit would have stopped
+        kmin = next(
+            j for j in range(size + 2) if j > size or alpha * tails(j)[0] >= tails(j)[1]
+        )
+        alternative = {v: p for v, p in alternative.items() if v < kmin}
+        null = {v: p for v, p in null.items() if v < kmin}
+    return 1.0
+
+
+def test_compute_risk_multiple_rounds():
+    contest = Contest(
+        "test",
+        {
+            "cand1": 550,
+            "cand2": 450,
+            "ballots": 1000,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+    sample_results = {
+        "round1": {"cand1": 52, "cand2": 48},
+        "round2": {"cand1": 60, "cand2": 40},
+        "round3": {"cand1": 70, "cand2": 50},
+    }
+    p_values, decision = minerva.compute_risk(RISK_LIMIT, contest, sample_results, {})
+    expected = brute_force_risk(0.55, (100, 200, 320), 182, float(ALPHA))
+    assert abs(p_values[("cand1", "cand2")] - expected) < 1e-9
+    assert decision == (expected <= float(ALPHA))
+
+
+def test_tied_contest():
+    contest = Contest(
+        "Tied Contest",
+        {
+            "cand1": 500,
+            "cand2": 500,
+            "ballots": 1000,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+
+    sample_options = minerva.get_sample_size(RISK_LIMIT, contest, None, {})
+    for quant in ["0.7", "0.8", "0.9"]:
+        assert sample_options[quant]["size"] == contest.ballots
+
+    p_values, decision = minerva.compute_risk(RISK_LIMIT, contest, {}, {})
+    assert p_values[("cand1", "cand2")] == 1
+    assert not decision
+
+    # Now do a full hand recount
+    sample_results = {"round1": {"cand1": 501, "cand2": 499}}
+    p_values, decision = minerva.compute_risk(RISK_LIMIT, contest, sample_results, {})
+    assert p_values[("cand1", "cand2")] == 0
+    assert decision
 
 
 bravo_contests = {
@@ -165,46 +371,68 @@ round1_sample_results = {
 
 true_sample_sizes = {
     "test1": {
-        "asn": {"type": "ASN", "size": 119, "prob": 0.52},
-        "0.7": {"type": None, "size": 184, "prob": 0.7},
-        "0.8": {"type": None, "size": 244, "prob": 0.8},
-        "0.9": {"type": None, "size": 351, "prob": 0.9},
+        "0.7": {"type": None, "size": 102, "prob": 0.7},
+        "0.8": {"type": None, "size": 133, "prob": 0.8},
+        "0.9": {"type": None, "size": 179, "prob": 0.9},
     },
     "test2": {
-        "asn": {"type": "ASN", "size": 22, "prob": 0.55},
-        "0.7": {"type": None, "size": 32, "prob": 0.7},
-        "0.8": {"type": None, "size": 41, "prob": 0.8},
-        "0.9": {"type": None, "size": 57, "prob": 0.9},
+        "0.7": {"type": None, "size": 20, "prob": 0.7},
+        "0.8": {"type": None, "size": 25, "prob": 0.8},
+        "0.9": {"type": None, "size": 30, "prob": 0.9},
+    },
+    "test3": {
+        "0.7": {"type": None, "size": 1, "prob": 0.7},
+        "0.8": {"type": None, "size": 1, "prob": 0.8},
+        "0.9": {"type": None, "size": 1, "prob": 0.9},
+    },
+    "test4": {
+        "0.7": {"type": None, "size": 1, "prob": 0.7},
+        "0.8": {"type": None, "size": 1, "prob": 0.8},
+        "0.9": {"type": None, "size": 1, "prob": 0.9},
     },
-    "test3": {"asn": {"type": "ASN", "size": 1, "prob": 1.0},},
-    "test4": {"asn": {"type": "ASN", "size": 1, "prob": 1.0},},
     "test5": {
-        "asn": {"type": "ASN", "size": 1000, "prob": 1},
         "0.7": {"type": None, "size": 1000, "prob": 0.7},
         "0.8": {"type": None, "size": 1000, "prob": 0.8},
         "0.9": {"type": None, "size": 1000, "prob": 0.9},
     },
     "test6": {
-        "asn": {"type": "ASN", "size": 238, "prob": 0.52},
-        "0.7": {"type": None, "size": 368, "prob": 0.7},
-        "0.8": {"type": None, "size": 488, "prob": 0.8},
-        "0.9": {"type": None, "size": 702, "prob": 0.9},
-    },
-    "test7": {"asn": {"type": "ASN", "size": 101, "prob": None,},},
-    "test8": {"asn": {"type": "ASN", "size": 34, "prob": None,},},
-    "test9": {"asn": {"type": "ASN", "size": -1, "prob": None,},},
-    "test10": {"asn": {"type": "ASN", "size": 48, "prob": None,},},
-    "test11": {"asn": {"type": "ASN", "size": 1, "prob": 1.0,},},
+        "0.7": {"type": None, "size": 204, "prob": 0.7},
+        "0.8": {"type": None, "size": 266, "prob": 0.8},
+        "0.9": {"type": None, "size": 358, "prob": 0.9},
+    },
+    "test7": {
+        "0.7": {"type": None, "size": 101, "prob": 0.7},
+        "0.8": {"type": None, "size": 115, "prob": 0.8},
+        "0.9": {"type": None, "size": 145, "prob": 0.9},
+    },
+    "test8": {
+        "0.7": {"type": None, "size": 30, "prob": 0.7},
+        "0.8": {"type": None, "size": 39, "prob": 0.8},
+        "0.9": {"type": None, "size": 46, "prob": 0.9},
+    },
+    "test9": {
+        "0.7": {"type": None, "size": 1, "prob": 0.7},
+        "0.8": {"type": None, "size": 1, "prob": 0.8},
+        "0.9": {"type": None, "size": 1, "prob": 0.9},
+    },
+    "test10": {
+        "0.7": {"type": None, "size": 43, "prob": 0.7},
+        "0.8": {"type": None, "size": 55, "prob": 0.8},
+        "0.9": {"type": None, "size": 65, "prob": 0.9},
+    },
+    "test11": {
+        "0.7": {"type": None, "size": 4, "prob": 0.7},
+        "0.8": {"type": None, "size": 4, "prob": 0.8},
+        "0.9": {"type": None, "size": 4, "prob": 0.9},
+    },
     "test12": {
-        "asn": {"type": "ASN", "size": 119, "prob": 0.52},
-        "0.7": {"type": None, "size": 184, "prob": 0.7},
-        "0.8": {"type": None, "size": 244, "prob": 0.8},
-        "0.9": {"type": None, "size": 351, "prob": 0.9},
+        "0.7": {"type": None, "size": 102, "prob": 0.7},
+        "0.8": {"type": None, "size": 133, "prob": 0.8},
+        "0.9": {"type": None, "size": 179, "prob": 0.9},
     },
     "test_small_third_candidate": {
-        "asn": {"type": "ASN", "size": 1769, "prob": 0.5},
-        "0.7": {"type": None, "size": 2837, "prob": 0.7},
-        "0.8": {"type": None, "size": 3760, "prob": 0.8},
-        "0.9": {"type": None, "size": 5426, "prob": 0.9},
+        "0.7": {"type": None, "size": 1542, "prob": 0.7},
+        "0.8": {"type": None, "size": 1944, "prob": 0.8},
+        "0.9": {"type": None, "size": 2617, "prob": 0.9},
     },
 }
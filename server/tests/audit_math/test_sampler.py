@@ -1,5 +1,8 @@
+import json
 import random
+from decimal import Decimal
 import pytest
+import consistent_sampler
 from ...audit_math import sampler
 from ...audit_math.sampler_contest import Contest
 
@@ -116,6 +119,20 @@ def test_draw_more_macro_sample(macro_batches, macro_contest, snapshot):
     snapshot.assert_match(sample)
 
 
+def test_draw_macro_sample_duplicated_batches(macro_batches, macro_contest, snapshot):
+    # The original sampler should still draw exactly what it used to, so that
+    # audits that started with it get the same batches in later rounds.
+    sample = sampler.draw_ppeb_sample_duplicated_batches(
+        SEED, macro_contest, 10, 0, batch_results=macro_batches
+    )
+    snapshot.assert_match(sample)
+
+    sample = sampler.draw_ppeb_sample_duplicated_batches(
+        SEED, macro_contest, 5, num_sampled=5, batch_results=macro_batches
+    )
+    snapshot.assert_match(sample)
+
+
 def test_macro_recount_sample(close_macro_batches, close_macro_contest, snapshot):
 
     sample = sampler.draw_ppeb_sample(
@@ -145,3 +162,199 @@ def test_ballot_labels():
         sample = sampler.draw_sample(SEED, manifest, 100, 0)
         for (_, (batch, ballot_number), _) in sample:
             assert 1 <= ballot_number <= manifest[batch]
+
+
+def consistent_sampler_draw_sample(seed, manifest, sample_size, num_sampled):
+    # The original implementation of draw_sample, which materializes a list of
+    # every ballot in the manifest and hands it to consistent_sampler.
+    ballots = [(batch, i + 1) for batch in manifest for i in range(manifest[batch])]
+    return list(
+        consistent_sampler.sampler(
+            ballots,
+            seed=seed,
+            take=sample_size + num_sampled,
+            with_replacement=True,
+            output="tuple",
+            digits=18,
+        )
+    )[num_sampled:]
+
+
+def test_draw_sample_matches_consistent_sampler():
+    rand = random.Random(12345)
+    for _ in range(20):
+        manifest = {
+            (
+                f"J{j}",
+                f"TABULATOR{j % 3}" if j % 2 else None,
+                f"BATCH{b}",
+            ): rand.randint(0, 50)
+            for j in range(rand.randint(1, 4))
+            for b in range(rand.randint(1, 10))
+        }
+        sample_size = rand.randint(1, 300)
+        num_sampled = rand.choice([0, rand.randint(1, 100)])
+        assert sampler.draw_sample(
+            SEED, manifest, sample_size, num_sampled
+        ) == consistent_sampler_draw_sample(SEED, manifest, sample_size, num_sampled)
+
+
+def test_draw_sample_larger_than_manifest():
+    manifest = {"pct 1": 3, "pct 2": 2}
+    sample = sampler.draw_sample(SEED, manifest, 20, 0)
+    assert sample == consistent_sampler_draw_sample(SEED, manifest, 20, 0)
+    assert len(sample) == 20
+
+
+def test_draw_sample_empty_manifest():
+    assert sampler.draw_sample(SEED, {}, 10, 0) == []
+
+
+def test_resume_sample_matches_full_redraw():
+    rand = random.Random(54321)
+    manifest = {
+        (f"J{j}", None, f"BATCH{b}"): rand.randint(1, 30)
+        for j in range(3)
+        for b in range(10)
+    }
+
+    state = None
+    num_sampled = 0
+    for sample_size in [10, 40, 200, 1000]:
+        sample, state = sampler.resume_sample(
+            SEED, manifest, sample_size, num_sampled, state
+        )
+        assert sample == sampler.draw_sample(SEED, manifest, sample_size, num_sampled)
+        assert state["num_drawn"] == num_sampled + sample_size
+        num_sampled += sample_size
+        # The state gets stored in the db as JSON
+        state = json.loads(json.dumps(state))
+
+
+def test_resume_sample_rescans(monkeypatch):
+    manifest = {f"pct {i}": 200 for i in range(30)}
+    num_scans = 0
+    first_tickets = sampler.first_tickets
+
+    def counting_first_tickets(seed, manifest):
+        nonlocal num_scans
+        num_scans += 1
+        return first_tickets(seed, manifest)
+
+    monkeypatch.setattr(sampler, "first_tickets", counting_first_tickets)
+
+    def resume(sample_size, num_sampled, state):
+        nonlocal num_scans
+        num_scans = 0
+        sample, state = sampler.resume_sample(
+            SEED, manifest, sample_size, num_sampled, state
+        )
+        scans = num_scans
+        assert sample == sampler.draw_sample(SEED, manifest, sample_size, num_sampled)
+        return scans, state
+
+    # The first round has to scan the manifest
+    scans, state = resume(50, 0, None)
+    assert scans == 1
+
+    # The pool is big enough for a next round up to twice the size of the
+    # sample so far, so we don't need to scan again
+    assert sampler.POOL_SIZE_FACTOR == 3
+    scans, state = resume(100, 50, state)
+    assert scans == 0
+
+    # A bigger round runs out of pool, so we widen it with one more scan
+    scans, state = resume(1000, 150, state)
+    assert scans == 1
+    assert not state["exhausted"]
+    assert len(state["heap"]) == sampler.POOL_SIZE_FACTOR * 1150
+
+
+def test_resume_sample_invalid_state():
+    manifest = {"pct 1": 25, "pct 2": 25}
+    _, state = sampler.resume_sample(SEED, manifest, 10, 0, None)
+
+    # If the number of tickets already drawn doesn't match, start over
+    sample, _ = sampler.resume_sample(SEED, manifest, 10, 5, state)
+    assert sample == sampler.draw_sample(SEED, manifest, 10, 5)
+
+    # If the manifest changed, start over
+    changed_manifest = {"pct 1": 25, "pct 2": 26}
+    sample, _ = sampler.resume_sample(SEED, changed_manifest, 10, 10, state)
+    assert sample == sampler.draw_sample(SEED, changed_manifest, 10, 10)
+
+    # If the seed changed, start over
+    sample, _ = sampler.resume_sample("other seed", manifest, 10, 10, state)
+    assert sample == sampler.draw_sample("other seed", manifest, 10, 10)
+
+
+def test_draw_ppeb_sample_is_consistent(macro_batches, macro_contest):
+    full_sample = sampler.draw_ppeb_sample(SEED, macro_contest, 65, 0, macro_batches)
+    num_sampled = 0
+    for sample_size in [5, 10, 50]:
+        sample = sampler.draw_ppeb_sample(
+            SEED, macro_contest, sample_size, num_sampled, macro_batches
+        )
+        assert sample == full_sample[num_sampled : num_sampled + sample_size]
+        num_sampled += sample_size
+
+    # The order of the batch results doesn't matter
+    reversed_batches = dict(reversed(list(macro_batches.items())))
+    assert (
+        sampler.draw_ppeb_sample(SEED, macro_contest, 65, 0, reversed_batches)
+        == full_sample
+    )
+
+
+def test_draw_ppeb_sample_generations(macro_batches, macro_contest):
+    sample = sampler.draw_ppeb_sample(SEED, macro_contest, 200, 0, macro_batches)
+    times_picked: dict = {}
+    for (_, batch, generation) in sample:
+        times_picked[batch] = times_picked.get(batch, 0) + 1
+        assert generation == times_picked[batch]
+
+    assert len({ticket_number for (ticket_number, _, _) in sample}) == len(sample)
+
+
+def test_draw_ppeb_sample_weights(macro_contest):
+    # One batch with a tiny error bound shouldn't blow up the sampler, and each
+    # batch should be picked in proportion to its error bound.
+    batches = {
+        f"pct {i}": {"test1": {"cand1": 40, "cand2": 10, "ballots": 50}}
+        for i in range(99)
+    }
+    batches["tiny"] = {"test1": {"cand1": 1, "cand2": 0, "ballots": 1}}
+    sample = sampler.draw_ppeb_sample(SEED, macro_contest, 20000, 0, batches)
+    counts: dict = {}
+    for (_, batch, _) in sample:
+        counts[batch] = counts.get(batch, 0) + 1
+    assert counts.get("tiny", 0) < 20
+    for i in range(99):
+        assert 100 <= counts[f"pct {i}"] <= 320
+
+
+def test_draw_ppeb_sample_matches_exact_weights(macro_batches, macro_contest):
+    # Check each draw against a slow but exact version of the same rule: draw
+    # i picks the first batch (in sorted order) whose cumulative error bound
+    # is greater than u_i * U, computed with Decimals rather than floats.
+    sample = sampler.draw_ppeb_sample(SEED, macro_contest, 100, 20, macro_batches)
+
+    batches = sorted(macro_batches)
+    errors = [
+        sampler.macro.compute_max_error(macro_batches[batch], macro_contest)
+        or Decimal(1) / Decimal(macro_contest.ballots)
+        for batch in batches
+    ]
+    cumulative_errors = [sum(errors[: i + 1]) for i in range(len(errors))]
+    seed_hash = consistent_sampler.sha256_hex(SEED)
+    expected_batches = []
+    for i in range(21, 121):
+        u = Decimal(consistent_sampler.sha256_uniform(f"{seed_hash},{i}"))
+        expected_batches.append(
+            next(
+                batch
+                for batch, cumulative_error in zip(batches, cumulative_errors)
+                if cumulative_error > u * cumulative_errors[-1]
+            )
+        )
+    assert [batch for (_, batch, _) in sample] == expected_batches
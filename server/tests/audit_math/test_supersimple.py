@@ -1,4 +1,5 @@
 # pylint: disable=invalid-name
+import random
 from decimal import Decimal
 import pytest
 
@@ -490,6 +491,125 @@ def test_multiplicity():
     assert p != 0  # This wasn't a recount
 
 
+def decimal_compute_risk(contest: Contest, cvrs, sample_cvr) -> Decimal:
+    # Computes the p-value one ballot at a time with Decimals, like
+    # compute_risk used to
+    gamma = supersimple.gamma
+    V = Decimal(contest.diluted_margin * contest.ballots)
+    U = 2 * gamma / Decimal(contest.diluted_margin)
+    discrepancies = supersimple.compute_discrepancies(contest, cvrs, sample_cvr)
+    p = Decimal(1.0)
+    for ballot in sample_cvr:
+        e_r = (
+            discrepancies[ballot]["weighted_error"]
+            if ballot in discrepancies
+            else Decimal(0)
+        )
+        p_b = (1 - 1 / U) / (1 - (e_r / ((2 * gamma) / V)))
+        p *= p_b ** sample_cvr[ballot]["times_sampled"]
+    return p
+
+
+@pytest.mark.parametrize("sample_size", [100, 5000])
+def test_compute_risk_matches_decimal(sample_size):
+    rand = random.Random(12345)
+    contest_data = {
+        "a": 40000,
+        "b": 35000,
+        "c": 15000,
+        "d": 10000,
+        "ballots": 110000,
+        "numWinners": 2,
+        "votesAllowed": 2,
+    }
+    contest = Contest("Contest", contest_data)
+    choices = ["a", "b", "c", "d"]
+
+    cvrs = {}
+    sample_cvr = {}
+    for ballot in range(sample_size):
+        votes = rand.sample(choices, 2)
+        cvrs[ballot] = {"Contest": {choice: int(choice in votes) for choice in choices}}
+        audited = dict(cvrs[ballot]["Contest"])
+        # Mess up some of the ballots
+        if rand.random() < 0.05:
+            audited[rand.choice(choices)] ^= 1
+        sample_cvr[ballot] = {
+            "times_sampled": rand.choice([1, 1, 1, 2]),
+            "cvr": None if rand.random() < 0.005 else {"Contest": audited},
+        }
+
+    p, res = supersimple.compute_risk(RISK_LIMIT, contest, cvrs, sample_cvr)
+    expected_p = decimal_compute_risk(contest, cvrs, sample_cvr)
+
+    assert float(expected_p) == pytest.approx(p, rel=1e-9, abs=0)
+    assert res == (0 < expected_p < ALPHA)
+
+
+def test_update_risk_state_incrementally():
+    rand = random.Random(12345)
+    contest = Contest(
+        "Contest",
+        {
+            "winner": 60000,
+            "loser": 40000,
+            "ballots": 100000,
+            "numWinners": 1,
+            "votesAllowed": 1,
+        },
+    )
+    cvrs = {}
+    sample_cvr = {}
+    for ballot in range(2000):
+        vote = rand.choice(["winner", "loser"])
+        cvrs[ballot] = {
+            "Contest": {"winner": int(vote == "winner"), "loser": int(vote == "loser")}
+        }
+        audited = dict(cvrs[ballot]["Contest"])
+        if rand.random() < 0.02:
+            audited[rand.choice(["winner", "loser"])] ^= 1
+        sample_cvr[ballot] = {
+            "times_sampled": rand.choice([1, 1, 2]),
+            "cvr": None if rand.random() < 0.002 else {"Contest": audited},
+        }
+
+    # Fold the sample in over two rounds, where some of the ballots from the
+    # first round get sampled again in the second round
+    first_round = {ballot: sample_cvr[ballot] for ballot in range(1000)}
+    second_round = {
+        ballot: sample_cvr[ballot] for ballot in range(1000, len(sample_cvr))
+    }
+    redrawn = {}
+    for ballot in range(0, 1000, 10):
+        redrawn[ballot] = {
+            "times_sampled": 1,
+            "cvr": first_round[ballot]["cvr"],
+        }
+        first_round[ballot] = {**first_round[ballot], "times_sampled": 1}
+        sample_cvr[ballot] = {**sample_cvr[ballot], "times_sampled": 2}
+
+    state = supersimple.update_risk_state(
+        supersimple.initial_risk_state(), contest, cvrs, sample_cvr, set(sample_cvr)
+    )
+    incremental_state = supersimple.update_risk_state(
+        supersimple.initial_risk_state(), contest, cvrs, first_round, set(first_round),
+    )
+    incremental_state = supersimple.update_risk_state(
+        incremental_state,
+        contest,
+        cvrs,
+        {**second_round, **redrawn},
+        set(second_round),
+    )
+
+    assert incremental_state["log_p"] == pytest.approx(state["log_p"])
+    assert {**incremental_state, "log_p": None} == {**state, "log_p": None}
+    assert sum(state["discrepancy_counts"].values()) > 0
+    assert supersimple.risk_from_state(
+        RISK_LIMIT, contest, incremental_state
+    ) == pytest.approx(supersimple.compute_risk(RISK_LIMIT, contest, cvrs, sample_cvr))
+
+
 true_dms = {
     "Contest A": 0.2,
     "Contest B": 0.1,
@@ -0,0 +1,247 @@
+"""
+Benchmark of storing CvrBallot.interpretations packed into one byte per
+column, against the original format, which stored the raw string of
+interpretations from the CVR file (e.g. "1,0,,1").
+
+Compares the size of the table and how long rounds.cvrs_for_contest takes to
+load the CVRs for the sampled ballots, picking out the contest's columns in
+SQL, against the original version, which split up each string in Python.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/ballot_comparison/benchmark_cvr_interpretations.py
+"""
+import io
+import time
+import uuid
+import random
+from typing import List
+from flask.testing import FlaskClient
+from sqlalchemy import text
+
+from ...models import *  # pylint: disable=wildcard-import
+from ...database import db_session
+from ...api import cvrs, rounds
+from ...audit_math import supersimple
+from ...bgcompute import (
+    bgcompute_update_ballot_manifest_file,
+    bgcompute_update_cvr_file,
+)
+from ..helpers import *  # pylint: disable=wildcard-import
+
+NUM_BATCHES = 100
+BALLOTS_PER_BATCH = 2000
+NUM_CONTESTS = 10
+CHOICES_PER_CONTEST = 4
+SAMPLE_SIZE = 20_000
+
+
+def original_cvrs_for_contest(contest: Contest) -> supersimple.CVRS:
+    choice_name_to_id = {choice.name: choice.id for choice in contest.choices}
+
+    cvrs: supersimple.CVRS = {}
+
+    for jurisdiction in contest.jurisdictions:
+        choices_metadata = jurisdiction.cvr_contests_metadata[contest.name]["choices"]
+
+        interpretations_by_ballot = db_session.execute(
+            text(
+                """
+                SELECT sampled_ballot.id, original_cvr_ballot.interpretations
+                FROM original_cvr_ballot
+                JOIN batch ON original_cvr_ballot.batch_id = batch.id
+                JOIN sampled_ballot
+                    ON original_cvr_ballot.batch_id = sampled_ballot.batch_id
+                    AND original_cvr_ballot.ballot_position = sampled_ballot.ballot_position
+                WHERE batch.jurisdiction_id = :jurisdiction_id
+                """
+            ),
+            dict(jurisdiction_id=jurisdiction.id),
+        )
+
+        for ballot_key, interpretations_str in interpretations_by_ballot:
+            ballot_cvr: supersimple.CVR = {contest.id: {}}
+            interpretations = interpretations_str.split(",")
+            for choice_name, choice_metadata in choices_metadata.items():
+                interpretation = interpretations[choice_metadata["column"]]
+                if interpretation == "":
+                    ballot_cvr = {}
+                else:
+                    choice_id = choice_name_to_id[choice_name]
+                    ballot_cvr[contest.id][choice_id] = int(interpretation)
+
+            cvrs[ballot_key] = ballot_cvr
+
+    return cvrs
+
+
+def table_size(table_name: str) -> int:
+    return db_session.execute(
+        text("SELECT pg_total_relation_size(:table_name)"), dict(table_name=table_name),
+    ).scalar()
+
+
+def test_benchmark_cvr_interpretations(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    rand = random.Random(12345)
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    jurisdiction_id = jurisdiction_ids[0]
+
+    manifest = "Tabulator,Batch Name,Number of Ballots\n" + "".join(
+        f"TABULATOR1,BATCH{batch},{BALLOTS_PER_BATCH}\n" for batch in range(NUM_BATCHES)
+    )
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/ballot-manifest",
+        data={"manifest": (io.BytesIO(manifest.encode()), "manifest.csv")},
+    )
+    assert_ok(rv)
+    bgcompute_update_ballot_manifest_file()
+
+    contest_headers = [
+        f"Contest {contest} (Vote For=1)"
+        for contest in range(NUM_CONTESTS)
+        for _ in range(CHOICES_PER_CONTEST)
+    ]
+    choice_headers = [
+        f"Choice {contest}-{choice}"
+        for contest in range(NUM_CONTESTS)
+        for choice in range(CHOICES_PER_CONTEST)
+    ]
+    cvr_rows = []
+    for batch in range(NUM_BATCHES):
+        for position in range(1, BALLOTS_PER_BATCH + 1):
+            interpretations = []
+            for _ in range(NUM_CONTESTS):
+                if rand.random() < 0.2:
+                    interpretations += [""] * CHOICES_PER_CONTEST
+                else:
+                    vote = rand.randrange(CHOICES_PER_CONTEST)
+                    interpretations += [
+                        "1" if choice == vote else "0"
+                        for choice in range(CHOICES_PER_CONTEST)
+                    ]
+            cvr_rows.append(
+                f"{len(cvr_rows) + 1},TABULATOR1,BATCH{batch},{position},"
+                f"1-{batch}-{position},12345,COUNTY," + ",".join(interpretations)
+            )
+    cvr = (
+        "Test Audit CVR Upload,5.2.16.1\n"
+        + ",,,,,,,"
+        + ",".join(contest_headers)
+        + "\n"
+        + ",,,,,,,"
+        + ",".join(choice_headers)
+        + "\n"
+        + "CvrNumber,TabulatorNum,BatchId,RecordId,ImprintedId,PrecinctPortion,BallotType\n"
+        + "\n".join(cvr_rows)
+    )
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/cvrs",
+        data={"cvrs": (io.BytesIO(cvr.encode()), "cvrs.csv")},
+    )
+    assert_ok(rv)
+    bgcompute_update_cvr_file()
+
+    # Copy the jurisdiction's CVRs into tables of their own, one in each
+    # format, so we can compare their sizes
+    db_session.execute(
+        text(
+            """
+            CREATE TEMPORARY TABLE packed_cvr_ballot AS
+            SELECT cvr_ballot.*
+            FROM cvr_ballot
+            JOIN batch ON cvr_ballot.batch_id = batch.id
+            WHERE batch.jurisdiction_id = :jurisdiction_id;
+            ALTER TABLE packed_cvr_ballot ADD PRIMARY KEY (batch_id, ballot_position);
+
+            CREATE TEMPORARY TABLE original_cvr_ballot (
+                batch_id VARCHAR(200) NOT NULL,
+                ballot_position INTEGER NOT NULL,
+                imprinted_id VARCHAR(200) NOT NULL,
+                interpretations TEXT NOT NULL,
+                PRIMARY KEY (batch_id, ballot_position)
+            );
+            """
+        ),
+        dict(jurisdiction_id=jurisdiction_id),
+    )
+    original_rows = [
+        (
+            batch_id,
+            ballot_position,
+            imprinted_id,
+            ",".join(
+                "" if interpretation is None else str(interpretation)
+                for interpretation in cvrs.decode_interpretations(interpretations)
+            ),
+        )
+        for batch_id, ballot_position, imprinted_id, interpretations in db_session.execute(
+            "SELECT * FROM packed_cvr_ballot"
+        )
+    ]
+    rounds.bulk_insert(
+        "original_cvr_ballot",
+        ["batch_id", "ballot_position", "imprinted_id", "interpretations"],
+        original_rows,
+    )
+    db_session.execute("ANALYZE packed_cvr_ballot; ANALYZE original_cvr_ballot")
+
+    num_ballots = NUM_BATCHES * BALLOTS_PER_BATCH
+    print(
+        f"\nCVR table size for {num_ballots} ballots with"
+        f" {NUM_CONTESTS * CHOICES_PER_CONTEST} interpretation columns"
+    )
+    print(f"    original: {table_size('original_cvr_ballot') / 1e6:7.1f}MB")
+    print(f"      packed: {table_size('packed_cvr_ballot') / 1e6:7.1f}MB")
+
+    # Sample some ballots
+    batch_ids = [
+        batch.id for batch in Batch.query.filter_by(jurisdiction_id=jurisdiction_id)
+    ]
+    sampled_ballots = rand.sample(
+        [
+            (batch_id, position)
+            for batch_id in batch_ids
+            for position in range(1, BALLOTS_PER_BATCH + 1)
+        ],
+        SAMPLE_SIZE,
+    )
+    now = datetime.utcnow()
+    rounds.bulk_insert(
+        "sampled_ballot",
+        ["id", "batch_id", "ballot_position", "status", "created_at", "updated_at"],
+        [
+            (str(uuid.uuid4()), batch_id, position, "NOT_AUDITED", now, now)
+            for batch_id, position in sampled_ballots
+        ],
+    )
+
+    contest = Contest(
+        id=str(uuid.uuid4()),
+        election_id=election_id,
+        name="Contest 3",
+        is_targeted=True,
+        jurisdictions=[Jurisdiction.query.get(jurisdiction_id)],
+    )
+    db_session.add(contest)
+    cvrs.set_contest_metadata_from_cvrs(contest)
+    db_session.flush()
+
+    print(f"Loading CVRs for {SAMPLE_SIZE} sampled ballots")
+    results = []
+    for name, cvrs_for_contest in [
+        ("original", original_cvrs_for_contest),
+        ("packed", rounds.cvrs_for_contest),
+    ]:
+        elapsed = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = cvrs_for_contest(contest)
+            elapsed.append(time.perf_counter() - start)
+        results.append(result)
+        print(f"{name:>12}: {min(elapsed):7.3f}s")
+
+    assert len(results[0]) == SAMPLE_SIZE
+    assert results[0] == results[1]
+    db_session.rollback()
@@ -0,0 +1,185 @@
+"""
+Benchmark of rounds.load_cvrs_for_contest, which loads the CVRs for a
+contest's sampled ballots with one query per CVR column layout (shared by all
+the jurisdictions that put the contest in the same columns), against the
+original version, which ran a query per jurisdiction.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/ballot_comparison/benchmark_cvrs_for_contest.py
+"""
+import time
+import uuid
+import random
+from typing import cast as typing_cast
+
+from ...models import *  # pylint: disable=wildcard-import
+from ...database import db_session
+from ...api import rounds
+from ...api.cvrs import BLANK_INTERPRETATION
+from ...audit_math import supersimple
+from ...util.jsonschema import JSONDict
+from ..helpers import *  # pylint: disable=wildcard-import
+
+NUM_JURISDICTIONS = 100
+NUM_BATCHES = 10
+BALLOTS_PER_BATCH = 200
+SAMPLED_BALLOTS_PER_BATCH = 20
+NUM_CHOICES = 4
+
+
+def original_cvrs_for_contest(contest: Contest) -> supersimple.CVRS:
+    choice_name_to_id = {choice.name: choice.id for choice in contest.choices}
+
+    cvrs: supersimple.CVRS = {}
+
+    for jurisdiction in contest.jurisdictions:
+        cvr_contests_metadata = typing_cast(
+            JSONDict, jurisdiction.cvr_contests_metadata
+        )
+        choices_metadata = cvr_contests_metadata[contest.name]["choices"]
+
+        choice_ids = [
+            choice_name_to_id[choice_name] for choice_name in choices_metadata
+        ]
+        choice_columns = [
+            func.get_byte(CvrBallot.interpretations, choice_metadata["column"])
+            for choice_metadata in choices_metadata.values()
+        ]
+        interpretations_by_ballot = (
+            CvrBallot.query.join(Batch)
+            .filter_by(jurisdiction_id=jurisdiction.id)
+            .join(
+                SampledBallot,
+                and_(
+                    CvrBallot.batch_id == SampledBallot.batch_id,
+                    CvrBallot.ballot_position == SampledBallot.ballot_position,
+                ),
+            )
+            .values(SampledBallot.id, *choice_columns)
+        )
+
+        for ballot_key, *interpretations in interpretations_by_ballot:
+            if BLANK_INTERPRETATION in interpretations:
+                cvrs[ballot_key] = {}
+            else:
+                cvrs[ballot_key] = {contest.id: dict(zip(choice_ids, interpretations))}
+
+    return cvrs
+
+
+def test_benchmark_cvrs_for_contest(election_id: str):
+    rand = random.Random(12345)
+    contest = Contest(
+        id=str(uuid.uuid4()),
+        election_id=election_id,
+        name="Statewide Contest",
+        is_targeted=True,
+        choices=[
+            ContestChoice(id=str(uuid.uuid4()), name=f"Choice {choice}", num_votes=0)
+            for choice in range(NUM_CHOICES)
+        ],
+    )
+    db_session.add(contest)
+
+    now = datetime.utcnow()
+    batch_rows, cvr_rows, sampled_ballot_rows = [], [], []
+    for jurisdiction_num in range(NUM_JURISDICTIONS):
+        # Put the contest in a different place in each jurisdiction's CVR
+        offset = jurisdiction_num % 5
+        jurisdiction = Jurisdiction(
+            id=str(uuid.uuid4()),
+            election_id=election_id,
+            name=f"County {jurisdiction_num}",
+            cvr_contests_metadata={
+                contest.name: {
+                    "choices": {
+                        f"Choice {choice}": {"column": offset + choice, "num_votes": 0}
+                        for choice in range(NUM_CHOICES)
+                    },
+                    "total_ballots_cast": 0,
+                    "votes_allowed": 1,
+                }
+            },
+        )
+        contest.jurisdictions.append(jurisdiction)
+
+        for batch_num in range(NUM_BATCHES):
+            batch_id = str(uuid.uuid4())
+            batch_rows.append(
+                (
+                    batch_id,
+                    jurisdiction.id,
+                    "TABULATOR1",
+                    f"BATCH{batch_num}",
+                    BALLOTS_PER_BATCH,
+                    now,
+                    now,
+                )
+            )
+            for position in range(1, BALLOTS_PER_BATCH + 1):
+                vote = rand.randrange(NUM_CHOICES)
+                interpretations = [BLANK_INTERPRETATION] * offset + [
+                    int(choice == vote) for choice in range(NUM_CHOICES)
+                ]
+                cvr_rows.append(
+                    (
+                        batch_id,
+                        position,
+                        f"{jurisdiction_num}-{batch_num}-{position}",
+                        bytes(interpretations),
+                    )
+                )
+            for position in rand.sample(
+                range(1, BALLOTS_PER_BATCH + 1), SAMPLED_BALLOTS_PER_BATCH
+            ):
+                sampled_ballot_rows.append(
+                    (str(uuid.uuid4()), batch_id, position, "NOT_AUDITED", now, now)
+                )
+    db_session.flush()
+
+    rounds.bulk_insert(
+        "batch",
+        [
+            "id",
+            "jurisdiction_id",
+            "tabulator",
+            "name",
+            "num_ballots",
+            "created_at",
+            "updated_at",
+        ],
+        batch_rows,
+    )
+    rounds.bulk_insert(
+        "cvr_ballot",
+        ["batch_id", "ballot_position", "imprinted_id", "interpretations"],
+        cvr_rows,
+    )
+    rounds.bulk_insert(
+        "sampled_ballot",
+        ["id", "batch_id", "ballot_position", "status", "created_at", "updated_at"],
+        sampled_ballot_rows,
+    )
+    db_session.execute("ANALYZE batch; ANALYZE cvr_ballot; ANALYZE sampled_ballot")
+
+    print(
+        f"\nLoading CVRs for {len(sampled_ballot_rows)} sampled ballots"
+        f" in {NUM_JURISDICTIONS} jurisdictions"
+    )
+    results = []
+    for name, cvrs_for_contest in [
+        ("original", original_cvrs_for_contest),
+        ("by layout", lambda contest: rounds.load_cvrs_for_contest(contest, None)),
+    ]:
+        elapsed = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = cvrs_for_contest(contest)
+            elapsed.append(time.perf_counter() - start)
+        results.append(result)
+        print(f"{name:>12}: {min(elapsed):7.3f}s")
+
+    assert len(results[0]) == len(sampled_ballot_rows)
+    assert results[0] == results[1]
+    db_session.rollback()
@@ -1,11 +1,23 @@
 import io
 import json
+import pytest
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
 from ..helpers import *  # pylint: disable=wildcard-import
-from ...bgcompute import bgcompute_update_standardized_contests_file
+from ...bgcompute import (
+    bgcompute_update_standardized_contests_file,
+    bgcompute_draw_sample,
+)
 from ...api.sample_sizes import set_contest_metadata_from_cvrs
+from ...api.rounds import (
+    cvrs_for_contest,
+    load_cvrs_for_contest,
+    cvr_cache,
+    sampled_ballot_interpretations_to_cvrs,
+    supersimple_risk_state,
+)
+from ...audit_math import supersimple, sampler_contest
 
 
 def test_set_contest_metadata_from_cvrs(
@@ -53,6 +65,92 @@ def test_set_contest_metadata_from_cvrs(
     )
 
 
+def test_cvrs_for_contest_cache(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+    cvrs,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    contest_id = str(uuid.uuid4())
+    rv = put_json(
+        client,
+        f"/api/election/{election_id}/contest",
+        [
+            {
+                "id": contest_id,
+                "name": "Contest 2",
+                "jurisdictionIds": jurisdiction_ids[:2],
+                "isTargeted": True,
+            }
+        ],
+    )
+    assert_ok(rv)
+    contest = Contest.query.get(contest_id)
+    set_contest_metadata_from_cvrs(contest)
+    db_session.commit()
+
+    batches = (
+        Batch.query.filter(Batch.jurisdiction_id.in_(jurisdiction_ids[:2]))
+        .order_by(Batch.tabulator, Batch.name)
+        .all()
+    )
+
+    def sample_ballots(ballot_position: int):
+        for batch in batches:
+            db_session.add(
+                SampledBallot(
+                    id=str(uuid.uuid4()),
+                    batch_id=batch.id,
+                    ballot_position=ballot_position,
+                    status=BallotStatus.NOT_AUDITED,
+                )
+            )
+        db_session.commit()
+
+    def uncached_cvrs():
+        return {
+            ballot_id: cvr
+            for ballot_id, cvr in load_cvrs_for_contest(contest, None).items()
+            if cvr is not None
+        }
+
+    cvr_cache.clear()
+    sample_ballots(1)
+    cvrs = cvrs_for_contest(contest)
+    assert len(cvrs) == len(batches)
+    assert cvrs == uncached_cvrs()
+    assert cvr_cache.info() == {"hits": 0, "updates": 0, "misses": 1, "size": 1}
+
+    # Asking again should reuse the cached CVRs
+    assert cvrs_for_contest(contest) == cvrs
+    assert cvr_cache.info() == {"hits": 1, "updates": 0, "misses": 1, "size": 1}
+
+    # Sampling more ballots should only add their CVRs to the cache
+    sample_ballots(2)
+    new_cvrs = cvrs_for_contest(contest)
+    assert len(new_cvrs) == 2 * len(batches)
+    assert new_cvrs == uncached_cvrs()
+    assert cvr_cache.info() == {"hits": 1, "updates": 1, "misses": 1, "size": 1}
+
+    # Removing ballots from the sample should reload all the CVRs
+    SampledBallot.query.filter(
+        SampledBallot.batch_id.in_([batch.id for batch in batches]),
+        SampledBallot.ballot_position == 2,
+    ).delete(synchronize_session=False)
+    db_session.commit()
+    assert cvrs_for_contest(contest) == cvrs
+    assert cvr_cache.info() == {"hits": 1, "updates": 1, "misses": 2, "size": 1}
+
+    # As should reprocessing a CVR file
+    jurisdiction = Jurisdiction.query.get(jurisdiction_ids[0])
+    jurisdiction.cvr_file.processing_completed_at = datetime.utcnow()
+    db_session.commit()
+    assert cvrs_for_contest(contest) == cvrs
+    assert cvr_cache.info() == {"hits": 1, "updates": 1, "misses": 3, "size": 1}
+
+
 def test_require_cvr_uploads(
     client: FlaskClient,
     election_id: str,
@@ -165,6 +263,7 @@ def test_ballot_comparison_two_rounds(
         {"roundNum": 1, "sampleSizes": {target_contest_id: sample_size["size"]}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round",)
     round_1_id = json.loads(rv.data)["rounds"][0]["id"]
@@ -294,6 +393,7 @@ def test_ballot_comparison_two_rounds(
     # Start a second round
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2},)
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round",)
     round_2_id = json.loads(rv.data)["rounds"][1]["id"]
@@ -319,6 +419,34 @@ def test_ballot_comparison_two_rounds(
     rv = client.get(f"/api/election/{election_id}/report")
     assert_match_report(rv.data, snapshot)
 
+    # The risk state for round 2 was computed by folding the round 2 ballots
+    # into the round 1 state, without loading the CVRs for the whole sample.
+    # It should match measuring the risk over the whole sample.
+    election = Election.query.get(election_id)
+    round_2 = Round.query.get(round_2_id)
+    for round_contest in round_2.round_contests:
+        contest = round_contest.contest
+        cvr_cache.clear()
+        assert (
+            supersimple_risk_state(election, round_2, contest)
+            == round_contest.risk_state
+        )
+        assert cvr_cache.info()["misses"] == 0
+
+        sample_cvrs = sampled_ballot_interpretations_to_cvrs(contest)
+        full_state = supersimple.update_risk_state(
+            supersimple.initial_risk_state(),
+            sampler_contest.from_db_contest(contest),
+            cvrs_for_contest(contest),
+            sample_cvrs,
+            set(sample_cvrs),
+        )
+        assert round_contest.risk_state["log_p"] == pytest.approx(full_state["log_p"])
+        assert {**round_contest.risk_state, "log_p": None} == {
+            **full_state,
+            "log_p": None,
+        }
+
 
 # This function can be used to generate the correct audit results in case you
 # need to update the above test case.
@@ -397,6 +525,7 @@ def test_ballot_comparison_cvr_metadata(
         {"roundNum": 1, "sampleSizes": {target_contest_id: sample_size["size"]}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round",)
     round_1_id = json.loads(rv.data)["rounds"][0]["id"]
@@ -9,6 +9,7 @@ from ..helpers import *  # pylint: disable=wildcard-import
 from ...bgcompute import (
     bgcompute_update_ballot_manifest_file,
     bgcompute_update_cvr_file,
+    bgcompute_draw_sample,
 )
 
 
@@ -151,6 +152,7 @@ def test_ballot_comparison_container_manifest(
         {"roundNum": 1, "sampleSizes": {target_contest_id: sample_size["size"]}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round",)
     round_1_id = json.loads(rv.data)["rounds"][0]["id"]
@@ -1,13 +1,29 @@
-import io, json
+import io, json, random
+from datetime import datetime, timedelta
+import pytest
 from typing import List
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
 from ..helpers import *  # pylint: disable=wildcard-import
-from ...bgcompute import bgcompute_update_cvr_file
+from ...bgcompute import (
+    bgcompute_update_ballot_manifest_file,
+    bgcompute_update_cvr_file,
+)
+from ...api import cvrs
+from ...util.group_by import group_by
 from ...util.process_file import ProcessingStatus
 from .conftest import TEST_CVRS
 
+
+def format_interpretations(packed: bytes) -> str:
+    # Formats packed interpretations the way they look in the CVR file
+    return ",".join(
+        "" if interpretation is None else str(interpretation)
+        for interpretation in cvrs.decode_interpretations(packed)
+    )
+
+
 # TODO test a bunch of CVR parse errors
 
 
@@ -70,7 +86,7 @@ def test_cvr_upload(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=format_interpretations(cvr.interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -171,7 +187,7 @@ def test_cvrs_counting_group(
                 tabulator=cvr.batch.tabulator,
                 ballot_position=cvr.ballot_position,
                 imprinted_id=cvr.imprinted_id,
-                interpretations=cvr.interpretations,
+                interpretations=format_interpretations(cvr.interpretations),
             )
             for cvr in cvr_ballots
         ]
@@ -318,6 +334,159 @@ def test_cvrs_upload_bad_csv(
     )
 
 
+def test_cvrs_unknown_batch(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    manifests,  # pylint: disable=unused-argument
+):
+    # The bad row comes after some good rows, so we'll have already started
+    # loading the CVRs into the db when we find it
+    bad_cvrs = TEST_CVRS + "16,TABULATOR3,BATCH1,1,3-1-1,12345,COUNTY,0,1,1,1,0\n"
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs",
+        data={"cvrs": (io.BytesIO(bad_cvrs.encode()), "cvrs.csv")},
+    )
+    assert_ok(rv)
+
+    bgcompute_update_cvr_file()
+
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs"
+    )
+    compare_json(
+        json.loads(rv.data),
+        {
+            "file": {"name": "cvrs.csv", "uploadedAt": assert_is_date,},
+            "processing": {
+                "status": ProcessingStatus.ERRORED,
+                "startedAt": assert_is_date,
+                "completedAt": assert_is_date,
+                "error": "Could not parse CVR file",
+            },
+        },
+    )
+    assert (
+        CvrBallot.query.join(Batch)
+        .filter_by(jurisdiction_id=jurisdiction_ids[0])
+        .count()
+        == 0
+    )
+    assert Jurisdiction.query.get(jurisdiction_ids[0]).cvr_contests_metadata is None
+
+
+def test_cvrs_wait_for_manifest(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str],
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/ballot-manifest",
+        data={
+            "manifest": (
+                io.BytesIO(
+                    b"Tabulator,Batch Name,Number of Ballots\n"
+                    b"TABULATOR1,BATCH1,3\n"
+                    b"TABULATOR1,BATCH2,3\n"
+                    b"TABULATOR2,BATCH1,3\n"
+                    b"TABULATOR2,BATCH2,6"
+                ),
+                "manifest.csv",
+            )
+        },
+    )
+    assert_ok(rv)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs",
+        data={"cvrs": (io.BytesIO(TEST_CVRS.encode()), "cvrs.csv")},
+    )
+    assert_ok(rv)
+
+    def cvr_job():
+        db_session.expire_all()
+        return Jurisdiction.query.get(jurisdiction_ids[0]).cvr_file.processing_job
+
+    # While the manifest is queued, a worker that only handles CVRs leaves
+    # the CVR file alone
+    assert bgcompute_update_cvr_file() == 0
+    assert cvr_job().state == ProcessingJobState.QUEUED
+
+    # Same while another worker is processing the manifest
+    manifest_job = Jurisdiction.query.get(
+        jurisdiction_ids[0]
+    ).manifest_file.processing_job
+    manifest_job.state = ProcessingJobState.RUNNING
+    manifest_job.attempts = 1
+    manifest_job.lease_expires_at = datetime.utcnow() + timedelta(minutes=1)
+    db_session.commit()
+
+    assert bgcompute_update_cvr_file() == 0
+    assert cvr_job().state == ProcessingJobState.QUEUED
+
+    # Once the manifest is loaded, we can parse the CVRs against it
+    manifest_job = Jurisdiction.query.get(
+        jurisdiction_ids[0]
+    ).manifest_file.processing_job
+    manifest_job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    bgcompute_update_ballot_manifest_file()
+
+    assert bgcompute_update_cvr_file() == 1
+    assert cvr_job().state == ProcessingJobState.SUCCEEDED
+    assert (
+        CvrBallot.query.join(Batch)
+        .filter_by(jurisdiction_id=jurisdiction_ids[0])
+        .count()
+        == 15
+    )
+
+
+def test_cvrs_unknown_batch_error(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    manifests,  # pylint: disable=unused-argument
+):
+    bad_cvrs = TEST_CVRS + "16,TABULATOR3,BATCH1,1,3-1-1,12345,COUNTY,0,1,1,1,0\n"
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs",
+        data={"cvrs": (io.BytesIO(bad_cvrs.encode()), "cvrs.csv")},
+    )
+    assert_ok(rv)
+
+    # The error raised while COPY was reading the rows is the one we report,
+    # rather than the error psycopg2 replaces it with
+    jurisdiction = Jurisdiction.query.get(jurisdiction_ids[0])
+    with pytest.raises(Exception, match="Could not parse CVR file") as error:
+        cvrs.process_cvr_file(db_session, jurisdiction, jurisdiction.cvr_file)
+    assert isinstance(error.value.__cause__, KeyError)
+
+
+def test_cvrs_wrong_number_of_cells(
+    client: FlaskClient,
+    election_id: str,
+    jurisdiction_ids: List[str],
+    manifests,  # pylint: disable=unused-argument
+):
+    bad_cvrs = TEST_CVRS + "16,TABULATOR2,BATCH2,7,2-2-7,12345,CITY,1,0,1\n"
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs",
+        data={"cvrs": (io.BytesIO(bad_cvrs.encode()), "cvrs.csv")},
+    )
+    assert_ok(rv)
+
+    bgcompute_update_cvr_file()
+
+    rv = client.get(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/cvrs"
+    )
+    assert json.loads(rv.data)["processing"]["error"] == (
+        "Wrong number of cells in row 20. Expected 12 cells, got 10 cells."
+    )
+
+
 def test_cvrs_wrong_audit_type(
     client: FlaskClient,
     election_id: str,
@@ -364,3 +533,100 @@ def test_cvrs_before_manifests(
             }
         ]
     }
+
+
+def row_by_row_tally_cvr_votes(
+    contests_metadata, contest_names, contest_choices, interpretation_rows
+):
+    # The original tallying code, which looked at one row at a time
+    for interpretations in interpretation_rows:
+        contests_on_ballot = set()
+        interpretations_by_contest = group_by(
+            zip(contest_names, contest_choices, interpretations),
+            key=lambda tuple: tuple[0],  # contest_name
+        )
+        for contest_name, interpretations in interpretations_by_contest.items():
+            if any(interpretation == "" for _, _, interpretation in interpretations):
+                continue
+            contests_on_ballot.add(contest_name)
+
+            votes = sum(int(interpretation) for _, _, interpretation in interpretations)
+            if votes > contests_metadata[contest_name]["votes_allowed"]:
+                continue
+
+            for _, choice_name, interpretation in interpretations:
+                contests_metadata[contest_name]["choices"][choice_name][
+                    "num_votes"
+                ] += int(interpretation)
+
+        for contest_name in contests_on_ballot:
+            contests_metadata[contest_name]["total_ballots_cast"] += 1
+
+
+def test_tally_cvr_votes():
+    rand = random.Random(12345)
+    for _ in range(20):
+        contest_names, contest_choices = [], []
+        for contest in range(rand.randint(1, 5)):
+            for choice in range(rand.randint(1, 4)):
+                contest_names.append(f"Contest {contest}")
+                contest_choices.append(f"Choice {contest}-{choice}")
+
+        def empty_metadata():
+            metadata = {
+                contest_name: {"choices": {}, "total_ballots_cast": 0}
+                for contest_name in contest_names
+            }
+            for column, (contest_name, choice_name) in enumerate(
+                zip(contest_names, contest_choices)
+            ):
+                metadata[contest_name]["votes_allowed"] = 2
+                metadata[contest_name]["choices"][choice_name] = dict(
+                    column=column, num_votes=0
+                )
+            return metadata
+
+        # Blank cells mean the contest isn't on the ballot, and some ballots
+        # overvote. Sometimes, throw in some interpretations that are longer
+        # than one character.
+        interpretation_choices = rand.choice(
+            [["", "0", "0", "1", "1"], ["", "0", "1", "00", "01"]]
+        )
+        rows = [
+            [rand.choice(interpretation_choices) for _ in contest_names]
+            for _ in range(rand.randint(1, 200))
+        ]
+
+        expected_metadata = empty_metadata()
+        row_by_row_tally_cvr_votes(
+            expected_metadata, contest_names, contest_choices, rows
+        )
+
+        metadata = empty_metadata()
+        chunk_size = rand.randint(1, 50)
+        for start in range(0, len(rows), chunk_size):
+            cvrs.tally_cvr_votes(
+                metadata,
+                contest_names,
+                contest_choices,
+                cvrs.parse_interpretations(rows[start : start + chunk_size]),
+            )
+        assert metadata == expected_metadata
+
+
+def test_parse_interpretations():
+    rows = [["1", "0", "", "12"], ["0", "", "1", "0"]]
+    interpretations = cvrs.parse_interpretations(rows)
+    packed = [
+        bytes.fromhex(cvrs.encode_interpretations(row)[2:]) for row in interpretations
+    ]
+    assert packed == [bytes([1, 0, 255, 12]), bytes([0, 255, 1, 0])]
+    assert [cvrs.decode_interpretations(row) for row in packed] == [
+        [1, 0, None, 12],
+        [0, None, 1, 0],
+    ]
+
+    with pytest.raises(ValueError, match="Invalid interpretation in CVR"):
+        cvrs.parse_interpretations([["x", "1"]])
+    with pytest.raises(ValueError, match="Invalid interpretation in CVR"):
+        cvrs.parse_interpretations([["255", "1"]])
@@ -6,6 +6,7 @@ from ..helpers import *  # pylint: disable=wildcard-import
 from ...bgcompute import (
     bgcompute_update_batch_tallies_file,
     bgcompute_update_ballot_manifest_file,
+    bgcompute_draw_sample,
 )
 from ...util.process_file import ProcessingStatus
 
@@ -160,6 +161,7 @@ def round_1_id(
         {"roundNum": 1, "sampleSizes": {contest_id: sample_size}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     rounds = json.loads(rv.data)["rounds"]
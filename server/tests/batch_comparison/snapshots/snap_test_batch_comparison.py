@@ -10,7 +10,7 @@ snapshots = Snapshot()
 snapshots["test_batch_comparison_round_1 1"] = {
     "numSamples": 14,
     "numSamplesAudited": 0,
-    "numUnique": 5,
+    "numUnique": 6,
     "numUniqueAudited": 0,
     "status": "NOT_STARTED",
 }
@@ -18,7 +18,7 @@ snapshots["test_batch_comparison_round_1 1"] = {
 snapshots["test_batch_comparison_round_1 2"] = {
     "numSamples": 6,
     "numSamplesAudited": 0,
-    "numUnique": 3,
+    "numUnique": 4,
     "numUniqueAudited": 0,
     "status": "NOT_STARTED",
 }
@@ -26,8 +26,8 @@ snapshots["test_batch_comparison_round_1 2"] = {
 snapshots["test_batch_comparison_round_2 1"] = {
     "numSamples": 4,
     "numSamplesAudited": 4,
-    "numUnique": 2,
-    "numUniqueAudited": 2,
+    "numUnique": 3,
+    "numUniqueAudited": 3,
     "status": "COMPLETE",
 }
 
@@ -42,8 +42,8 @@ snapshots["test_batch_comparison_round_2 2"] = {
 snapshots["test_batch_comparison_round_2 3"] = {
     "numSamples": 4,
     "numSamplesAudited": 4,
-    "numUnique": 2,
-    "numUniqueAudited": 2,
+    "numUnique": 3,
+    "numUniqueAudited": 3,
     "status": "COMPLETE",
 }
 
@@ -56,26 +56,25 @@ snapshots["test_batch_comparison_round_2 4"] = {
 }
 
 snapshots["test_batch_comparison_round_2 5"] = {
-    "numSamples": 2,
-    "numSamplesAudited": 0,
-    "numUnique": 2,
-    "numUniqueAudited": 0,
+    "numSamples": 3,
+    "numSamplesAudited": 2,
+    "numUnique": 3,
+    "numUniqueAudited": 2,
     "status": "NOT_STARTED",
 }
 
 snapshots["test_batch_comparison_round_2 6"] = {
-    "numSamples": 2,
-    "numSamplesAudited": 1,
-    "numUnique": 2,
-    "numUniqueAudited": 1,
+    "numSamples": 1,
+    "numSamplesAudited": 0,
+    "numUnique": 1,
+    "numUniqueAudited": 0,
     "status": "NOT_STARTED",
 }
 
 snapshots[
     "test_batch_comparison_round_2 7"
 ] = """Batch Name,Container,Tabulator,Audit Board
-Batch 2,,,Audit Board #1
-Batch 4,,,Audit Board #2
+Batch 5,,,Audit Board #1
 """
 
 snapshots[
@@ -102,28 +101,28 @@ J2,Audit Board #1,,,,\r
 \r
 ######## ROUNDS ########\r
 Round Number,Contest Name,Targeted?,Sample Size,Risk Limit Met?,P-Value,Start Time,End Time,Audited Votes\r
-1,Contest 1,Targeted,6,No,0.189590948,DATETIME,DATETIME,candidate 1: 2400; candidate 2: 300; candidate 3: 240\r
+1,Contest 1,Targeted,6,No,0.2907897931,DATETIME,DATETIME,candidate 1: 600; candidate 2: 300; candidate 3: 240\r
 2,Contest 1,Targeted,4,No,,DATETIME,,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
 \r
 ######## SAMPLED BATCHES ########\r
 Jurisdiction Name,Batch Name,Ticket Numbers,Audited?,Audit Result\r
-J1,Batch 1,Round 1: 0.025053745,Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J1,Batch 3,"Round 1: 0.023650366, 0.122600189, 0.150810694",Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J2,Batch 1,Round 1: 0.128219632,Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J2,Batch 5,"Round 1: 0.121751602, Round 2: 0.172408497",Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J1,Batch 2,Round 2: 0.203857756,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
-J1,Batch 4,Round 2: 0.169018243,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
-J2,Batch 3,Round 2: 0.176814880,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
+J1,Batch 1,"Round 1: 0.027706895, Round 2: 0.079548222",Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 3,"Round 1: 0.292053892, 0.304454958, Round 2: 0.275215558",Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 9,Round 1: 0.497232174,Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J2,Batch 1,Round 1: 0.588095751,Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J2,Batch 6,Round 1: 0.9899119005,Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 5,Round 2: 0.418511199,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
+J2,Batch 4,Round 2: 0.9010065587,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
 """
 
 snapshots[
     "test_batch_comparison_round_2 9"
 ] = """######## SAMPLED BATCHES ########\r
 Jurisdiction Name,Batch Name,Ticket Numbers,Audited?,Audit Result\r
-J1,Batch 1,Round 1: 0.025053745,Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J1,Batch 3,"Round 1: 0.023650366, 0.122600189, 0.150810694",Yes,candidate 1: 400; candidate 2: 50; candidate 3: 40\r
-J1,Batch 2,Round 2: 0.203857756,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
-J1,Batch 4,Round 2: 0.169018243,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
+J1,Batch 1,"Round 1: 0.027706895, Round 2: 0.079548222",Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 3,"Round 1: 0.292053892, 0.304454958, Round 2: 0.275215558",Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 9,Round 1: 0.497232174,Yes,candidate 1: 100; candidate 2: 50; candidate 3: 40\r
+J1,Batch 5,Round 2: 0.418511199,No,candidate 1: 0; candidate 2: 0; candidate 3: 0\r
 """
 
 snapshots["test_batch_comparison_sample_size 1"] = [
@@ -1,11 +1,14 @@
 import io
+import pytest
 from typing import List
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
 from ..helpers import *  # pylint: disable=wildcard-import
 from ...util.group_by import group_by
-from ...bgcompute import bgcompute_update_batch_tallies_file
+from ...api import rounds as rounds_module
+from ...audit_math import sampler, sampler_contest
+from ...bgcompute import bgcompute_update_batch_tallies_file, bgcompute_draw_sample
 
 
 def test_batch_comparison_only_one_contest_allowed(
@@ -174,6 +177,7 @@ def test_batch_comparison_round_1(
         {"roundNum": 1, "sampleSizes": {contest_id: sample_size}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     rounds = json.loads(rv.data)["rounds"]
@@ -187,6 +191,7 @@ def test_batch_comparison_round_1(
                 "startedAt": assert_is_date,
                 "endedAt": None,
                 "isAuditComplete": None,
+                "drawSampleTask": assert_sample_drawn,
             }
         ],
     )
@@ -277,7 +282,7 @@ def test_batch_comparison_round_2(
     # Record some batch results
     choice_ids = [choice["id"] for choice in contests[0]["choices"]]
     batch_results = {
-        batch["id"]: {choice_ids[0]: 400, choice_ids[1]: 50, choice_ids[2]: 40,}
+        batch["id"]: {choice_ids[0]: 100, choice_ids[1]: 50, choice_ids[2]: 40,}
         for batch in batches
     }
 
@@ -311,7 +316,7 @@ def test_batch_comparison_round_2(
 
     # Record results for the second jurisdiction
     batch_results = {
-        batch["id"]: {choice_ids[0]: 400, choice_ids[1]: 50, choice_ids[2]: 40,}
+        batch["id"]: {choice_ids[0]: 100, choice_ids[1]: 50, choice_ids[2]: 40,}
         for batch in batches
     }
 
@@ -332,6 +337,7 @@ def test_batch_comparison_round_2(
     # Start a second round
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2})
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     rounds = json.loads(rv.data)["rounds"]
@@ -344,6 +350,7 @@ def test_batch_comparison_round_2(
                 "startedAt": assert_is_date,
                 "endedAt": assert_is_date,
                 "isAuditComplete": False,
+                "drawSampleTask": assert_sample_drawn,
             },
             {
                 "id": assert_is_id,
@@ -351,6 +358,7 @@ def test_batch_comparison_round_2(
                 "startedAt": assert_is_date,
                 "endedAt": None,
                 "isAuditComplete": None,
+                "drawSampleTask": assert_sample_drawn,
             },
         ],
     )
@@ -399,3 +407,85 @@ def test_batch_comparison_round_2(
         f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/report"
     )
     assert_match_report(rv.data, snapshot)
+
+
+@pytest.mark.parametrize("use_original_sampler", [True, False])
+def test_batch_comparison_ppeb_sampler(
+    use_original_sampler: bool,
+    client: FlaskClient,
+    election_id: str,
+    contest_id: str,
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+    batch_tallies,  # pylint: disable=unused-argument
+):
+    # Audits that drew their first round with the original PPEB sampler (set
+    # by the migration that added Election.ppeb_sampler) keep using it.
+    # Audits that haven't drawn a round yet start using the new sampler.
+    if use_original_sampler:
+        election = Election.query.get(election_id)
+        election.ppeb_sampler = PpebSampler.DUPLICATED_BATCHES
+        db_session.commit()
+        draw_ppeb_sample = sampler.draw_ppeb_sample_duplicated_batches
+    else:
+        draw_ppeb_sample = sampler.draw_ppeb_sample
+
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_id: 20}},
+    )
+    assert_ok(rv)
+    bgcompute_draw_sample()
+
+    election = Election.query.get(election_id)
+    assert election.ppeb_sampler == (
+        PpebSampler.DUPLICATED_BATCHES
+        if use_original_sampler
+        else PpebSampler.CUMULATIVE_ERRORS
+    )
+
+    def sampled_batches(round_id: str):
+        return sorted(
+            SampledBatchDraw.query.filter_by(round_id=round_id)
+            .join(Batch)
+            .join(Jurisdiction)
+            .values(SampledBatchDraw.ticket_number, Jurisdiction.name, Batch.name,)
+        )
+
+    def expected_batches(sample_size: int, num_sampled: int):
+        contest = Contest.query.get(contest_id)
+        sample = draw_ppeb_sample(
+            election.random_seed,
+            sampler_contest.from_db_contest(contest),
+            sample_size,
+            num_sampled,
+            rounds_module.batch_tallies(election),
+        )
+        return sorted(
+            (ticket_number, jurisdiction_name, batch_name)
+            for ticket_number, (jurisdiction_name, batch_name), _ in sample
+        )
+
+    round_1 = Round.query.filter_by(election_id=election_id, round_num=1).one()
+    assert sampled_batches(round_1.id) == expected_batches(20, 0)
+
+    # The next round follows on from the draws in the first round
+    round_2 = Round(
+        id=str(uuid.uuid4()),
+        election_id=election_id,
+        round_num=2,
+        draw_sample_started_at=datetime.utcnow(),
+    )
+    db_session.add(round_2)
+    db_session.commit()
+    rounds_module.sample_batches(
+        election,
+        round_2,
+        [Contest.query.get(contest_id)],
+        {contest_id: 10},
+        rounds_module.DrawSampleProgress(round_2.id),
+    )
+    assert sampled_batches(round_2.id) == expected_batches(10, 20)
+    db_session.rollback()
@@ -2,9 +2,10 @@ from typing import List
 from flask.testing import FlaskClient
 
 from ...models import *  # pylint: disable=wildcard-import
+from ...bgcompute import bgcompute_draw_sample
 from ..helpers import *  # pylint: disable=wildcard-import
 
-J1_BATCHES_ROUND_1 = 2
+J1_BATCHES_ROUND_1 = 3
 J2_BATCHES_ROUND_1 = 2
 
 
@@ -145,7 +146,7 @@ def test_record_batch_results(
     }
 
     for batch in batches:
-        results[batch["id"]][choice_ids[0]] = 400
+        results[batch["id"]][choice_ids[0]] = 100
         results[batch["id"]][choice_ids[1]] = 50
         results[batch["id"]][choice_ids[2]] = 40
 
@@ -195,7 +196,7 @@ def test_record_batch_results(
     }
 
     for batch in batches:
-        results[batch["id"]][choice_ids[0]] = 400
+        results[batch["id"]][choice_ids[0]] = 100
         results[batch["id"]][choice_ids[1]] = 50
         results[batch["id"]][choice_ids[2]] = 40
 
@@ -231,6 +232,7 @@ def test_record_batch_results(
     set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2})
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
     rv = client.get(
@@ -252,7 +254,7 @@ def test_record_batch_results(
     )
     assert rv.status_code == 200
     batches = json.loads(rv.data)["batches"]
-    assert len(batches) == 2
+    assert len(batches) == 1
     # Batches that were sampled in round 1 should be filtered out
     for batch in batches:
         assert batch["id"] not in round_1_batch_ids
@@ -265,7 +267,7 @@ def test_record_batch_results(
     assert set(results.keys()) == {batch["id"] for batch in batches}
 
     for batch in batches:
-        results[batch["id"]][choice_ids[0]] = 400
+        results[batch["id"]][choice_ids[0]] = 100
         results[batch["id"]][choice_ids[1]] = 50
         results[batch["id"]][choice_ids[2]] = 40
 
@@ -426,6 +428,7 @@ def test_record_batch_results_bad_round(
     set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2})
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
     rv = put_json(
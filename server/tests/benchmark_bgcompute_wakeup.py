@@ -0,0 +1,79 @@
+"""
+Benchmark of how long it takes bgcompute to start processing an uploaded
+file, with the worker listening for notifications, against the original
+worker, which checked for new files every 2 seconds.
+
+This isn't collected with the rest of the tests. To run it:
+
+    pytest -s server/tests/benchmark_bgcompute_wakeup.py
+"""
+import io
+import time
+import random
+import multiprocessing
+from typing import List
+from flask.testing import FlaskClient
+
+from .helpers import *  # pylint: disable=wildcard-import
+from ..models import *  # pylint: disable=wildcard-import
+from ..database import db_session
+from .. import bgcompute
+
+NUM_UPLOADS = 20
+
+
+def original_worker():
+    while True:
+        bgcompute.bgcompute()
+        time.sleep(2)
+
+
+def listening_worker():
+    bgcompute.bgcompute_forever()
+
+
+def test_benchmark_bgcompute_wakeup(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rand = random.Random(12345)
+    print()
+
+    for name, worker in [("polling", original_worker), ("listening", listening_worker)]:
+        process = multiprocessing.get_context("spawn").Process(target=worker)
+        process.start()
+        time.sleep(5)  # Let the worker start up and clear out any old tasks
+
+        delays = []
+        for i in range(NUM_UPLOADS):
+            jurisdiction_id = jurisdiction_ids[i % 2]
+            rv = client.put(
+                f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/ballot-manifest",
+                data={
+                    "manifest": (
+                        io.BytesIO(b"Batch Name,Number of Ballots\n1,23\n2,101"),
+                        "manifest.csv",
+                    )
+                },
+            )
+            assert_ok(rv)
+
+            while True:
+                db_session.expire_all()
+                file = Jurisdiction.query.get(jurisdiction_id).manifest_file
+                if file.processing_started_at:
+                    break
+                time.sleep(0.01)
+            delays.append(
+                (file.processing_started_at - file.uploaded_at).total_seconds()
+            )
+            db_session.commit()
+            time.sleep(rand.uniform(0, 1))
+
+        process.terminate()
+        process.join()
+
+        print(
+            f"{name:>10}: time to processing start"
+            f" mean {sum(delays) / len(delays):.3f}s, max {max(delays):.3f}s"
+        )
@@ -18,6 +18,7 @@ from .helpers import *  # pylint: disable=wildcard-import
 from ..bgcompute import (
     bgcompute_update_election_jurisdictions_file,
     bgcompute_update_ballot_manifest_file,
+    bgcompute_draw_sample,
 )
 
 
@@ -209,6 +210,7 @@ def round_1_id(
         },
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
     rv = client.get(f"/api/election/{election_id}/round",)
     rounds = json.loads(rv.data)["rounds"]
     return str(rounds[0]["id"])
@@ -227,6 +229,7 @@ def round_2_id(
     set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2},)
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round",)
     rounds = json.loads(rv.data)["rounds"]
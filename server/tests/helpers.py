@@ -239,6 +239,13 @@ def assert_is_date(value):
     datetime.fromisoformat(value)
 
 
+def assert_sample_drawn(value):
+    __tracebackhide__ = True  # pylint: disable=unused-variable
+    assert isinstance(value, dict)
+    assert value["status"] == ProcessingStatus.PROCESSED
+    assert value["error"] is None
+
+
 def assert_is_passphrase(value):
     __tracebackhide__ = True  # pylint: disable=unused-variable
     assert isinstance(value, str)
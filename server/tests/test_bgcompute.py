@@ -0,0 +1,388 @@
+import io
+import time
+from datetime import datetime, timedelta
+from typing import List
+from flask.testing import FlaskClient
+
+from .helpers import *  # pylint: disable=wildcard-import
+from ..models import *  # pylint: disable=wildcard-import
+from ..database import db_session, engine
+from .. import bgcompute
+from ..bgcompute import bgcompute_update_ballot_manifest_file, bgcompute_draw_sample
+from ..api.rounds import start_draw_sample, process_draw_sample
+from ..util.process_file import FILE_TYPE_PRIORITIES, MAX_PROCESSING_JOB_ATTEMPTS
+
+
+def upload_manifests(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    for jurisdiction_id in jurisdiction_ids:
+        rv = client.put(
+            f"/api/election/{election_id}/jurisdiction/{jurisdiction_id}/ballot-manifest",
+            data={
+                "manifest": (
+                    io.BytesIO(b"Batch Name,Number of Ballots\n" b"1,23\n" b"2,101"),
+                    "manifest.csv",
+                )
+            },
+        )
+        assert_ok(rv)
+
+
+def manifests_processed(jurisdiction_ids: List[str]) -> List[bool]:
+    db_session.expire_all()
+    return [
+        Jurisdiction.query.get(jurisdiction_id).manifest_file.processing_completed_at
+        is not None
+        for jurisdiction_id in jurisdiction_ids
+    ]
+
+
+def test_bgcompute_skips_locked_files(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:2])
+    file_id = Jurisdiction.query.get(jurisdiction_ids[0]).manifest_file_id
+
+    # Lock the first file's job, as if another worker was claiming it
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(
+            "SELECT file_id FROM processing_job WHERE file_id = %s FOR UPDATE",
+            (file_id,),
+        )
+
+        bgcompute_update_ballot_manifest_file()
+        assert manifests_processed(jurisdiction_ids[:2]) == [False, True]
+
+        transaction.commit()
+
+    bgcompute_update_ballot_manifest_file()
+    assert manifests_processed(jurisdiction_ids[:2]) == [True, True]
+
+
+def test_bgcompute_task_concurrency_limit(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+
+    # Take all the slots for processing ballot manifests, as if other workers
+    # were processing them
+    num_slots = bgcompute.TASK_CONCURRENCY_LIMITS["BALLOT_MANIFEST"]
+    with engine.connect() as connection:
+        for slot in range(num_slots):
+            connection.execute(
+                "SELECT pg_advisory_lock(hashtext('BALLOT_MANIFEST'), %s)", (slot,),
+            )
+
+        assert bgcompute_update_ballot_manifest_file() == 0
+        assert manifests_processed(jurisdiction_ids[:1]) == [False]
+
+        # Once a slot frees up, we can process the file
+        connection.execute("SELECT pg_advisory_unlock(hashtext('BALLOT_MANIFEST'), 0)")
+        assert bgcompute_update_ballot_manifest_file() >= 1
+        assert manifests_processed(jurisdiction_ids[:1]) == [True]
+
+        connection.execute("SELECT pg_advisory_unlock_all()")
+
+
+def test_bgcompute_shutdown(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+
+    bgcompute.shutdown_requested.set()
+    try:
+        # Once we've been asked to shut down, we don't start any new tasks
+        bgcompute.bgcompute_forever()
+        assert bgcompute.bgcompute() == 0
+        assert manifests_processed(jurisdiction_ids[:1]) == [False]
+    finally:
+        bgcompute.shutdown_requested.clear()
+
+    bgcompute_update_ballot_manifest_file()
+    assert manifests_processed(jurisdiction_ids[:1]) == [True]
+
+
+def test_bgcompute_wakes_up_on_upload(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    with bgcompute.listen_for_tasks() as connection:
+        assert not bgcompute.wait_for_task(connection, 0.1)
+
+        upload_manifests(client, election_id, jurisdiction_ids[:1])
+        assert bgcompute.wait_for_task(connection, 5)
+
+        bgcompute.shutdown_requested.set()
+        try:
+            assert not bgcompute.wait_for_task(connection, 5)
+        finally:
+            bgcompute.shutdown_requested.clear()
+
+    bgcompute_update_ballot_manifest_file()
+    assert manifests_processed(jurisdiction_ids[:1]) == [True]
+
+
+def processing_job(jurisdiction_id: str) -> ProcessingJob:
+    db_session.expire_all()
+    return Jurisdiction.query.get(jurisdiction_id).manifest_file.processing_job
+
+
+def test_bgcompute_processing_job(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+    job = processing_job(jurisdiction_ids[0])
+    assert job.file_type == FileType.BALLOT_MANIFEST
+    assert job.state == ProcessingJobState.QUEUED
+    assert job.priority == FILE_TYPE_PRIORITIES[FileType.BALLOT_MANIFEST]
+    assert job.attempts == 0
+
+    bgcompute_update_ballot_manifest_file()
+    job = processing_job(jurisdiction_ids[0])
+    assert job.state == ProcessingJobState.SUCCEEDED
+    assert job.attempts == 1
+    assert job.started_at <= job.completed_at
+    assert job.lease_expires_at is None
+    assert job.num_rows == 2
+    assert job.error is None
+
+
+def test_bgcompute_processing_job_error(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
+    rv = client.put(
+        f"/api/election/{election_id}/jurisdiction/{jurisdiction_ids[0]}/ballot-manifest",
+        data={
+            "manifest": (
+                io.BytesIO(b"Batch Name,Number of Ballots\n" b"1,not a number"),
+                "manifest.csv",
+            )
+        },
+    )
+    assert_ok(rv)
+
+    bgcompute_update_ballot_manifest_file()
+    job = processing_job(jurisdiction_ids[0])
+    assert job.state == ProcessingJobState.FAILED
+    assert job.error == job.file.processing_error
+    assert job.num_rows is None
+
+
+def test_bgcompute_priority(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:2])
+    processing_job(jurisdiction_ids[1]).priority += 1
+    db_session.commit()
+
+    # The job with the higher priority goes first, even though it was queued
+    # after the other one
+    jobs = bgcompute.claim_pending_files([FileType.BALLOT_MANIFEST])
+    job = next(jobs)
+    assert job.file_id == Jurisdiction.query.get(jurisdiction_ids[1]).manifest_file_id
+    jobs.close()
+
+
+def test_bgcompute_reclaims_expired_lease(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+
+    # Start the job, as if another worker was processing it
+    job = processing_job(jurisdiction_ids[0])
+    job.state = ProcessingJobState.RUNNING
+    job.attempts = 1
+    job.lease_expires_at = datetime.utcnow() + timedelta(minutes=1)
+    db_session.commit()
+
+    # While the other worker's lease lasts, we leave the job alone
+    bgcompute_update_ballot_manifest_file()
+    assert manifests_processed(jurisdiction_ids[:1]) == [False]
+
+    # Once the lease expires (i.e. the worker died), we take over the job
+    job = processing_job(jurisdiction_ids[0])
+    job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+
+    bgcompute_update_ballot_manifest_file()
+    assert manifests_processed(jurisdiction_ids[:1]) == [True]
+    job = processing_job(jurisdiction_ids[0])
+    assert job.state == ProcessingJobState.SUCCEEDED
+    assert job.attempts == 2
+
+
+def test_bgcompute_max_attempts(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str]
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+
+    job = processing_job(jurisdiction_ids[0])
+    job.state = ProcessingJobState.RUNNING
+    job.attempts = MAX_PROCESSING_JOB_ATTEMPTS
+    job.started_at = datetime.utcnow() - timedelta(minutes=10)
+    job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+
+    bgcompute_update_ballot_manifest_file()
+    job = processing_job(jurisdiction_ids[0])
+    assert job.state == ProcessingJobState.FAILED
+    assert job.attempts == MAX_PROCESSING_JOB_ATTEMPTS
+    assert (
+        job.error
+        == f"Processing stopped unexpectedly after {MAX_PROCESSING_JOB_ATTEMPTS} attempts."
+    )
+    assert job.file.processing_error == job.error
+    assert job.file.processing_completed_at is not None
+    assert Jurisdiction.query.get(jurisdiction_ids[0]).batches == []
+
+
+def test_bgcompute_renews_lease(
+    client: FlaskClient, election_id: str, jurisdiction_ids: List[str], monkeypatch
+):
+    upload_manifests(client, election_id, jurisdiction_ids[:1])
+    monkeypatch.setattr(bgcompute, "LEASE_RENEWAL_INTERVAL", timedelta(seconds=0.05))
+
+    job = processing_job(jurisdiction_ids[0])
+    job.state = ProcessingJobState.RUNNING
+    job.lease_expires_at = datetime.utcnow()
+    db_session.commit()
+    original_lease_expires_at = job.lease_expires_at
+
+    with bgcompute.renew_lease(job):
+        time.sleep(0.2)
+    assert processing_job(jurisdiction_ids[0]).lease_expires_at > (
+        original_lease_expires_at + timedelta(minutes=1)
+    )
+
+
+def create_round_one(client: FlaskClient, election_id: str, contest_id: str) -> str:
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": {contest_id: 10}},
+    )
+    assert_ok(rv)
+    return Round.query.filter_by(election_id=election_id).one().id
+
+
+def num_draws(round_id: str) -> int:
+    db_session.expire_all()
+    return SampledBallotDraw.query.filter_by(round_id=round_id).count()
+
+
+def test_bgcompute_reclaims_expired_draw_sample_lease(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    round_id = create_round_one(client, election_id, contest_ids[0])
+
+    # Start drawing the sample, as if another worker was drawing it
+    round = Round.query.get(round_id)
+    round.draw_sample_started_at = datetime.utcnow()
+    round.draw_sample_attempts = 1
+    round.draw_sample_lease_expires_at = datetime.utcnow() + timedelta(minutes=1)
+    db_session.commit()
+
+    # While the other worker's lease lasts, we leave the round alone
+    bgcompute_draw_sample()
+    assert num_draws(round_id) == 0
+
+    # Once the lease expires (i.e. the worker died), we take over the draw
+    round = Round.query.get(round_id)
+    round.draw_sample_lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+
+    bgcompute_draw_sample()
+    assert num_draws(round_id) == 10
+    round = Round.query.get(round_id)
+    assert round.draw_sample_completed_at is not None
+    assert round.draw_sample_error is None
+    assert round.draw_sample_lease_expires_at is None
+    assert round.draw_sample_attempts == 2
+
+
+def test_bgcompute_draw_sample_max_attempts(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    round_id = create_round_one(client, election_id, contest_ids[0])
+
+    round = Round.query.get(round_id)
+    round.draw_sample_started_at = datetime.utcnow() - timedelta(minutes=10)
+    round.draw_sample_attempts = MAX_PROCESSING_JOB_ATTEMPTS
+    round.draw_sample_lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+
+    bgcompute_draw_sample()
+    assert num_draws(round_id) == 0
+    round = Round.query.get(round_id)
+    assert (
+        round.draw_sample_error
+        == f"Drawing the sample stopped unexpectedly after {MAX_PROCESSING_JOB_ATTEMPTS} attempts."
+    )
+    assert round.draw_sample_completed_at is not None
+
+
+def test_bgcompute_draw_sample_gives_way(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    round_id = create_round_one(client, election_id, contest_ids[0])
+    round = Round.query.with_for_update().get(round_id)
+    assert start_draw_sample(db_session, round)
+    assert round.draw_sample_attempts == 1
+
+    # Our lease expires and another worker takes over before we're done
+    with engine.begin() as connection:
+        connection.execute(
+            update(Round.__table__)  # pylint: disable=no-member
+            .where(Round.id == round_id)
+            .values(
+                draw_sample_started_at=datetime.utcnow() + timedelta(seconds=1),
+                draw_sample_attempts=2,
+            )
+        )
+
+    # So we don't save our sample
+    assert not process_draw_sample(db_session, round)
+    assert num_draws(round_id) == 0
+    round = Round.query.get(round_id)
+    assert round.draw_sample_completed_at is None
+
+
+def test_bgcompute_renews_draw_sample_lease(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+    monkeypatch,
+):
+    round_id = create_round_one(client, election_id, contest_ids[0])
+    monkeypatch.setattr(bgcompute, "LEASE_RENEWAL_INTERVAL", timedelta(seconds=0.05))
+
+    round = Round.query.get(round_id)
+    round.draw_sample_started_at = datetime.utcnow()
+    round.draw_sample_lease_expires_at = datetime.utcnow()
+    db_session.commit()
+    original_lease_expires_at = round.draw_sample_lease_expires_at
+
+    with bgcompute.renew_draw_sample_lease(round):
+        time.sleep(0.2)
+    db_session.expire_all()
+    assert Round.query.get(round_id).draw_sample_lease_expires_at > (
+        original_lease_expires_at + timedelta(minutes=1)
+    )
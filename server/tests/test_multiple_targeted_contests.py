@@ -1,10 +1,15 @@
 import uuid, json
 from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
 import pytest
 from flask.testing import FlaskClient
 
 from .helpers import *  # pylint: disable=wildcard-import
 from ..models import *  # pylint: disable=wildcard-import
+from ..bgcompute import bgcompute_draw_sample
+from ..api import rounds
+from ..audit_math import sampler
 
 
 @pytest.fixture
@@ -96,6 +101,7 @@ def test_two_rounds(
         {"roundNum": 1, "sampleSizes": selected_sample_sizes},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
     round_1 = Round.query.filter_by(election_id=election_id).first()
 
     # Audit all the ballots for Contest 1 and meet the risk limit, but don't
@@ -114,6 +120,7 @@ def test_two_rounds(
                     "startedAt": assert_is_date,
                     "endedAt": assert_is_date,
                     "isAuditComplete": False,
+                    "drawSampleTask": assert_sample_drawn,
                 }
             ]
         },
@@ -160,6 +167,7 @@ def test_two_rounds(
 
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2})
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     rounds = json.loads(rv.data)
@@ -173,6 +181,7 @@ def test_two_rounds(
                     "startedAt": assert_is_date,
                     "endedAt": assert_is_date,
                     "isAuditComplete": False,
+                    "drawSampleTask": assert_sample_drawn,
                 },
                 {
                     "id": assert_is_id,
@@ -180,6 +189,7 @@ def test_two_rounds(
                     "startedAt": assert_is_date,
                     "endedAt": None,
                     "isAuditComplete": None,
+                    "drawSampleTask": assert_sample_drawn,
                 },
             ]
         },
@@ -207,6 +217,7 @@ def test_two_rounds(
                     "startedAt": assert_is_date,
                     "endedAt": assert_is_date,
                     "isAuditComplete": False,
+                    "drawSampleTask": assert_sample_drawn,
                 },
                 {
                     "id": assert_is_id,
@@ -214,6 +225,7 @@ def test_two_rounds(
                     "startedAt": assert_is_date,
                     "endedAt": assert_is_date,
                     "isAuditComplete": True,
+                    "drawSampleTask": assert_sample_drawn,
                 },
             ]
         },
@@ -242,3 +254,78 @@ def test_two_rounds(
 
     rv = client.get(f"/api/election/{election_id}/report")
     assert_match_report(rv.data, snapshot)
+
+
+def test_parallel_sampling(
+    client: FlaskClient,
+    election_id: str,
+    contest_ids: List[str],
+    election_settings,  # pylint: disable=unused-argument
+    manifests,  # pylint: disable=unused-argument
+):
+    set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
+    rv = client.get(f"/api/election/{election_id}/sample-sizes")
+    sample_sizes = json.loads(rv.data)["sampleSizes"]
+    selected_sample_sizes = {
+        contest_id: sizes[0]["size"] for contest_id, sizes in sample_sizes.items()
+    }
+
+    rv = post_json(
+        client,
+        f"/api/election/{election_id}/round",
+        {"roundNum": 1, "sampleSizes": selected_sample_sizes},
+    )
+    assert_ok(rv)
+
+    start_methods = []
+
+    def process_pool_executor(*args, **kwargs):
+        start_methods.append(kwargs["mp_context"].get_start_method())
+        return ProcessPoolExecutor(*args, **kwargs)
+
+    with patch.object(rounds, "SAMPLE_PROCESSES", 2), patch.object(
+        rounds, "ProcessPoolExecutor", process_pool_executor
+    ):
+        bgcompute_draw_sample()
+
+    # The sampling processes shouldn't be forked from the bgcompute worker
+    assert start_methods == ["spawn"]
+
+    # The sample should be the same as if we drew it for each contest serially
+    election = Election.query.get(election_id)
+    for contest_id in contest_ids[:2]:
+        contest = Contest.query.get(contest_id)
+        manifest = {
+            (jurisdiction.name, batch.tabulator, batch.name): batch.num_ballots
+            for jurisdiction in contest.jurisdictions
+            for batch in jurisdiction.batches
+        }
+        expected_sample = sampler.draw_sample(
+            str(election.random_seed), manifest, selected_sample_sizes[contest_id], 0
+        )
+        draws = (
+            SampledBallotDraw.query.filter_by(contest_id=contest_id)
+            .join(SampledBallot)
+            .join(Batch)
+            .join(Jurisdiction)
+            .values(
+                SampledBallotDraw.ticket_number,
+                Jurisdiction.name,
+                Batch.tabulator,
+                Batch.name,
+                SampledBallot.ballot_position,
+            )
+        )
+        assert sorted(
+            (ticket_number, ((jurisdiction_name, tabulator, batch_name), position))
+            for (
+                ticket_number,
+                jurisdiction_name,
+                tabulator,
+                batch_name,
+                position,
+            ) in draws
+        ) == sorted(
+            (ticket_number, ballot_key)
+            for (ticket_number, ballot_key, _) in expected_sample
+        )
@@ -2,6 +2,7 @@ import pytest
 from flask.testing import FlaskClient
 
 from .helpers import *  # pylint: disable=wildcard-import
+from ..bgcompute import bgcompute_draw_sample
 
 
 @pytest.fixture
@@ -55,6 +56,7 @@ def test_run_offline_audit(
         {"roundNum": 1, "sampleSizes": {contests[0]["id"]: 100}},
     )
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     rv = client.get(f"/api/election/{election_id}/round")
     rounds = json.loads(rv.data)["rounds"]
@@ -274,6 +276,7 @@ def test_offline_results_bad_round(
     set_logged_in_user(client, UserType.AUDIT_ADMIN, DEFAULT_AA_EMAIL)
     rv = post_json(client, f"/api/election/{election_id}/round", {"roundNum": 2})
     assert_ok(rv)
+    bgcompute_draw_sample()
 
     set_logged_in_user(client, UserType.JURISDICTION_ADMIN, DEFAULT_JA_EMAIL)
     rv = put_json(
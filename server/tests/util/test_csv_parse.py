@@ -1,5 +1,5 @@
 from typing import Union, List
-import os, io, pytest
+import os, io, pytest, chardet
 from werkzeug.exceptions import BadRequest
 from ...util.jurisdiction_bulk_update import JURISDICTIONS_COLUMNS
 from ...util.csv_parse import (
@@ -820,3 +820,25 @@ def test_decode_excel_file():
             " If you are working with an Excel spreadsheet,"
             " make sure you export it as a .csv file before uploading"
         )
+
+
+def test_decode_large_file_samples_encoding(monkeypatch):
+    # A big Windows-1252 file whose only non-ASCII characters are in the
+    # middle of the file
+    rows = [f"Batch {i},{i}\n" for i in range(100_000)]
+    rows[50_000] = "Café Ñandú,1\n"
+    csv = "Batch Name,Number of Ballots\n" + "".join(rows)
+    file = csv.encode("windows-1252")
+
+    sample_sizes = []
+    original_detect = chardet.detect
+
+    def detect(sample: bytes):
+        sample_sizes.append(len(sample))
+        return original_detect(sample)
+
+    monkeypatch.setattr(chardet, "detect", detect)
+
+    assert decode_csv_file(file) == csv
+    assert len(sample_sizes) == 1
+    assert sample_sizes[0] < len(file) / 4
@@ -0,0 +1,72 @@
+import io
+import csv
+import random
+import pytest
+
+from ...database import engine
+from ...util.csv_parse import CSVParseError
+from ...util.csv_stream import CsvStream, copy_rows
+
+
+def csv_text(rows) -> str:
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue()
+
+
+def test_csv_stream():
+    rand = random.Random(12345)
+    rows = [
+        [rand.choice(["a", "b,c", 'd"e', "", "1,0,1"]) for _ in range(5)]
+        for _ in range(1000)
+    ]
+
+    assert CsvStream(rows).read() == csv_text(rows)
+
+    for size in [1, 7, 100, 8192]:
+        stream = CsvStream(rows)
+        chunks = []
+        while True:
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            assert len(chunk) <= size
+            chunks.append(chunk)
+        assert "".join(chunks) == csv_text(rows)
+
+
+def test_csv_stream_is_lazy():
+    rows_read = 0
+
+    def rows():
+        nonlocal rows_read
+        for i in range(1000):
+            rows_read += 1
+            yield [i]
+
+    stream = CsvStream(rows())
+    assert stream.read(10) == "0\r\n1\r\n2\r\n3"
+    assert rows_read == 4
+
+
+def test_csv_stream_empty():
+    assert CsvStream([]).read() == ""
+    assert CsvStream([]).read(10) == ""
+
+
+def test_copy_rows_error():
+    def rows():
+        yield ["a"]
+        raise CSVParseError("Bad row")
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("CREATE TEMPORARY TABLE copy_rows_test (value TEXT)")
+        with pytest.raises(CSVParseError, match="Bad row"):
+            copy_rows(
+                cursor, "COPY copy_rows_test FROM STDIN WITH (FORMAT CSV)", rows()
+            )
+    finally:
+        connection.rollback()
+        connection.close()
@@ -0,0 +1,135 @@
+import os
+import uuid
+import random
+import pytest
+from unittest.mock import patch
+
+from ...models import File
+from ...database import db_session
+from ...util import file_storage
+
+
+def test_file_storage_round_trip():
+    rand = random.Random(12345)
+    # Include multi-byte characters so that some of them get split across
+    # chunk boundaries
+    contents = "".join(
+        rand.choice(["a", "b,c", "\r\n", "\n", "é", "投票"]) for _ in range(10_000)
+    )
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+
+    with patch.object(file_storage, "CHUNK_SIZE", 1000):
+        file.save_contents(contents)
+    assert file.contents is None
+    assert file.num_chunks == len(contents.encode("utf-8")) // 1000 + 1
+
+    with file.open() as stream:
+        assert stream.read() == contents
+    with file.open() as stream:
+        assert list(stream) == contents.splitlines(keepends=True)
+
+    # The chunks are only deleted once the deletion is committed
+    file.delete_contents()
+    with file.open() as stream:
+        assert stream.read() == contents
+    db_session.commit()
+    with pytest.raises(FileNotFoundError):
+        file.open().read()
+
+
+def test_file_storage_rollback():
+    # If a saved file is never committed, its chunks are cleaned up
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    file.save_contents("a,b\r\n1,2\r\n")
+    with file.open() as stream:
+        assert stream.read() == "a,b\r\n1,2\r\n"
+    db_session.rollback()
+    with pytest.raises(FileNotFoundError):
+        file.open().read()
+
+    # If a file's deletion is rolled back, it keeps its contents
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    file.save_contents("a,b\r\n1,2\r\n")
+    db_session.commit()
+    file.delete_contents()
+    db_session.rollback()
+    with file.open() as stream:
+        assert stream.read() == "a,b\r\n1,2\r\n"
+    file.delete_contents()
+    db_session.commit()
+
+
+def test_file_storage_without_file_store():
+    # Without a file store, the contents are kept in the db
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    with patch.object(file_storage, "file_store", None):
+        file.save_contents("a,b\r\n1,2\r\n")
+    assert file.num_chunks is None
+    assert file.contents == "a,b\r\n1,2\r\n"
+    with file.open() as stream:
+        assert list(stream) == ["a,b\r\n", "1,2\r\n"]
+
+
+# To test storing files in S3, point this at an S3-compatible store, e.g. MinIO:
+#   ARLO_TEST_S3_FILE_STORAGE_URL=s3://arlo-test-files?endpoint_url=http://localhost:9000
+# along with the AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and AWS_DEFAULT_REGION
+# env vars for it.
+S3_FILE_STORAGE_URL = os.environ.get("ARLO_TEST_S3_FILE_STORAGE_URL")
+
+
+@pytest.mark.skipif(
+    not S3_FILE_STORAGE_URL, reason="ARLO_TEST_S3_FILE_STORAGE_URL is not set"
+)
+def test_s3_file_store():
+    store = file_storage.file_store_from_url(str(S3_FILE_STORAGE_URL))
+    assert isinstance(store, file_storage.S3FileStore)
+    bucket_names = [bucket["Name"] for bucket in store.client.list_buckets()["Buckets"]]
+    if store.bucket not in bucket_names:
+        store.client.create_bucket(Bucket=store.bucket)
+
+    rand = random.Random(12345)
+    contents = "".join(rand.choice(["a", "b,c", "\r\n", "é"]) for _ in range(5_000))
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    with patch.object(file_storage, "file_store", store), patch.object(
+        file_storage, "CHUNK_SIZE", 1000
+    ):
+        file.save_contents(contents)
+        assert file.num_chunks > 1
+        with file.open() as stream:
+            assert stream.read() == contents
+
+        file.delete_contents()
+        db_session.commit()
+        assert (
+            store.client.list_objects_v2(Bucket=store.bucket, Prefix=f"{file.id}/")[
+                "KeyCount"
+            ]
+            == 0
+        )
+
+
+def test_file_storage_compresses_chunks():
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    with patch.object(file_storage.file_store, "put") as put:
+        file.save_contents("Batch Name,Number of Ballots\n" + "Batch 1,100\n" * 10_000)
+    assert put.call_count == 1
+    (key, data) = put.call_args[0]
+    assert key == f"{file.id}/0"
+    assert len(data) < 1000
+
+
+def test_file_storage_empty_file():
+    file = File(id=str(uuid.uuid4()), name="test.csv")
+    file.save_contents("")
+    assert file.num_chunks == 0
+    with file.open() as stream:
+        assert stream.read() == ""
+
+
+def test_file_storage_legacy_contents():
+    # Files uploaded before the file store have their contents in the db
+    file = File(id=str(uuid.uuid4()), name="test.csv", contents="a,b\r\n1,2\r\n")
+    with file.open() as stream:
+        assert list(stream) == ["a,b\r\n", "1,2\r\n"]
+    file.delete_contents()
+    assert file.contents == "a,b\r\n1,2\r\n"
@@ -1,4 +1,5 @@
 import re
+from typing import Union, Iterable
 from datetime import datetime
 from flask import Response
 
@@ -20,9 +21,21 @@ def jurisdiction_timestamp_name(election: Election, jurisdiction: Jurisdiction)
     return f"{jurisdiction_name}-{election_name}-{now}"
 
 
-def csv_response(csv_text: str, filename: str) -> Response:
+def csv_response(csv_text: Union[str, Iterable[str]], filename: str) -> Response:
     return Response(
         csv_text,
         mimetype="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+def csv_file_response(file: File) -> Response:
+    # Stream the file to the client a piece at a time, rather than loading the
+    # whole file into memory.
+    contents = file.open()
+
+    def read_contents():
+        with contents:
+            yield from iter(lambda: contents.read(64 * 1024), "")
+
+    return csv_response(read_contents(), file.name)
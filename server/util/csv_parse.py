@@ -1,8 +1,19 @@
 # pylint: disable=stop-iteration-return
 from enum import Enum
-from typing import List, Iterator, Dict, Any, NamedTuple, Tuple
+from typing import (
+    List,
+    Iterator,
+    Iterable,
+    Dict,
+    Any,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TextIO,
+    Union,
+)
 import csv as py_csv
-import io, re, locale, chardet
+import io, re, locale, itertools, chardet
 from werkzeug.exceptions import BadRequest
 from .process_file import UserError
 
@@ -36,22 +47,20 @@ CSVDictIterator = Iterator[Dict[str, Any]]
 # Robust CSV parsing
 # "Be conservative in what you do, be liberal in what you accept from others"
 # https://en.wikipedia.org/wiki/Robustness_principle
-def parse_csv(csv_string: str, columns: List[CSVColumnType]) -> CSVDictIterator:
-    validate_is_csv(csv_string)
-    csv: CSVIterator = py_csv.reader(io.StringIO(csv_string), delimiter=",")
-    csv = strip_whitespace(csv)
-    csv = reject_no_rows(csv)
-    csv = skip_empty_trailing_columns(csv)
-    csv = validate_and_normalize_headers(csv, columns)
-    dict_csv = convert_rows_to_dicts(csv)
-    dict_csv = reject_empty_cells(dict_csv)
-    dict_csv = reject_total_rows(dict_csv)
-    dict_csv = validate_and_parse_values(dict_csv, columns)
-    dict_csv = reject_duplicate_values(dict_csv, columns)
-    # Filter out empty rows last so we can get accurate row numbers in all the
-    # other checkers
-    dict_csv = skip_empty_rows(dict_csv)
-    return dict_csv
+def parse_csv(
+    csv_file: Union[str, TextIO], columns: List[CSVColumnType]
+) -> CSVDictIterator:
+    if isinstance(csv_file, str):
+        validate_is_csv(csv_file)
+        lines: Iterable[str] = io.StringIO(csv_file)
+    else:
+        # Only read the first line up front, so we can parse the rest of the
+        # file as we go.
+        first_line = csv_file.readline()
+        validate_is_csv(first_line)
+        lines = itertools.chain([first_line], csv_file)
+    csv: CSVIterator = py_csv.reader(lines, delimiter=",")
+    return validate_and_parse_rows(csv, columns)
 
 
 def validate_is_csv(csv: str):
@@ -75,55 +84,121 @@ def validate_is_csv(csv: str):
     )
 
 
-def strip_whitespace(csv: CSVIterator) -> CSVIterator:
-    return ([cell.strip() for cell in row] for row in csv)
-
-
-def reject_no_rows(csv: CSVIterator) -> CSVIterator:
-    yield next(csv)
-    second = next(csv, None)
-    if second is None:
-        raise CSVParseError("CSV must contain at least one row after headers.")
-    yield second
-    yield from csv
-
-
-def skip_empty_trailing_columns(csv: CSVIterator) -> CSVIterator:
-    headers = next(csv)
+def validate_and_parse_rows(
+    csv: CSVIterator, columns: List[CSVColumnType]
+) -> CSVDictIterator:
+    """
+    Checks and parses each row in a single pass. Once we've read the headers,
+    we know which checks apply to which cells, so we work that out up front
+    and then only do the work each row actually needs.
+
+    The checks are applied to each row in this order (so that a row with
+    several problems always gets the same error):
+    - strip whitespace from each cell
+    - reject values in empty trailing columns (and drop those columns)
+    - reject rows with the wrong number of cells
+    - reject empty cells
+    - reject total rows
+    - parse and validate values
+    - reject duplicate values in the unique columns
+    Empty rows are skipped, but still counted, so we get accurate row
+    numbers in error messages.
+    """
+    headers = [cell.strip() for cell in next(csv)]
 
     # Count empty trailing columns so we can ignore them.
-    empty_trailing_header_count = 0
+    num_columns_with_trailing = len(headers)
+    num_empty_trailing = 0
     for header in reversed(headers):
         if len(header) == 0:
-            empty_trailing_header_count += 1
+            num_empty_trailing += 1
         else:
             break
+    if num_empty_trailing > 0:
+        headers = headers[:-num_empty_trailing]
 
-    if empty_trailing_header_count == 0:
-        # No empty trailing columns, just send the data through as-is.
-        yield headers
-        yield from csv
-    else:
-        yield headers[0:-empty_trailing_header_count]
-        for r, row in enumerate(csv):  # pylint: disable=invalid-name
+    headers = validate_and_normalize_headers(headers, columns)
+    num_headers = len(headers)
+
+    first_row = next(csv, None)
+    if first_row is None:
+        raise CSVParseError("CSV must contain at least one row after headers.")
+
+    columns_by_header = {column.name: column for column in columns}
+    value_parsers = [
+        (index, header, columns_by_header[header].value_type)
+        for index, header in enumerate(headers)
+        if columns_by_header[header].value_type is not CSVValueType.TEXT
+    ]
+
+    # For our purposes, we want all the columns with unique=True to be used as
+    # one composite unique key for the rows.
+    unique_columns = tuple(sorted(column.name for column in columns if column.unique))
+    unique_indexes = [headers.index(column) for column in unique_columns]
+    seen = set()
+
+    for r, row in enumerate(  # pylint: disable=invalid-name
+        itertools.chain([first_row], csv)
+    ):
+        row = [cell.strip() for cell in row]
+
+        if num_empty_trailing > 0:
             for (empty_trailing_column_index, cell) in enumerate(
-                row[-empty_trailing_header_count:]
+                row[-num_empty_trailing:]
             ):
                 if len(cell) > 0:
                     raise CSVParseError(
-                        f"Empty trailing column {len(headers) - empty_trailing_header_count + empty_trailing_column_index + 1}"
+                        f"Empty trailing column {num_columns_with_trailing - num_empty_trailing + empty_trailing_column_index + 1}"
                         f" expected to have no values, but row {r+2} has a value: {cell}."
                     )
+            row = row[:-num_empty_trailing]
+
+        # Skip empty rows
+        if len(row) == 0:
+            continue
+        if len(row) != num_headers:
+            raise CSVParseError(
+                f"Wrong number of cells in row {r+2}."
+                f" Expected {num_headers} {pluralize('cell', num_headers)},"
+                f" got {len(row)} {pluralize('cell', len(row))}."
+            )
+        if not any(row):
+            continue
 
-            # Pass only cells for non-empty columns.
-            yield row[0:-empty_trailing_header_count]
+        if "" in row:
+            raise CSVParseError(
+                "All cells must have values."
+                f" Got empty cell at column {headers[row.index('')]}, row {r+2}."
+            )
+
+        for value in row:
+            if value.lower() in TOTAL_VALUES:
+                raise CSVParseError(f"Remove total row (row {r+2})")
 
+        values: List[Any] = row
+        if value_parsers:
+            values = list(row)
+            for index, header, value_type in value_parsers:
+                values[index] = parse_value(row[index], value_type, header, r)
 
-def validate_and_normalize_headers(
-    csv: CSVIterator, columns: List[CSVColumnType]
-) -> CSVIterator:
-    headers = next(csv)
+        if unique_indexes:
+            row_key = tuple(values[index] for index in unique_indexes)
+            if row_key in seen:
+                raise CSVParseError(
+                    f"Each row must be uniquely identified by {format_tuple(unique_columns)}."
+                    + f" Found duplicate: {format_tuple(row_key)}."
+                )
+            seen.add(row_key)
+
+        yield dict(zip(headers, values))
+
+
+TOTAL_VALUES = {"total", "totals"}
 
+
+def validate_and_normalize_headers(
+    headers: CSVRow, columns: List[CSVColumnType]
+) -> CSVRow:
     normalized_headers = [
         next((c.name for c in columns if c.name.lower() == header.lower()), header)
         for header in headers
@@ -148,145 +223,96 @@ def validate_and_normalize_headers(
             f"Found unexpected columns. Allowed columns: {', '.join(sorted(allowed_headers))}."
         )
 
-    yield normalized_headers
-    yield from csv
-
-
-def is_empty_row(row: Dict[str, Any]) -> bool:
-    return all(value == "" for value in row.values())
-
-
-def skip_empty_rows(csv: CSVDictIterator) -> CSVDictIterator:
-    for row in csv:
-        if not is_empty_row(row):
-            yield row
+    return normalized_headers
 
 
-def reject_empty_cells(csv: CSVDictIterator) -> CSVDictIterator:
-    for r, row in enumerate(csv):  # pylint: disable=invalid-name
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
-
-        for header, value in row.items():  # pylint: disable=invalid-name
-            if value == "":
-                raise CSVParseError(
-                    "All cells must have values."
-                    f" Got empty cell at column {header}, row {r+2}."
-                )
-        yield row
-
-
-def validate_and_parse_values(
-    csv: CSVDictIterator, columns: List[CSVColumnType]
-) -> CSVDictIterator:
-    columns_by_header = {column.name: column for column in columns}
-
-    def parse_and_validate_value(header, value, r):  # pylint: disable=invalid-name
-        where = f"column {header}, row {r+2}"
-        column = columns_by_header[header]
-
-        if column.value_type is CSVValueType.NUMBER:
+def parse_value(
+    value: str, value_type: CSVValueType, header: str, r: int
+):  # pylint: disable=invalid-name
+    if value_type is CSVValueType.NUMBER:
+        # Most numbers are plain digits, which int can parse without going
+        # through the locale. Anything else (e.g. "1,000") gets parsed
+        # according to the locale, which gives the same result when int can
+        # parse the value too.
+        try:
+            return int(value)
+        except ValueError:
             try:
                 return locale.atoi(value)
             except ValueError:
                 # pylint: disable=raise-missing-from
-                raise CSVParseError(f"Expected a number in {where}. Got: {value}.")
-
-        if column.value_type is CSVValueType.EMAIL:
-            if not EMAIL_REGEX.match(value):
                 raise CSVParseError(
-                    f"Expected an email address in {where}. Got: {value}."
+                    f"Expected a number in column {header}, row {r+2}. Got: {value}."
                 )
 
-        return value
-
-    for r, row in enumerate(csv):  # pylint: disable=invalid-name
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
-
-        yield {
-            header: parse_and_validate_value(header, value, r)
-            for header, value in row.items()
-        }
-
-
-def format_tuple(tup: Tuple) -> str:
-    return str(tup[0]) if len(tup) == 1 else str(tup)
-
-
-def reject_duplicate_values(
-    csv: CSVDictIterator, columns: List[CSVColumnType]
-) -> CSVDictIterator:
-    # For our purposes, we want all the columns with unique=True to be used as
-    # one composite unique key for the rows.
-    unique_columns = tuple(sorted(column.name for column in columns if column.unique))
-    if len(unique_columns) == 0:
-        yield from csv
-        return
-
-    seen = set()
-    for row in csv:
-        # Skip empty rows, we filter them out later
-        if is_empty_row(row):
-            yield row
-            continue
-
-        row_key = tuple(row[column] for column in unique_columns)
-        if row_key in seen:
+    if value_type is CSVValueType.EMAIL:
+        if not EMAIL_REGEX.match(value):
             raise CSVParseError(
-                f"Each row must be uniquely identified by {format_tuple(unique_columns)}."
-                + f" Found duplicate: {format_tuple(row_key)}."
+                f"Expected an email address in column {header}, row {r+2}. Got: {value}."
             )
-        else:
-            seen.add(row_key)
-
-        yield row
-
-
-def reject_total_rows(csv: CSVDictIterator) -> CSVDictIterator:
-    for r, row in enumerate(csv):  # pylint: disable=invalid-name
-        for value in row.values():
-            if value.lower() in ["total", "totals"]:
-                raise CSVParseError(f"Remove total row (row {r+2})")
-
-        yield row
 
+    return value
 
-def convert_rows_to_dicts(csv: CSVIterator) -> CSVDictIterator:
-    headers = next(csv)
 
-    for r, row in enumerate(csv):  # pylint: disable=invalid-name
-        # Normalize empty rows to make sure we can turn them into dicts.
-        # We'll filter them out later.
-        if len(row) == 0:
-            row = ["" for _ in headers]
-        if len(row) != len(headers):
-            raise CSVParseError(
-                f"Wrong number of cells in row {r+2}."
-                f" Expected {len(headers)} {pluralize('cell', len(headers))},"
-                f" got {len(row)} {pluralize('cell', len(row))}."
-            )
-
-        yield dict(zip(headers, row))
+def format_tuple(tup: Tuple) -> str:
+    return str(tup[0]) if len(tup) == 1 else str(tup)
 
 
 def pluralize(word: str, num: int) -> str:
     return word if num == 1 else f"{word}s"
 
 
+# How many bytes to sample from each part of a file when detecting its
+# encoding. chardet is slow on big files (it can take minutes on a CVR file),
+# so we start with small samples.
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding_samples(
+    file: bytes, first_invalid_byte: int
+) -> Iterator[Optional[str]]:
+    """
+    Yields guesses for the encoding of <file>, detected from bigger and bigger
+    samples, and finally from the whole file. Each sample is made of slices
+    from the start, middle and end of the file, plus a slice around the first
+    byte that wasn't valid UTF-8, so the sample always has some of the
+    characters that tell encodings apart.
+    """
+    sample_size = ENCODING_SAMPLE_SIZE
+    while 4 * sample_size < len(file):
+        offsets = [
+            0,
+            max(first_invalid_byte - sample_size // 2, 0),
+            (len(file) - sample_size) // 2,
+            len(file) - sample_size,
+        ]
+        sample = b"\n".join(
+            file[offset : offset + sample_size] for offset in sorted(offsets)
+        )
+        yield chardet.detect(sample)["encoding"]
+        sample_size *= 16
+    yield chardet.detect(file)["encoding"]
+
+
 def decode_csv_file(file: bytes) -> str:
     try:
         try:
             return file.decode("utf-8-sig")
-        except UnicodeDecodeError:
-            detect_result = chardet.detect(file)
-            if not detect_result["encoding"]:
-                raise
-            return file.decode(detect_result["encoding"])
+        except UnicodeDecodeError as utf8_error:
+            # chardet's confidence isn't a reliable signal for the encodings we
+            # see (e.g. Windows-1252), so we take a guess to be right if it
+            # decodes the whole file. Otherwise, we try again with a bigger
+            # sample.
+            tried_encodings = set()
+            for encoding in detect_encoding_samples(file, utf8_error.start):
+                if not encoding or encoding in tried_encodings:
+                    continue
+                tried_encodings.add(encoding)
+                try:
+                    return file.decode(encoding)
+                except UnicodeDecodeError:
+                    pass
+            raise utf8_error
     except UnicodeDecodeError:
         # pylint: disable=raise-missing-from
         raise BadRequest(
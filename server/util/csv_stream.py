@@ -0,0 +1,58 @@
+import io
+import csv
+from typing import Iterable, List, Optional
+import psycopg2
+
+
+class CsvStream:
+    """
+    A read-only file-like object that writes <rows> as CSV text on demand.
+
+    This lets us stream rows into the db with COPY (which reads from a file)
+    as we produce them, without writing them all to a file first. Rows are
+    only pulled from the iterable when COPY asks for more data, so we only
+    hold about one read's worth of CSV text in memory at a time.
+    """
+
+    def __init__(self, rows: Iterable[List]):
+        self.rows = iter(rows)
+        self.row_buffer = io.StringIO()
+        self.writer = csv.writer(self.row_buffer)
+        self.pending = ""
+        # psycopg2 replaces any error raised while COPY is reading with its
+        # own, so we hold on to the original (see copy_rows).
+        self.error: Optional[Exception] = None
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.pending) < size:
+            try:
+                row = next(self.rows, None)
+            except Exception as error:
+                self.error = error
+                raise
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.pending += self.row_buffer.getvalue()
+            self.row_buffer.seek(0)
+            self.row_buffer.truncate()
+
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+def copy_rows(cursor, copy_statement: str, rows: Iterable[List]):
+    """
+    Runs <copy_statement> (a COPY ... FROM STDIN WITH (FORMAT CSV)), streaming
+    <rows> as the data. If producing the rows raises an error (e.g. a
+    CSVParseError), that's the error we raise.
+    """
+    stream = CsvStream(rows)
+    try:
+        cursor.copy_expert(copy_statement, stream)
+    except psycopg2.Error:
+        if stream.error:
+            raise stream.error  # pylint: disable=raise-missing-from
+        raise
@@ -0,0 +1,168 @@
+"""
+Storage for the contents of uploaded files.
+
+Uploaded files can be big (CVR files can be hundreds of MB), so rather than
+keeping their contents in the db, we split them into chunks, compress each
+chunk, and keep the chunks in a file store - either a directory on local disk
+or an S3-compatible object store (e.g. AWS S3 or MinIO). The File row only
+records how many chunks there are, and files are read back one chunk at a
+time, so we never need to hold a whole file in memory.
+
+Which store to use is configured by ARLO_FILE_STORAGE_URL (see config.py):
+    file:///path/to/directory
+    s3://bucket-name
+    s3://bucket-name?endpoint_url=http://localhost:9000
+If it isn't set, file contents are kept in the db (in File.contents) instead.
+
+Chunks are written as soon as a file is saved, but the File row that refers
+to them is only written when the transaction commits. So File cleans up after
+itself around the transaction: chunks for a file saved in a transaction that
+is rolled back are deleted, and chunks for a file deleted in a transaction are
+only deleted once it commits (see File in models.py).
+"""
+import io
+import os
+import shutil
+import zlib
+from typing import Optional, TextIO
+from urllib.parse import urlparse, parse_qs
+
+from ..config import FILE_STORAGE_URL
+
+# How many bytes of the (uncompressed) file to put in each chunk
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileStore:
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError  # pragma: no cover
+
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+
+class LocalFileStore(FileStore):
+    def __init__(self, root: str):
+        self.root = root
+
+    def put(self, key: str, data: bytes) -> None:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def get(self, key: str) -> bytes:
+        with open(os.path.join(self.root, key), "rb") as file:
+            return file.read()
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(os.path.join(self.root, prefix), ignore_errors=True)
+
+
+class S3FileStore(FileStore):
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None):
+        # boto3 is only needed when storing files in S3, so we only import it
+        # here. Credentials are read from the standard AWS env vars.
+        import boto3  # pylint: disable=import-outside-toplevel
+
+        self.bucket = bucket
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def delete_prefix(self, prefix: str) -> None:
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=prefix
+        )
+        for page in pages:
+            keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if keys:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys})
+
+
+def file_store_from_url(url: str) -> FileStore:
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "file":
+        return LocalFileStore(parsed_url.path)
+    if parsed_url.scheme == "s3":
+        endpoint_url = parse_qs(parsed_url.query).get("endpoint_url", [None])[0]
+        return S3FileStore(parsed_url.netloc, endpoint_url)
+    raise Exception(f"Unsupported file storage URL: {url}")
+
+
+file_store: Optional[FileStore] = (
+    file_store_from_url(FILE_STORAGE_URL) if FILE_STORAGE_URL else None
+)
+
+
+def chunk_key(file_id: str, chunk_index: int) -> str:
+    return f"{file_id}/{chunk_index}"
+
+
+def write_file_chunks(file_id: str, contents: bytes) -> Optional[int]:
+    """
+    Splits <contents> into compressed chunks and puts them in the file store.
+    Returns the number of chunks, or None if there is no file store.
+    """
+    if file_store is None:
+        return None
+    num_chunks = 0
+    for start in range(0, len(contents), CHUNK_SIZE):
+        chunk = contents[start : start + CHUNK_SIZE]
+        file_store.put(chunk_key(file_id, num_chunks), zlib.compress(chunk))
+        num_chunks += 1
+    return num_chunks
+
+
+def delete_file_chunks(file_id: str) -> None:
+    assert file_store is not None
+    file_store.delete_prefix(f"{file_id}/")
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    A raw binary stream over the chunks of a file, which fetches and
+    decompresses each chunk only once the previous one has been read.
+    """
+
+    def __init__(self, file_id: str, num_chunks: int):
+        super().__init__()
+        self.file_id = file_id
+        self.num_chunks = num_chunks
+        self.next_chunk_index = 0
+        self.chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        assert file_store is not None
+        while len(self.chunk) == 0 and self.next_chunk_index < self.num_chunks:
+            self.chunk = memoryview(
+                zlib.decompress(
+                    file_store.get(chunk_key(self.file_id, self.next_chunk_index))
+                )
+            )
+            self.next_chunk_index += 1
+
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+def open_file_chunks(file_id: str, num_chunks: int) -> TextIO:
+    # Like the csv module recommends, we don't translate newlines, so that
+    # newlines in quoted fields are left as is.
+    return io.TextIOWrapper(
+        io.BufferedReader(ChunkReader(file_id, num_chunks), buffer_size=CHUNK_SIZE),
+        encoding="utf-8",
+        newline="",
+    )
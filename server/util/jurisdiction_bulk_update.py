@@ -18,15 +18,14 @@ def process_jurisdictions_file(session, election: Election, file: File) -> None:
     assert election.jurisdictions_file_id == file.id
 
     def process():
-        jurisdictions_csv = parse_csv(
-            election.jurisdictions_file.contents, JURISDICTIONS_COLUMNS
-        )
+        with election.jurisdictions_file.open() as jurisdictions_file:
+            jurisdictions_csv = parse_csv(jurisdictions_file, JURISDICTIONS_COLUMNS)
+            name_and_admin_email_pairs = [
+                (row[JURISDICTION_NAME], row[ADMIN_EMAIL]) for row in jurisdictions_csv
+            ]
 
-        bulk_update_jurisdictions(
-            session,
-            election,
-            [(row[JURISDICTION_NAME], row[ADMIN_EMAIL]) for row in jurisdictions_csv],
-        )
+        bulk_update_jurisdictions(session, election, name_and_admin_email_pairs)
+        return len(name_and_admin_email_pairs)
 
     process_file(session, file, process)
 
@@ -86,5 +85,7 @@ def bulk_update_jurisdictions(
         session.query(Jurisdiction).filter(
             Jurisdiction.id.in_(unmanaged_admin_ids)
         ).delete(synchronize_session="fetch")
+        # Bulk deletes skip the ORM, so they don't bump the version for us
+        bump_sample_size_inputs_version(session, [election.id])
 
         return new_admins
@@ -1,7 +1,7 @@
 import datetime
 import traceback
 from typing import Callable, Optional
-from sqlalchemy import update
+from sqlalchemy import update, text, func
 from sqlalchemy.orm.session import Session
 
 from ..models import *  # pylint: disable=wildcard-import
@@ -9,11 +9,82 @@ from ..util.isoformat import isoformat
 from ..util.jsonschema import JSONDict
 
 
+# The Postgres channel that bgcompute workers listen on for new tasks
+BGCOMPUTE_CHANNEL = "bgcompute"
+
+# Jobs for smaller files go first, so that users uploading them don't have
+# to wait for big CVR files to be processed.
+FILE_TYPE_PRIORITIES = {
+    FileType.JURISDICTIONS: 4,
+    FileType.STANDARDIZED_CONTESTS: 3,
+    FileType.BALLOT_MANIFEST: 2,
+    FileType.BATCH_TALLIES: 1,
+    FileType.CVRS: 0,
+}
+
+# How long a worker's lease on a job lasts. Workers renew their leases while
+# they're processing a file, so a lease only expires if the worker died.
+PROCESSING_JOB_LEASE = datetime.timedelta(minutes=5)
+
+# How many times we'll try to process a file before giving up
+MAX_PROCESSING_JOB_ATTEMPTS = 3
+
+
 class UserError(Exception):
     pass
 
 
-def process_file(session: Session, file: File, callback: Callable[[], None]) -> bool:
+def notify_bgcompute(session: Session):
+    # Wakes up the bgcompute workers to look for new tasks. Postgres only
+    # delivers the notification once the transaction commits, so the workers
+    # won't look for a task before it's been saved.
+    session.execute(text(f"NOTIFY {BGCOMPUTE_CHANNEL}"))
+
+
+def queue_processing_job(session: Session, file: File, file_type: FileType):
+    file.processing_job = ProcessingJob(
+        file_type=file_type,
+        state=ProcessingJobState.QUEUED,
+        priority=FILE_TYPE_PRIORITIES[file_type],
+        attempts=0,
+    )
+    notify_bgcompute(session)
+
+
+def start_processing_job(session: Session, job: ProcessingJob) -> bool:
+    """
+    Starts a new attempt at a queued job, or a job whose lease has expired.
+    The caller must have locked the job. If the job has already used up its
+    attempts, we mark it (and its file) as failed and return False.
+    """
+    now = datetime.datetime.utcnow()
+    if job.attempts >= MAX_PROCESSING_JOB_ATTEMPTS:
+        job.state = ProcessingJobState.FAILED
+        job.completed_at = now
+        job.lease_expires_at = None
+        job.error = f"Processing stopped unexpectedly after {job.attempts} attempts."
+        job.file.processing_started_at = job.started_at
+        job.file.processing_completed_at = now
+        job.file.processing_error = job.error
+        session.commit()
+        return False
+
+    job.state = ProcessingJobState.RUNNING
+    job.attempts += 1
+    job.started_at = now
+    job.completed_at = None
+    job.lease_expires_at = now + PROCESSING_JOB_LEASE
+    session.commit()
+    return True
+
+
+def process_file(
+    session: Session, file: File, callback: Callable[[], Optional[int]]
+) -> bool:
+    """
+    Processes <file> with <callback>, which may return the number of rows it
+    processed, and records the outcome on the file and its job (if any).
+    """
     if file.processing_started_at:
         return False
 
@@ -31,9 +102,14 @@ def process_file(session: Session, file: File, callback: Callable[[], None]) ->
 
     # If we got this far, `file` is ours to process.
     try:
-        callback()
+        num_rows = callback()
         file.processing_started_at = processing_started_at
         file.processing_completed_at = datetime.datetime.utcnow()
+        if file.processing_job:
+            file.processing_job.state = ProcessingJobState.SUCCEEDED
+            file.processing_job.completed_at = file.processing_completed_at
+            file.processing_job.lease_expires_at = None
+            file.processing_job.num_rows = num_rows
         session.add(file)
         session.commit()
         return True
@@ -46,6 +122,11 @@ def process_file(session: Session, file: File, callback: Callable[[], None]) ->
         file.processing_error = str(error) or str(
             traceback.format_exception(error.__class__, error, error.__traceback__)
         )
+        if file.processing_job:
+            file.processing_job.state = ProcessingJobState.FAILED
+            file.processing_job.completed_at = file.processing_completed_at
+            file.processing_job.lease_expires_at = None
+            file.processing_job.error = file.processing_error
         session.add(file)
         session.commit()
         if not isinstance(error, UserError):
@@ -82,3 +163,46 @@ def serialize_file_processing(file: Optional[File]) -> Optional[JSONDict]:
         "completedAt": isoformat(file.processing_completed_at),
         "error": file.processing_error,
     }
+
+
+def processing_job_metrics() -> JSONDict:
+    """
+    Summarizes the processing job queue for each type of file: how many jobs
+    are in each state, and the median and 95th percentile processing time (in
+    seconds) of the jobs that succeeded.
+    """
+    metrics = {
+        file_type: {
+            **{state: 0 for state in ProcessingJobState},
+            "p50ProcessingSeconds": None,
+            "p95ProcessingSeconds": None,
+        }
+        for file_type in FileType
+    }
+
+    state_counts = (
+        ProcessingJob.query.group_by(ProcessingJob.file_type, ProcessingJob.state)
+        .with_entities(ProcessingJob.file_type, ProcessingJob.state, func.count())
+        .all()
+    )
+    for file_type, state, count in state_counts:
+        metrics[file_type][state] = count
+
+    duration = func.extract(
+        "epoch", ProcessingJob.completed_at - ProcessingJob.started_at
+    )
+    processing_times = (
+        ProcessingJob.query.filter_by(state=ProcessingJobState.SUCCEEDED)
+        .group_by(ProcessingJob.file_type)
+        .with_entities(
+            ProcessingJob.file_type,
+            func.percentile_cont(0.5).within_group(duration),
+            func.percentile_cont(0.95).within_group(duration),
+        )
+        .all()
+    )
+    for file_type, p50, p95 in processing_times:
+        metrics[file_type]["p50ProcessingSeconds"] = p50
+        metrics[file_type]["p95ProcessingSeconds"] = p95
+
+    return metrics